@@ -14,6 +14,10 @@ from database.manager import DatabaseManager
 from core.analyzers import GreeksAnalyzer, GEXAnalyzer, OIAnalyzer, SmartMoneyAnalyzer, IndexAlignment, Indicators
 from core.simulator import RealisticSimulator
 from core.strategy_engine import StrategyLab
+from core.monte_carlo import MonteCarloEngine
+from core.risk import PortfolioRisk
+from core.vol_surface import VolatilitySurface, VolSurfaceCache
+from core.realized_vol import RealizedVolEngine
 from core.data_fetcher import DataFetcher
 
 # --- Page Config ---
@@ -147,6 +151,12 @@ if 'oi_analyzer' not in st.session_state:
     st.session_state.oi_analyzer = OIAnalyzer()
 if 'smart_money_analyzer' not in st.session_state:
     st.session_state.smart_money_analyzer = SmartMoneyAnalyzer()
+if 'vol_surfaces' not in st.session_state:
+    st.session_state.vol_surfaces = VolSurfaceCache()
+if 'realized_vol' not in st.session_state:
+    st.session_state.realized_vol = RealizedVolEngine(st.session_state.db)
+if 'pop_engine' not in st.session_state:
+    st.session_state.pop_engine = MonteCarloEngine()
 
 def main():
     inject_anza_vibrant_css()
@@ -191,7 +201,7 @@ def main():
     if selected == "Market Intelligence":
         render_market_intel(market_data, greeks, gex, oi, sm)
     elif selected == "Strategy Builder":
-        render_strategy_builder()
+        render_strategy_builder(market_data)
     elif selected == "Stock Intelligence":
         render_stock_intel(market_data)
     elif selected == "Flow Dynamics":
@@ -324,20 +334,15 @@ def render_flow_dynamics(market_data, greeks, gex, oi):
 
     chain = market_data.get('option_chain', [])
     strikes = [s['strike'] for s in chain]
-    spot = market_data['spot_price']
 
     with tab1:
-        # Calculate Strike-wise GEX
-        strike_gex_vals = []
-        for s_data in chain:
-            s = s_data['strike']
-            c_gamma = greeks['call_greeks'].get(s, {}).get('gamma', 0)
-            p_gamma = greeks['put_greeks'].get(s, {}).get('gamma', 0)
-            val = (s_data['call_oi'] * c_gamma - s_data['put_oi'] * p_gamma) * spot * 50
-            strike_gex_vals.append(val / 1e7) # Crores
-
-        fig = px.bar(x=strikes, y=strike_gex_vals, color=strike_gex_vals, color_continuous_scale='RdYlGn',
+        # Strike-wise GEX straight from GEXAnalyzer
+        strike_gex_vals = gex['strike_gex'] / 1e7 # Crores
+
+        fig = px.bar(x=gex['strikes'], y=strike_gex_vals, color=strike_gex_vals, color_continuous_scale='RdYlGn',
                      title="Strike-Wise Gamma Exposure (Net GEX Profile in Cr)")
+        if gex['gex_flip_level'] is not None:
+            fig.add_vline(x=gex['gex_flip_level'], line_dash="dash", line_color="white", annotation_text="Gamma Flip")
         fig.update_layout(template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
         st.plotly_chart(fig, use_container_width=True)
         st.info("💡 **Gamma Insight:** Deep Red zones indicate 'Gamma Walls' where volatility expansion is highly probable on breakout.")
@@ -364,27 +369,45 @@ def render_flow_dynamics(market_data, greeks, gex, oi):
 
     with tab4:
         st.subheader("Volatility Intelligence Grid")
-        iv_vals = [15 + (abs(s - 24500)/100)**1.5 for s in strikes]
-        hv_vals = [12 + (abs(s - 24500)/150)**1.2 for s in strikes]
+        surface = st.session_state.vol_surfaces.get(
+            market_data['symbol'], lambda: VolatilitySurface.from_snapshots([market_data])
+        )
+        t = market_data['time_to_expiry']
+        iv_vals = (surface.iv(strikes, t) * 100).tolist()
+        # Realized vol from stored candles; flat across strikes
+        rv = st.session_state.realized_vol.refresh(market_data['symbol'])
+        hv_20 = rv['close_to_close'][20] * 100
+        hv_vals = [hv_20] * len(strikes)
+
+        skew = surface.skew[0]
+        k1, k2, k3 = st.columns(3)
+        k1.metric("ATM IV", f"{skew['atm_iv']*100:.2f}%")
+        k2.metric("25Δ Risk Reversal", f"{skew['rr25']*100:+.2f}")
+        k3.metric("25Δ Butterfly", f"{skew['bf25']*100:+.2f}")
 
         c_skew1, c_skew2 = st.columns(2)
         with c_skew1:
             fig_vols = go.Figure()
             fig_vols.add_trace(go.Scatter(x=strikes, y=iv_vals, name="Implied Vol (IV)", line=dict(color='var(--anza-gold)', width=3)))
-            fig_vols.add_trace(go.Scatter(x=strikes, y=hv_vals, name="Historical Vol (HV)", line=dict(color='cyan', width=2, dash='dash')))
+            if not np.isnan(hv_20):
+                fig_vols.add_trace(go.Scatter(x=strikes, y=hv_vals, name="Historical Vol (HV 20)", line=dict(color='cyan', width=2, dash='dash')))
             fig_vols.update_layout(template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
                                     xaxis_title="Strike", yaxis_title="Volatility (%)", title="IV vs HV Skew (Volatility Smile)")
             st.plotly_chart(fig_vols, use_container_width=True)
 
         with c_skew2:
             st.markdown("#### 💎 Volatility Grid (IV-HV Mispricing)")
-            mispricing = [iv - hv for iv, hv in zip(iv_vals, hv_vals)]
-            fig_grid = go.Figure(data=go.Heatmap(
-                z=[mispricing], x=strikes, y=['Edge Score'],
-                colorscale='RdYlGn', reversescale=True
-            ))
-            fig_grid.update_layout(template="plotly_dark", height=200, margin=dict(l=0,r=0,t=0,b=0))
-            st.plotly_chart(fig_grid, use_container_width=True)
+            if np.isnan(hv_20):
+                st.info("Not enough stored candles yet for a 20-bar realized volatility.")
+            else:
+                mispricing = [iv - hv for iv, hv in zip(iv_vals, hv_vals)]
+                fig_grid = go.Figure(data=go.Heatmap(
+                    z=[mispricing], x=strikes, y=['Edge Score'],
+                    colorscale='RdYlGn', reversescale=True
+                ))
+                fig_grid.update_layout(template="plotly_dark", height=200, margin=dict(l=0,r=0,t=0,b=0))
+                st.plotly_chart(fig_grid, use_container_width=True)
+                st.caption(" | ".join(f"{name.replace('_', ' ').title()} HV20: {vals[20]*100:.2f}%" for name, vals in rv.items()))
 
 def render_institutional_flow(market_data):
     st.markdown('<div class="main-header">Institutional Flow Dashboard</div>', unsafe_allow_html=True)
@@ -465,7 +488,7 @@ def render_playbook():
                     </div>
                     """, unsafe_allow_html=True)
 
-def render_strategy_builder():
+def render_strategy_builder(market_data):
     st.markdown('<div class="main-header">Strategy Builder & Simulator</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">Institutional Multi-Leg Modeling | Payoff Analysis | Probabilistic Simulation</div>', unsafe_allow_html=True)
 
@@ -476,7 +499,13 @@ def render_strategy_builder():
             <h4 style='margin-top:0; color: var(--anza-gold); font-family: Orbitron;'>CONSTRUCTION</h4>
         </div>""", unsafe_allow_html=True)
 
+        # Chain IV from the cycle's fitted surface; the manual IV only drives the POP simulation
+        surface = st.session_state.vol_surfaces.get(
+            market_data['symbol'], lambda: VolatilitySurface.from_snapshots([market_data])
+        )
         spot_ref = st.number_input("Ref. Nifty Spot", value=24500, step=50)
+        sim_iv = st.number_input("Simulation IV (%)", value=round(surface.skew[0]['atm_iv'] * 100, 1), min_value=1.0, step=0.5)
+        sim_dte = st.number_input("Days to Expiry", value=7, min_value=1)
         if 'builder_legs' not in st.session_state: st.session_state.builder_legs = []
 
         with st.form("add_leg"):
@@ -500,19 +529,50 @@ def render_strategy_builder():
             spot_min, spot_max = spot_ref * 0.92, spot_ref * 1.08
             x_range = np.linspace(spot_min, spot_max, 400)
             payoff, net_flow = StrategyLab.calculate_payoff(x_range, st.session_state.builder_legs)
-            metrics = StrategyLab.get_strategy_metrics(x_range, payoff)
+            metrics = StrategyLab.get_strategy_metrics(x_range, payoff, legs=st.session_state.builder_legs)
 
             m1, m2, m3 = st.columns(3)
-            m1.metric("Max Profit", f"₹{metrics['max_profit']:,.2f}")
+            m1.metric("Max Profit", f"₹{metrics['max_profit']:,.2f}" if metrics['max_profit'] != float('inf') else "Unlimited")
             m2.metric("Max Loss", f"₹{metrics['max_loss']:,.2f}" if metrics['max_loss'] != float('-inf') else "Unlimited")
             m3.metric("Breakeven(s)", ", ".join([f"{b:.0f}" for b in metrics['breakevens']]))
 
+            mc = st.session_state.pop_engine.simulate(st.session_state.builder_legs, spot_ref, sim_iv / 100, sim_dte)
+            p1, p2, p3 = st.columns(3)
+            p1.metric("POP", f"{mc['pop']:.1%}", help=f"± {mc['pop_std_error']:.2%} over {mc['n_paths']:,} paths")
+            p2.metric("Expected P&L", f"₹{mc['expected_pnl']:,.2f}", help=f"± {mc['std_error']:,.2f}")
+            p3.metric("CVaR (95%)", f"₹{mc['cvar']:,.2f}")
+
             fig = go.Figure()
             fig.add_trace(go.Scatter(x=x_range, y=payoff, fill='tozeroy', line=dict(color='#f0ab48', width=4), name="P&L at Expiry"))
+            horizons = sorted({0, 1, sim_dte // 2} - {sim_dte})
+            curves, _ = StrategyLab.calculate_pnl_curves(x_range, st.session_state.builder_legs, sim_dte, horizons, surface=surface)
+            for h, curve in zip(horizons, curves):
+                fig.add_trace(go.Scatter(x=x_range, y=curve, line=dict(width=2, dash='dot'), name="Today" if h == 0 else f"T+{h}"))
             fig.add_hline(y=0, line_dash="dash", line_color="white")
             fig.update_layout(template="plotly_dark", height=450, margin=dict(l=0,r=0,t=20,b=0), xaxis_title="Spot Price", yaxis_title="Profit / Loss")
             st.plotly_chart(fig, use_container_width=True)
 
+            # Position risk: aggregate Greeks and the spot x vol stress grid
+            positions = [
+                {**leg, 'iv': leg.get('iv', float(surface.iv(leg['strike'], sim_dte / 365))), 'time_to_expiry': sim_dte / 365}
+                for leg in st.session_state.builder_legs
+            ]
+            risk = PortfolioRisk().analyze(positions, float(spot_ref))
+            net = risk['greeks']['by_underlying']['NIFTY']
+            r1, r2, r3, r4 = st.columns(4)
+            r1.metric("Net Delta", f"{net['delta']:,.2f}", help=f"₹{risk['greeks']['rupee_delta']:,.0f} per 1% move")
+            r2.metric("Net Gamma", f"{net['gamma']:,.4f}")
+            r3.metric("Net Vega", f"{risk['greeks']['vega']:,.2f}")
+            r4.metric("Net Theta", f"{risk['greeks']['theta']:,.2f}")
+
+            stress = risk['stress']
+            heat = go.Figure(go.Heatmap(
+                z=stress['pnl'].T, x=stress['spot_shocks'] * 100, y=stress['vol_shocks'] * 100,
+                colorscale='RdYlGn', zmid=0, colorbar=dict(title="P&L")
+            ))
+            heat.update_layout(template="plotly_dark", height=350, margin=dict(l=0,r=0,t=20,b=0), xaxis_title="Spot Shock (%)", yaxis_title="IV Shock (vol pts)")
+            st.plotly_chart(heat, use_container_width=True)
+
 def render_settings():
     st.markdown('<div class="main-header">System Settings</div>', unsafe_allow_html=True)
     if st.button("RESET DATABASE"): st.warning("Database reset initiated...")
@@ -19,8 +19,12 @@ class Settings:
     # Database
     DB_NAME = os.getenv("DB_NAME", "anza_production.db")
 
+    # On-disk caches (instrument master)
+    CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
     # Analysis settings
     UPDATE_INTERVAL_SECONDS = 60
+    CANDLE_INTERVAL = "ONE_MINUTE"  # Interval of the stored candles (launcher demo data and the live loop)
     RISK_FREE_RATE = 0.065
     NIFTY_LOT_SIZE = 50
     BANKNIFTY_LOT_SIZE = 25
@@ -1,15 +1,182 @@
 # core/analyzers.py
 
 import numpy as np
-from scipy.stats import norm
+import pandas as pd
+from collections import deque
 import logging
+from core.greeks_engine import GreeksEngine
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_IV = 0.15
+# Calls to resolve_iv after which an unseen row's IV seeds are dropped
+IV_SEED_MAX_AGE = 20
+
 class GreeksAnalyzer:
     """
     Implements Black-Scholes model for institutional Greeks.
     """
+    def __init__(self, solve_iv=True, cache=None):
+        # When enabled, IV is backed out of call_ltp/put_ltp every cycle
+        self.solve_iv = solve_iv
+        # Optional GreeksCache; only strikes whose inputs moved get repriced
+        self.cache = cache
+        self.iv_stats = {'solved': 0, 'fallback': 0, 'iterations': 0}
+        self._iv_seed = {}  # (symbol, expiry) -> (strikes, [call IV, put IV], call number) from the row's last solve
+        self._iv_calls = 0
+        self._row_ids = {}  # (symbol, expiry) -> row id in the cache's slot keys
+
+    @staticmethod
+    def calculate_bs_batch(is_call, S, K, t, r, sigma):
+        """
+        Vectorized Greeks for a whole chain in one pass (see GreeksEngine.compute).
+        """
+        return GreeksEngine.compute(is_call, S, K, t, r, sigma)
+
+    @staticmethod
+    def implied_vol_batch(is_call, price, S, K, t, r, sigma0=DEFAULT_IV, tol=1e-5, max_iter=50, lo=1e-4, hi=5.0):
+        """
+        Vectorized implied volatility solver for a whole chain.
+        Runs a Newton step on every unconverged entry and falls back to
+        bisection whenever Newton would leave the current [lo, hi] bracket.
+        sigma0: starting guess (scalar or array), e.g. last cycle's IVs
+        tol: absolute price tolerance
+        Returns (iv, converged, iterations). iv is NaN where the price is
+        outside the no-arbitrage bounds or the inputs are degenerate.
+        """
+        is_call, price, S, K, t, sigma0 = np.broadcast_arrays(
+            np.asarray(is_call, dtype=bool), *(np.asarray(x, dtype=float) for x in (price, S, K, t, sigma0))
+        )
+        with np.errstate(invalid='ignore'):
+            disc = K * np.exp(-r * np.where(t > 0, t, 0.0))
+            lower = np.where(is_call, np.maximum(S - disc, 0.0), np.maximum(disc - S, 0.0))
+            upper = np.where(is_call, S, disc)
+            valid = (S > 0) & (K > 0) & (t > 0) & (price > lower) & (price < upper)
+
+        sigma = np.where(np.isfinite(sigma0), np.clip(sigma0, lo, hi), DEFAULT_IV)
+        lo_b = np.full(sigma.shape, lo)
+        hi_b = np.full(sigma.shape, hi)
+        converged = np.zeros(sigma.shape, dtype=bool)
+        active = valid.copy()
+
+        iterations = 0
+        while active.any() and iterations < max_iter:
+            iterations += 1
+            idx = np.flatnonzero(active)
+            model, vega = GreeksEngine.price_vega(is_call.flat[idx], S.flat[idx], K.flat[idx], t.flat[idx], r, sigma.flat[idx])
+            diff = model - price.flat[idx]
+            done = np.abs(diff) < tol
+
+            # Model price is increasing in sigma, so diff tells us which side the root is on
+            hi_b.flat[idx] = np.where(diff > 0, sigma.flat[idx], hi_b.flat[idx])
+            lo_b.flat[idx] = np.where(diff < 0, sigma.flat[idx], lo_b.flat[idx])
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                newton = sigma.flat[idx] - diff / vega
+            bad = ~np.isfinite(newton) | (newton <= lo_b.flat[idx]) | (newton >= hi_b.flat[idx])
+            step = np.where(bad, 0.5 * (lo_b.flat[idx] + hi_b.flat[idx]), newton)
+
+            sigma.flat[idx] = np.where(done, sigma.flat[idx], step)
+            converged.flat[idx[done]] = True
+            active.flat[idx[done]] = False
+
+        return np.where(valid, sigma, np.nan), converged, iterations
+
+    def resolve_iv(self, block, r):
+        """
+        (2, R, N) call/put IV block: solved from LTPs where possible (seeded
+        from the last solved IVs of the same row and strike), otherwise
+        the feed IV, otherwise DEFAULT_IV. Seeds are kept per row, so a
+        single-chain call does not cold-start the rows of a block.
+        """
+        feed_iv = np.stack([block['call_iv'], block['put_iv']])
+        fallback = np.where(np.isnan(feed_iv), DEFAULT_IV, feed_iv)
+        ltp = np.stack([block['call_ltp'], block['put_ltp']])
+        if not self.solve_iv or not np.isfinite(ltp).any():
+            return fallback
+
+        K = block['strike']
+        seed = fallback.copy()
+        for i, row in enumerate(block['rows']):
+            prev = self._iv_seed.get(row)
+            if prev is None or not len(prev[0]):
+                continue
+            j = np.minimum(np.searchsorted(prev[0], K[i]), len(prev[0]) - 1)
+            same = (prev[0][j] == K[i]) & ~np.isnan(prev[1][:, j])
+            seed[:, i] = np.where(same, prev[1][:, j], seed[:, i])
+
+        iv, converged, iterations = self.implied_vol_batch(
+            np.array([True, False])[:, None, None],
+            ltp,
+            block['spot'][None, :, None],
+            K[None],
+            block['time_to_expiry'][None, :, None],
+            r,
+            seed
+        )
+        converged &= block['mask']
+        solved = np.where(converged, iv, np.nan)
+        self._iv_calls += 1
+        self._iv_seed.update({row: (K[i].copy(), solved[:, i], self._iv_calls) for i, row in enumerate(block['rows'])})
+        # Rows not seen for a while (e.g. expired contracts) are dropped
+        self._iv_seed = {row: seed for row, seed in self._iv_seed.items() if self._iv_calls - seed[2] < IV_SEED_MAX_AGE}
+        self.iv_stats = {
+            'solved': int(converged.sum()),
+            'fallback': int((~converged & block['mask']).sum()),
+            'iterations': iterations
+        }
+        return np.where(converged, iv, fallback)
+
+    def analyze_block(self, block):
+        """
+        IVs and Greeks for a chain block (see ChainBlockAnalyzer.build_block):
+        {'iv': (2, R, N), 'greeks': {name: (2, R, N)}}, calls first, with
+        zero Greeks in padding slots.
+        """
+        r = settings.RISK_FREE_RATE
+        iv = self.resolve_iv(block, r)
+        is_call, S, K, t = np.broadcast_arrays(
+            np.array([True, False])[:, None, None], block['spot'][:, None], block['strike'], block['time_to_expiry'][:, None]
+        )
+        if self.cache is None:
+            greeks = self.calculate_bs_batch(is_call, S, K, t, r, iv)
+            return {'iv': iv, 'greeks': {g: np.where(block['mask'], v, 0.0) for g, v in greeks.items()}}
+
+        # Only listed options go through the cache, each under a stable id of its (symbol, expiry) row
+        rows = np.array([self._row_ids.setdefault(row, len(self._row_ids)) for row in block['rows']])
+        mask = np.broadcast_to(block['mask'], iv.shape)
+        row = np.broadcast_to(rows[:, None], iv.shape)
+        listed = self.cache.compute(is_call[mask], S[mask], K[mask], t[mask], r, iv[mask], row=row[mask])
+        greeks = {g: np.zeros(iv.shape) for g in listed}
+        for g, v in listed.items():
+            greeks[g][mask] = v
+        return {'iv': iv, 'greeks': greeks}
+
+    def row_view(self, block, block_greeks, i):
+        """
+        Row i of a block analysis in the analyze() layout, in the row's original chain order.
+        """
+        n = int(block['mask'][i].sum())
+        back = np.argsort(block['order'][i, :n], kind='stable')
+        keys = block['strike'][i, :n][back].tolist()
+        iv = block_greeks['iv'][:, i, :n][:, back]
+        call_arrays = {g: v[0, i, :n][back] for g, v in block_greeks['greeks'].items()}
+        put_arrays = {g: v[1, i, :n][back] for g, v in block_greeks['greeks'].items()}
+        return {
+            'strikes': np.array(keys, dtype=float),
+            'call_iv': iv[0],
+            'put_iv': iv[1],
+            'call_arrays': call_arrays,
+            'put_arrays': put_arrays,
+            'call_greeks': self.to_dict_view(keys, call_arrays),
+            'put_greeks': self.to_dict_view(keys, put_arrays)
+        }
+
+    @staticmethod
+    def to_dict_view(keys, greeks):
+        return GreeksEngine.to_dict_view(keys, greeks)
+
     @staticmethod
     def calculate_bs(flag, S, K, t, r, sigma):
         """
@@ -20,103 +187,138 @@ class GreeksAnalyzer:
         r: Risk free rate
         sigma: Implied Volatility
         """
-        if t <= 0:
-            return {'delta': 0, 'gamma': 0, 'theta': 0, 'vega': 0}
-
-        try:
-            d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
-            d2 = d1 - sigma * np.sqrt(t)
-
-            if flag == 'c':
-                delta = norm.cdf(d1)
-                theta = (- (S * norm.pdf(d1) * sigma) / (2 * np.sqrt(t)) - r * K * np.exp(-r * t) * norm.cdf(d2))
-            else:
-                delta = -norm.cdf(-d1)
-                theta = (- (S * norm.pdf(d1) * sigma) / (2 * np.sqrt(t)) + r * K * np.exp(-r * t) * norm.cdf(-d2))
-
-            gamma = norm.pdf(d1) / (S * sigma * np.sqrt(t))
-            vega = S * norm.pdf(d1) * np.sqrt(t)
-
-            return {
-                'delta': round(delta, 4),
-                'gamma': round(gamma, 6),
-                'theta': round(theta / 365, 4),
-                'vega': round(vega / 100, 4)
-            }
-        except Exception as e:
-            logger.error(f"Error calculating Greeks: {e}")
-            return {'delta': 0, 'gamma': 0, 'theta': 0, 'vega': 0}
+        return GreeksEngine.calculate(flag, S, K, t, r, sigma)
 
     def analyze(self, market_data):
         """
         Batch calculates greeks for the entire option chain.
+        The chain is analyzed as a one-row block, so a single chain and the
+        multi-expiry block share one code path; the per-strike dicts are
+        only a compatibility view over the arrays.
         """
-        results = {'call_greeks': {}, 'put_greeks': {}}
-        spot = market_data.get('spot_price', 0)
-        t = market_data.get('time_to_expiry', 0.01) # Default 1% of a year
-        r = 0.10 # 10% risk free rate
-
-        chain = market_data.get('option_chain', [])
-        for strike_data in chain:
-            strike = strike_data['strike']
-
-            # Call
-            iv_c = strike_data.get('call_iv', 0.15)
-            results['call_greeks'][strike] = self.calculate_bs('c', spot, strike, t, r, iv_c)
-
-            # Put
-            iv_p = strike_data.get('put_iv', 0.15)
-            results['put_greeks'][strike] = self.calculate_bs('p', spot, strike, t, r, iv_p)
-
-        return results
+        block = ChainBlockAnalyzer.build_block([market_data])
+        return self.row_view(block, self.analyze_block(block), 0)
 
 class GEXAnalyzer:
     """
     Gamma Exposure (GEX) Analysis.
     Helps identify market maker hedging requirements.
     """
+    def __init__(self, flip_range=0.05, flip_points=201):
+        # Hypothetical spot grid (spot +/- flip_range) searched for the gamma flip
+        self.flip_range = flip_range
+        self.flip_points = flip_points
+
+    @staticmethod
+    def lot_size(symbol):
+        """
+        Contract multiplier for an underlying, e.g. settings.BANKNIFTY_LOT_SIZE.
+        """
+        return getattr(settings, f"{str(symbol).upper()}_LOT_SIZE", settings.NIFTY_LOT_SIZE)
+
+    @staticmethod
+    def strike_gex(call_oi, put_oi, call_gamma, put_gamma, spot, lot):
+        """
+        Net Gamma Exposure per strike: (Call OI * Call Gamma - Put OI * Put Gamma) * Spot * Multiplier.
+        Arrays broadcast, so a whole (expiry x strike) block works too.
+        """
+        return (call_oi * call_gamma - put_oi * put_gamma) * spot * lot
+
+    @staticmethod
+    def _gamma_column(chain, greeks_results, side):
+        """
+        Per-strike gamma from the Greeks batch arrays, or the dict view if absent.
+        """
+        gamma = greeks_results.get(f'{side}_arrays', {}).get('gamma')
+        if gamma is not None and len(gamma) == len(chain):
+            return np.asarray(gamma, dtype=float)
+        view = greeks_results.get(f'{side}_greeks', {})
+        return np.array([view.get(s['strike'], {}).get('gamma', 0) for s in chain], dtype=float)
+
+    @staticmethod
+    def _iv_column(chain, greeks_results, side):
+        """
+        Per-strike IV used by the Greeks pass, or the feed IV if absent.
+        """
+        iv = greeks_results.get(f'{side}_iv')
+        if iv is not None and len(iv) == len(chain):
+            return np.asarray(iv, dtype=float)
+        return np.array([s.get(f'{side}_iv', DEFAULT_IV) for s in chain], dtype=float)
+
     def analyze(self, market_data, greeks_results):
-        net_gex = 0
         chain = market_data.get('option_chain', [])
         spot = market_data.get('spot_price', 0)
+        lot = self.lot_size(market_data.get('symbol', 'NIFTY'))
 
-        for strike_data in chain:
-            strike = strike_data['strike']
-            call_oi = strike_data.get('call_oi', 0)
-            put_oi = strike_data.get('put_oi', 0)
+        strikes = np.array([s['strike'] for s in chain], dtype=float)
+        call_oi = np.array([s.get('call_oi', 0) for s in chain], dtype=float)
+        put_oi = np.array([s.get('put_oi', 0) for s in chain], dtype=float)
+        c_gamma = self._gamma_column(chain, greeks_results, 'call')
+        p_gamma = self._gamma_column(chain, greeks_results, 'put')
 
-            c_gamma = greeks_results['call_greeks'].get(strike, {}).get('gamma', 0)
-            p_gamma = greeks_results['put_greeks'].get(strike, {}).get('gamma', 0)
-
-            # Net Gamma Exposure Formula: (Call OI * Call Gamma - Put OI * Put Gamma) * Spot * Multiplier
-            # We assume a lot size multiplier of 50 for Nifty
-            strike_gex = (call_oi * c_gamma - put_oi * p_gamma) * spot * 50
-            net_gex += strike_gex
+        strike_gex = self.strike_gex(call_oi, put_oi, c_gamma, p_gamma, spot, lot)
+        net_gex = float(strike_gex.sum())
 
         regime = "Positive (Stabilizing)" if net_gex > 0 else "Negative (Accelerating)"
 
         return {
             'net_gex': round(net_gex, 2),
             'regime': regime,
-            'gex_flip_level': self._calculate_flip_level(market_data, greeks_results)
+            'strikes': strikes,
+            'strike_gex': strike_gex,
+            'lot_size': lot,
+            'gex_flip_level': self._calculate_flip_level(market_data, greeks_results, strikes, call_oi, put_oi, lot)
         }
 
-    def _calculate_flip_level(self, market_data, greeks_results):
-        # Simplistic flip level: strike with highest absolute gamma exposure
-        return market_data.get('spot_price', 0) # Placeholder for more complex calculation
+    def _calculate_flip_level(self, market_data, greeks_results, strikes, call_oi, put_oi, lot):
+        """
+        Spot level where net dealer gamma changes sign.
+        Re-prices gamma for the whole chain over a grid of hypothetical spot
+        levels in one (grid x strike) evaluation and interpolates the zero
+        crossing closest to the current spot. Returns None when the profile
+        keeps one sign across the whole grid.
+        """
+        spot = market_data.get('spot_price', 0)
+        if spot <= 0 or strikes.size == 0:
+            return None
+
+        chain = market_data.get('option_chain', [])
+        t = market_data.get('time_to_expiry', 0.01)
+        r = settings.RISK_FREE_RATE
+        call_iv = self._iv_column(chain, greeks_results, 'call')
+        put_iv = self._iv_column(chain, greeks_results, 'put')
+
+        grid = spot * np.linspace(1 - self.flip_range, 1 + self.flip_range, self.flip_points)
+        c_gamma = GreeksEngine.gamma(grid[:, None], strikes, t, r, call_iv)
+        p_gamma = GreeksEngine.gamma(grid[:, None], strikes, t, r, put_iv)
+        profile = (c_gamma @ call_oi - p_gamma @ put_oi) * grid * lot
+
+        sign = np.sign(profile)
+        cross = np.flatnonzero(sign[:-1] * sign[1:] < 0)
+        if cross.size == 0:
+            return None
+
+        x0, x1 = grid[cross], grid[cross + 1]
+        y0, y1 = profile[cross], profile[cross + 1]
+        levels = x0 - y0 * (x1 - x0) / (y1 - y0)
+        return round(float(levels[np.argmin(np.abs(levels - spot))]), 2)
 
 class OIAnalyzer:
     """
     Open Interest and Sentiment Analysis.
     """
     def analyze(self, market_data):
-        total_call_oi = sum(s.get('call_oi', 0) for s in market_data.get('option_chain', []))
-        total_put_oi = sum(s.get('put_oi', 0) for s in market_data.get('option_chain', []))
+        chain = market_data.get('option_chain', [])
 
-        pcr = total_put_oi / total_call_oi if total_call_oi > 0 else 0
+        # One columnar pass over the chain feeds PCR, totals and max pain
+        block = ChainBlockAnalyzer.build_block([market_data])
+        summary = self.summarize(block['strike'], block['call_oi'], block['put_oi'], block['mask'])
+        total_call_oi = int(summary['total_call_oi'][0])
+        total_put_oi = int(summary['total_put_oi'][0])
+        pcr = float(summary['pcr'][0])
 
-        # Identify Max Pain
-        max_pain = self._calculate_max_pain(market_data.get('option_chain', []))
+        # Identify Max Pain (reported as the chain's own strike value)
+        max_pain = chain[block['order'][0, summary['max_pain_index'][0]]]['strike'] if chain else 0
 
         return {
             'pcr': round(pcr, 3),
@@ -126,10 +328,166 @@ class OIAnalyzer:
             'regime': "Bullish" if pcr > 1.1 else "Bearish" if pcr < 0.7 else "Neutral"
         }
 
-    def _calculate_max_pain(self, chain):
-        # Placeholder for real Max Pain calculation
-        if not chain: return 0
-        return chain[len(chain)//2]['strike']
+    @staticmethod
+    def writer_pain(strikes, call_oi, put_oi):
+        """
+        Total payout owed by option writers if expiry settles at each strike.
+        strikes must be sorted ascending along the last axis, so a 2-D
+        (expiry x strike) block is handled row by row in the same pass.
+        Uses prefix sums of OI and strike*OI, so every strike is evaluated in
+        one O(n) pass instead of an O(n^2) loop:
+            call pain(j) = K_j * sum(call_oi[:j+1]) - sum((K * call_oi)[:j+1])
+            put pain(j)  = sum((K * put_oi)[j:]) - K_j * sum(put_oi[j:])
+        """
+        cum_call_oi = np.cumsum(call_oi, axis=-1)
+        cum_call_koi = np.cumsum(strikes * call_oi, axis=-1)
+        # Suffix sums, i.e. prefix sums over the reversed chain
+        rev_put_oi = np.cumsum(put_oi[..., ::-1], axis=-1)[..., ::-1]
+        rev_put_koi = np.cumsum((strikes * put_oi)[..., ::-1], axis=-1)[..., ::-1]
+
+        call_pain = strikes * cum_call_oi - cum_call_koi
+        put_pain = rev_put_koi - strikes * rev_put_oi
+        return call_pain + put_pain
+
+    @classmethod
+    def summarize(cls, strikes, call_oi, put_oi, mask):
+        """
+        OI totals, PCR and max pain for each row of an (R, N) block whose
+        strikes are sorted within each row; mask flags real (non-padding) strikes.
+        """
+        total_call_oi = call_oi.sum(axis=-1)
+        total_put_oi = put_oi.sum(axis=-1)
+        pcr = np.divide(total_put_oi, total_call_oi, out=np.zeros_like(total_put_oi, dtype=float), where=total_call_oi > 0)
+
+        pain = np.where(mask, cls.writer_pain(strikes, call_oi, put_oi), np.inf)
+        index = np.argmin(pain, axis=-1)
+        max_pain = np.where(mask.any(axis=-1), np.take_along_axis(strikes, index[:, None], axis=-1)[:, 0], 0)
+        return {
+            'total_call_oi': total_call_oi,
+            'total_put_oi': total_put_oi,
+            'pcr': pcr,
+            'max_pain': max_pain,
+            'max_pain_index': index
+        }
+
+class ChainBlockAnalyzer:
+    """
+    Multi-underlying, multi-expiry analytics over one (expiry x strike) block.
+    Each row is one (symbol, expiry) chain padded to the widest chain. IVs
+    and Greeks come from GreeksAnalyzer.analyze_block, GEX and OI from the
+    GEXAnalyzer/OIAnalyzer array helpers, so every row goes through the
+    same code as a single chain, in single vectorized calls.
+    """
+    FIELDS = ('strike', 'call_oi', 'put_oi', 'call_iv', 'put_iv', 'call_ltp', 'put_ltp')
+
+    def __init__(self, solve_iv=True, greeks_analyzer=None):
+        # Share the live loop's GreeksAnalyzer to share its IV seeds
+        self.greeks_analyzer = greeks_analyzer or GreeksAnalyzer(solve_iv=solve_iv)
+
+    @classmethod
+    def build_block(cls, snapshots):
+        """
+        snapshots: list of dicts with symbol, expiry, spot_price,
+        time_to_expiry and option_chain (see DataFetcher.fetch_chain_block).
+        Returns (R, N) arrays sorted by strike within each row; 'order' maps
+        each slot back to its index in the row's chain. Padding slots
+        repeat the row's last strike with zero OI and are False in 'mask'.
+        """
+        rows = [(snap.get('symbol', 'NIFTY'), snap.get('expiry')) for snap in snapshots]
+        # At least one (masked) column so per-row reductions work on empty chains
+        width = max((len(snap.get('option_chain', [])) for snap in snapshots), default=0) or 1
+        block = {f: np.full((len(snapshots), width), np.nan) for f in cls.FIELDS}
+        mask = np.zeros((len(snapshots), width), dtype=bool)
+        order = np.zeros((len(snapshots), width), dtype=np.int64)
+
+        for i, snap in enumerate(snapshots):
+            chain = snap.get('option_chain', [])
+            n = len(chain)
+            idx = sorted(range(n), key=lambda j: chain[j]['strike'])
+            for f in cls.FIELDS:
+                block[f][i, :n] = [chain[j].get(f, np.nan) for j in idx]
+            mask[i, :n] = True
+            order[i, :n] = idx
+            block['strike'][i, n:] = chain[idx[-1]]['strike'] if chain else 0
+
+        for f in ('call_oi', 'put_oi'):
+            block[f] = np.where(mask, np.nan_to_num(block[f]), 0.0)
+
+        block.update({
+            'rows': rows,
+            'mask': mask,
+            'order': order,
+            'spot': np.array([snap.get('spot_price', 0) for snap in snapshots], dtype=float),
+            'time_to_expiry': np.array([snap.get('time_to_expiry', 0.01) for snap in snapshots], dtype=float),
+            'lot_size': np.array([GEXAnalyzer.lot_size(symbol) for symbol, _ in rows], dtype=float)
+        })
+        return block
+
+    def analyze(self, snapshots):
+        block = self.build_block(snapshots)
+        rows, mask = block['rows'], block['mask']
+        K = block['strike']
+        S = block['spot'][:, None]
+        call_oi, put_oi = block['call_oi'], block['put_oi']
+
+        block_greeks = self.greeks_analyzer.analyze_block(block)
+        iv, greeks = block_greeks['iv'], block_greeks['greeks']
+        call_arrays = {g: v[0] for g, v in greeks.items()}
+        put_arrays = {g: v[1] for g, v in greeks.items()}
+
+        strike_gex = GEXAnalyzer.strike_gex(call_oi, put_oi, call_arrays['gamma'], put_arrays['gamma'], S, block['lot_size'][:, None])
+        net_gex = strike_gex.sum(axis=1)
+        oi = OIAnalyzer.summarize(K, call_oi, put_oi, mask)
+
+        has_chain = mask.any(axis=1)
+        row_idx = np.arange(len(rows))
+        atm = np.argmin(np.where(mask, np.abs(K - S), np.inf), axis=1)
+        atm_iv = np.where(has_chain, iv[:, row_idx, atm].mean(axis=0), 0)
+
+        term_structure = [
+            {
+                'symbol': symbol,
+                'expiry': expiry,
+                'time_to_expiry': float(block['time_to_expiry'][i]),
+                'spot_price': float(block['spot'][i]),
+                'atm_iv': round(float(atm_iv[i]), 4),
+                'net_gex': round(float(net_gex[i]), 2),
+                'pcr': round(float(oi['pcr'][i]), 3),
+                'max_pain': float(oi['max_pain'][i]),
+                'total_call_oi': int(oi['total_call_oi'][i]),
+                'total_put_oi': int(oi['total_put_oi'][i])
+            }
+            for i, (symbol, expiry) in enumerate(rows)
+        ]
+
+        return {
+            'rows': rows,
+            'spot': block['spot'],
+            'time_to_expiry': block['time_to_expiry'],
+            'strikes': K,
+            'mask': mask,
+            'call_iv': iv[0],
+            'put_iv': iv[1],
+            'call_arrays': call_arrays,
+            'put_arrays': put_arrays,
+            'strike_gex': strike_gex,
+            'net_gex': net_gex,
+            'pcr': oi['pcr'],
+            'max_pain': oi['max_pain'],
+            'atm_iv': atm_iv,
+            'term_structure': term_structure,
+            'block': block,
+            'block_greeks': block_greeks
+        }
+
+    def row_greeks(self, results, row):
+        """
+        GreeksAnalyzer.analyze output for one (symbol, expiry) row of an
+        analyze() result, without recomputing it; None if the row is absent.
+        """
+        if row not in results['rows']:
+            return None
+        return self.greeks_analyzer.row_view(results['block'], results['block_greeks'], results['rows'].index(row))
 
 class SmartMoneyAnalyzer:
     """
@@ -183,6 +541,148 @@ class Indicators:
         rs = gain / loss
         return 100 - (100 / (1 + rs))
 
+class StreamingEMA:
+    """
+    O(1) per-update counterpart of Indicators.ema (ewm, adjust=False).
+    """
+    def __init__(self, period=20):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+
+    def update(self, price):
+        self.value = price if self.value is None else self.alpha * price + (1 - self.alpha) * self.value
+        return self.value
+
+    def get_state(self):
+        return {'period': self.period, 'value': self.value}
+
+    @classmethod
+    def from_state(cls, state):
+        ind = cls(state['period'])
+        ind.value = state['value']
+        return ind
+
+class StreamingRSI:
+    """
+    O(1) per-update counterpart of Indicators.rsi.
+    smoothing='sma' keeps running sums over the last `period` changes and
+    matches the batch version; smoothing='wilder' uses Wilder's averages.
+    As in the batch version the first bar counts as a zero change, so a
+    value is available from the `period`-th bar on (NaN before that).
+    """
+    def __init__(self, period=14, smoothing='sma'):
+        if smoothing not in ('sma', 'wilder'):
+            raise ValueError(f"Unknown RSI smoothing: {smoothing}")
+        self.period = period
+        self.smoothing = smoothing
+        self.prev_price = None
+        self.window = deque(maxlen=period)  # (gain, loss) pairs, sma mode only
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.count = 0
+        self.value = np.nan
+
+    def update(self, price):
+        change = 0.0 if self.prev_price is None else price - self.prev_price
+        self.prev_price = price
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.count += 1
+
+        if self.smoothing == 'sma':
+            if len(self.window) == self.period:
+                old_gain, old_loss = self.window[0]
+                self.avg_gain -= old_gain / self.period
+                self.avg_loss -= old_loss / self.period
+            self.window.append((gain, loss))
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            # Running sums can leave tiny residues once a move leaves the window
+            if self.avg_gain < 1e-12: self.avg_gain = 0.0
+            if self.avg_loss < 1e-12: self.avg_loss = 0.0
+        elif self.count <= self.period:
+            # Wilder: seed with a simple average of the first `period` changes
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        if self.count >= self.period:
+            if self.avg_loss > 0:
+                self.value = 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+            else:
+                self.value = 100.0 if self.avg_gain > 0 else np.nan
+        return self.value
+
+    def get_state(self):
+        return {
+            'period': self.period,
+            'smoothing': self.smoothing,
+            'prev_price': self.prev_price,
+            'window': [list(w) for w in self.window],
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss,
+            'count': self.count,
+            'value': self.value
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        ind = cls(state['period'], state['smoothing'])
+        ind.prev_price = state['prev_price']
+        ind.window.extend(tuple(w) for w in state['window'])
+        ind.avg_gain = state['avg_gain']
+        ind.avg_loss = state['avg_loss']
+        ind.count = state['count']
+        ind.value = state['value']
+        return ind
+
+class StreamingVWAP:
+    """
+    O(1) per-update counterpart of Indicators.vwap.
+    Cumulative price*volume and volume restart at each new session date.
+    """
+    def __init__(self):
+        self.cum_pv = 0.0
+        self.cum_volume = 0.0
+        self.session = None
+        self.value = None
+
+    def reset(self, session=None):
+        self.cum_pv = 0.0
+        self.cum_volume = 0.0
+        self.session = session
+        self.value = None
+
+    def update(self, high, low, close, volume, timestamp=None):
+        if timestamp is not None:
+            session = pd.Timestamp(timestamp).date()
+            if session != self.session:
+                self.reset(session)
+
+        self.cum_pv += volume * (high + low + close) / 3
+        self.cum_volume += volume
+        self.value = self.cum_pv / self.cum_volume if self.cum_volume > 0 else close
+        return self.value
+
+    def get_state(self):
+        return {
+            'cum_pv': self.cum_pv,
+            'cum_volume': self.cum_volume,
+            'session': self.session.isoformat() if self.session else None,
+            'value': self.value
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        ind = cls()
+        ind.cum_pv = state['cum_pv']
+        ind.cum_volume = state['cum_volume']
+        ind.session = pd.Timestamp(state['session']).date() if state['session'] else None
+        ind.value = state['value']
+        return ind
+
 class IndexAlignment:
     @staticmethod
     def calculate(directions, weights):
@@ -0,0 +1,133 @@
+# core/backtest.py
+
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from core.pipeline import SignalPipeline
+from database.manager import DatabaseManager
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Mergeable per-pattern counters; rates are derived once all days are summed
+COUNTERS = ('occurrences', 'forward_n', 'forward_sum', 'forward_sq', 'up_moves', 'signals', 'wins', 'losses', 'pnl')
+
+def _signal_outcome(signal, path):
+    """
+    Walks the spot path after a signal: target first is a win, stop first
+    is a loss, otherwise the position is closed at the path's last spot.
+    Returns the P&L in index points, or None without any forward data.
+    """
+    if len(path) == 0:
+        return None
+    sign = 1.0 if signal['direction'] == 'LONG' else -1.0
+    move = sign * (path - signal['entry'])
+    target, stop = sign * (signal['target'] - signal['entry']), sign * (signal['entry'] - signal['stop_loss'])
+    hit_target, hit_stop = move >= target, move <= -stop
+    first_target = np.argmax(hit_target) if hit_target.any() else len(path)
+    first_stop = np.argmax(hit_stop) if hit_stop.any() else len(path)
+    if first_target < first_stop:
+        return target
+    if first_stop < first_target:
+        return -stop
+    return float(move[-1])
+
+def _replay_day(task):
+    """
+    Replays one trading day's snapshots through a fresh SignalPipeline.
+    Module-level so each day can run in its own worker process.
+    """
+    db_name, symbol, day, horizon = task
+    snapshots = DatabaseManager(db_name).get_market_snapshots(symbol, day)
+    pipeline = SignalPipeline()
+    spots = np.array([s['spot_price'] for s in snapshots], dtype=float)
+
+    patterns = {}
+    n_signals = 0
+    for i, market_data in enumerate(snapshots):
+        _, matched, signals = pipeline.run(market_data)
+        n_signals += len(signals)
+
+        path = spots[i + 1:i + 1 + horizon]
+        forward = float(path[-1] / spots[i] - 1) if len(path) else None
+
+        for p in matched:
+            stats = patterns.setdefault(p['name'], dict.fromkeys(COUNTERS, 0))
+            stats['occurrences'] += 1
+            if forward is not None:
+                stats['forward_n'] += 1
+                stats['forward_sum'] += forward
+                stats['forward_sq'] += forward * forward
+                stats['up_moves'] += int(forward > 0)
+
+        # Each signal counts only for the patterns that generated it
+        for signal in signals:
+            outcome = _signal_outcome(signal, path)
+            for name in signal.get('patterns', []):
+                stats = patterns.setdefault(name, dict.fromkeys(COUNTERS, 0))
+                stats['signals'] += 1
+                if outcome is not None:
+                    stats['wins'] += int(outcome > 0)
+                    stats['losses'] += int(outcome <= 0)
+                    stats['pnl'] += outcome
+
+    return {'day': day, 'cycles': len(snapshots), 'signals': n_signals, 'patterns': patterns}
+
+class BacktestEngine:
+    """
+    Historical replay of stored market snapshots through the same
+    per-snapshot pipeline as ANZAOptionsAnalyzer.run_continuous_analysis,
+    back to back without the cycle sleeps. Every trading day is replayed in
+    its own worker process; the per-day counters are merged into
+    per-pattern statistics (forward spot return over `horizon` cycles and
+    the outcome of the signals each pattern generated).
+    """
+    def __init__(self, db_name=settings.DB_NAME, workers=None, horizon=15):
+        self.db_name = db_name
+        self.workers = workers or os.cpu_count() or 1
+        self.horizon = horizon
+
+    def run(self, symbol='NIFTY', start=None, end=None):
+        started = time.perf_counter()
+        days = DatabaseManager(self.db_name).get_snapshot_days(symbol, start, end)
+        tasks = [(self.db_name, symbol, day, self.horizon) for day in days]
+
+        if self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as pool:
+                results = list(pool.map(_replay_day, tasks))
+        else:
+            results = [_replay_day(task) for task in tasks]
+
+        merged = {}
+        for day in results:
+            for name, stats in day['patterns'].items():
+                total = merged.setdefault(name, dict.fromkeys(COUNTERS, 0))
+                for key in COUNTERS:
+                    total[key] += stats[key]
+
+        patterns = {}
+        for name, s in merged.items():
+            n, resolved = s['forward_n'], s['wins'] + s['losses']
+            mean = s['forward_sum'] / n if n else float('nan')
+            patterns[name] = {
+                'occurrences': s['occurrences'],
+                'mean_forward_return': mean,
+                'forward_return_std': float(np.sqrt(max(s['forward_sq'] / n - mean * mean, 0))) if n else float('nan'),
+                'up_rate': s['up_moves'] / n if n else float('nan'),
+                'signals': s['signals'],
+                'win_rate': s['wins'] / resolved if resolved else float('nan'),
+                'total_pnl': round(s['pnl'], 2)
+            }
+
+        elapsed = time.perf_counter() - started
+        cycles = sum(d['cycles'] for d in results)
+        logger.info(f"Backtest replayed {cycles} cycles over {len(days)} days in {elapsed:.1f}s")
+        return {
+            'days': days,
+            'cycles': cycles,
+            'signals': sum(d['signals'] for d in results),
+            'patterns': patterns,
+            'elapsed': elapsed
+        }
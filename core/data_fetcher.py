@@ -2,17 +2,39 @@
 
 import logging
 import asyncio
-from datetime import datetime
+import numpy as np
+from datetime import datetime, date, timedelta
+from core.greeks_engine import GreeksEngine
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Demo-mode reference levels and strike spacing per underlying
+MOCK_SPOTS = {'NIFTY': 24500.0, 'BANKNIFTY': 52000.0}
+STRIKE_STEPS = {'NIFTY': 50, 'BANKNIFTY': 100}
+
+# Per-source fetch timeouts in seconds
+SOURCE_TIMEOUTS = {'spot_price': 2.0, 'option_chain': 5.0, 'chain_block': 6.0, 'institutional_flow': 5.0, 'heavyweights': 3.0}
+
+# Seconds without ticks after which a live chain snapshot counts as stale
+MAX_TICK_AGE = 10.0
+
 class DataFetcher:
     """
     Handles data retrieval from Angel One Broker API.
     Provides a unified market data object for the analyzers.
     """
-    def __init__(self, angel_service):
+    def __init__(self, angel_service, simulator=None, source_timeouts=None, cycle_deadline=8.0, live_chain=None, instruments=None, quotes=None, block_symbols=None,
+                 max_tick_age=MAX_TICK_AGE):
         self.angel = angel_service
+        self.simulator = simulator  # Optional core.simulator.MarketSimulator driving every feed
+        self.live_chain = live_chain  # Optional core.live_chain.LiveChain kept current by a tick feed
+        self.instruments = instruments  # Optional services.instrument_master.InstrumentMaster
+        self.quotes = quotes  # Optional services.quote_client.QuoteClient; live quotes need instruments too
+        self.block_symbols = block_symbols  # When set, every listed expiry of these is fetched as one chain block
+        self.source_timeouts = {**SOURCE_TIMEOUTS, **(source_timeouts or {})}
+        self.cycle_deadline = cycle_deadline  # Seconds for the whole snapshot
+        self.max_tick_age = max_tick_age
         self.last_data = None
 
     async def fetch_all_data(self, symbol="NIFTY", expiry=None):
@@ -20,30 +42,84 @@ class DataFetcher:
         Main entry point for data collection.
         In demo mode, this returns simulated data.
         In live mode, it calls Angel One.
+        All sources are fetched concurrently, each under its own timeout and
+        all of them under cycle_deadline. A source that fails or is late is
+        filled from last_data and listed in the snapshot's 'stale_fields';
+        without a spot or chain to fall back on, last_data is returned.
+        In streaming mode spot and chain come from one live_chain snapshot,
+        listed as stale when no tick arrived within max_tick_age seconds.
+        With block_symbols, the chain block (all expiries of those
+        underlyings) is one source and the front chain is its row for
+        symbol, so no chain is fetched twice.
         """
         try:
-            # 1. Fetch Spot Price
-            spot_price = await self.fetch_spot(symbol)
+            # A simulated market moves one cycle forward per snapshot, unless a tick feed drives it
+            if self.simulator is not None and self.live_chain is None:
+                self.simulator.advance(settings.UPDATE_INTERVAL_SECONDS)
 
-            # 2. Fetch Option Chain
-            option_chain = await self.fetch_option_chain(symbol, expiry)
+            sources = {
+                'institutional_flow': self.fetch_institutional_flow(),
+                'heavyweights': self.fetch_heavyweights()
+            }
+            if self.block_symbols:
+                sources['chain_block'] = self.fetch_chain_block(self.block_symbols)
+            elif self.live_chain is None:
+                sources['spot_price'] = self.fetch_spot(symbol)
+                sources['option_chain'] = self.fetch_option_chain(symbol, expiry)
+            results = await self._gather_sources(sources)
 
-            # 3. Fetch Institutional Data
-            fii_dii = await self.fetch_institutional_flow()
+            timestamp = self.simulator.now if self.simulator is not None else datetime.now()
+            block = results.get('chain_block')
+            front = None
+            if block:
+                front = next((snap for snap in block if snap['symbol'] == symbol and expiry in (None, snap['expiry'])), None)
+            if front is not None:
+                expiry = front['expiry']
+                results['spot_price'], results['option_chain'] = front['spot_price'], front['option_chain']
 
-            # 4. Fetch Heavyweights
-            heavyweights = await self.fetch_heavyweights()
+            frozen = False
+            if self.live_chain is not None:
+                live = self.live_chain.snapshot()
+                frozen = live is not None and live['age'] > self.max_tick_age
+                if frozen:
+                    logger.warning(f"No ticks for {live['age']:.1f}s; spot and chain are stale")
+                expiry = self.live_chain.expiry
+                results['spot_price'] = live['spot_price'] if live else None
+                results['option_chain'] = live['option_chain'] if live else None
+                timestamp = live['timestamp'] if live else timestamp
+                # Keep the block's front row consistent with the streamed chain
+                if live and front is not None and front['expiry'] == expiry:
+                    front.update(spot_price=live['spot_price'], option_chain=live['option_chain'])
 
+            fii_dii = results['institutional_flow']
             data = {
-                'timestamp': datetime.now(),
+                'timestamp': timestamp,
                 'symbol': symbol,
-                'spot_price': spot_price,
-                'option_chain': option_chain,
+                'spot_price': results.get('spot_price'),
+                'option_chain': results.get('option_chain'),
                 'time_to_expiry': self._calculate_t_expiry(expiry),
-                'fii_net_cash': fii_dii['fii'],
-                'dii_net_cash': fii_dii['dii'],
-                'heavyweights': heavyweights
+                'fii_net_cash': fii_dii['fii'] if fii_dii is not None else None,
+                'dii_net_cash': fii_dii['dii'] if fii_dii is not None else None,
+                'heavyweights': results['heavyweights']
             }
+            if self.block_symbols:
+                data['chain_block'] = block
+
+            # Carry missing fields over from the previous snapshot and mark them
+            stale = [field for field, value in data.items() if value is None]
+            for field in stale:
+                if self.last_data is None or self.last_data.get(field) is None:
+                    if field in ('spot_price', 'option_chain'):
+                        logger.error(f"No {field} this cycle and nothing cached to fall back on")
+                        return self.last_data
+                    data[field] = {} if field == 'heavyweights' else [] if field == 'chain_block' else 0
+                else:
+                    data[field] = self.last_data[field]
+            if frozen:
+                # The frozen snapshot is still the latest state; keep it but flag it
+                stale += ['spot_price', 'option_chain']
+            data['stale_fields'] = stale
+            data['expiry'] = expiry
 
             self.last_data = data
             return data
@@ -52,40 +128,143 @@ class DataFetcher:
             logger.error(f"Error fetching data: {e}")
             return self.last_data # Return cached data on failure
 
+    async def _gather_sources(self, sources):
+        """
+        Runs the source coroutines concurrently. Returns {name: result}, with
+        None for sources that raised, timed out or missed the cycle deadline.
+        """
+        tasks = {
+            name: asyncio.create_task(asyncio.wait_for(coro, timeout=self.source_timeouts.get(name)))
+            for name, coro in sources.items()
+        }
+        done, pending = await asyncio.wait(tasks.values(), timeout=self.cycle_deadline)
+        for task in pending:
+            task.cancel()
+
+        results = {}
+        for name, task in tasks.items():
+            if task in pending:
+                logger.warning(f"{name} missed the {self.cycle_deadline}s cycle deadline")
+                results[name] = None
+            elif task.exception() is not None:
+                error = task.exception()
+                reason = "timed out" if isinstance(error, asyncio.TimeoutError) else f"failed: {error}"
+                logger.warning(f"{name} {reason}")
+                results[name] = None
+            else:
+                results[name] = task.result()
+        return results
+
+    async def fetch_chain_block(self, symbols=("NIFTY", "BANKNIFTY"), expiries=None):
+        """
+        Fetches every listed expiry of each underlying as a list of chain
+        snapshots, the input expected by ChainBlockAnalyzer.
+        """
+        spots = await asyncio.gather(*(self.fetch_spot(s) for s in symbols))
+        pairs = []
+        for symbol in symbols:
+            for expiry in (expiries or await self.fetch_expiries(symbol)):
+                pairs.append((symbol, expiry))
+
+        chains = await asyncio.gather(*(self.fetch_option_chain(s, e) for s, e in pairs))
+        spot_map = dict(zip(symbols, spots))
+        return [
+            {
+                'symbol': symbol,
+                'expiry': expiry,
+                'spot_price': spot_map[symbol],
+                'time_to_expiry': self._calculate_t_expiry(expiry),
+                'option_chain': chain
+            }
+            for (symbol, expiry), chain in zip(pairs, chains)
+        ]
+
+    async def fetch_expiries(self, symbol, count=4):
+        if self.simulator is not None:
+            return self.simulator.expiries[:count]
+        if self.instruments is not None:
+            today = date.today().isoformat()
+            return [e for e in self.instruments.expiries(symbol) if e >= today][:count]
+        # Without an instrument master: the next `count` weekly Thursday expiries
+        today = date.today()
+        first = today + timedelta(days=(3 - today.weekday()) % 7)
+        return [(first + timedelta(weeks=i)).isoformat() for i in range(count)]
+
     async def fetch_spot(self, symbol):
-        # In a real implementation, call self.angel.get_ltp()
-        # For now, return a placeholder or dummy
-        return 24500.0
+        if self.simulator is not None:
+            return self.simulator.spot(symbol)
+        if self.quotes is not None and self.instruments is not None:
+            token = self.instruments.spot_token(symbol)
+            quote = (await self.quotes.quotes([token], exchange="NSE", mode="LTP"))[token]
+            return quote['ltp'] if quote else None
+        # Without live quotes: a fixed demo level
+        return MOCK_SPOTS.get(symbol, 24500.0)
 
     async def fetch_option_chain(self, symbol, expiry):
-        # In a real implementation, call self.angel.get_option_chain()
-        # Mocking a structure for Greeks/GEX to work
-        chain = []
-        spot = 24500
-        for i in range(-10, 11):
-            strike = (spot // 100 * 100) + (i * 50)
-            chain.append({
-                'strike': strike,
-                'call_ltp': 100 + (spot - strike) * 0.5,
-                'put_ltp': 100 + (strike - spot) * 0.5,
-                'call_oi': 50000 + abs(i) * 1000,
-                'put_oi': 40000 + abs(i) * 1000,
-                'call_iv': 0.15 + (abs(i) * 0.005),
-                'put_iv': 0.16 + (abs(i) * 0.005),
-            })
-        return chain
+        if self.simulator is not None:
+            return self.simulator.option_chain(symbol, expiry)
+        if self.quotes is not None and self.instruments is not None:
+            return await self._quote_chain(symbol, expiry or (await self.fetch_expiries(symbol, 1))[0])
+        # Without live quotes: a mock structure for Greeks/GEX to work, priced
+        # at its own IVs so that IVs solved from the LTPs match them
+        spot = int(MOCK_SPOTS.get(symbol, 24500))
+        step = STRIKE_STEPS.get(symbol, 50)
+        i = np.arange(-10, 11)
+        strikes = (spot // 100 * 100) + i * step
+        call_iv, put_iv = 0.15 + np.abs(i) * 0.005, 0.16 + np.abs(i) * 0.005
+        t = self._calculate_t_expiry(expiry)
+        # Exchange tick of 0.05, never below one tick
+        call_ltp = np.maximum(np.round(GreeksEngine.compute(True, spot, strikes, t, settings.RISK_FREE_RATE, call_iv)['price'] * 20) / 20, 0.05)
+        put_ltp = np.maximum(np.round(GreeksEngine.compute(False, spot, strikes, t, settings.RISK_FREE_RATE, put_iv)['price'] * 20) / 20, 0.05)
+        return [
+            {
+                'strike': k,
+                'call_ltp': c,
+                'put_ltp': p,
+                'call_oi': 50000 + abs(j) * 1000,
+                'put_oi': 40000 + abs(j) * 1000,
+                'call_iv': round(civ, 4),
+                'put_iv': round(piv, 4),
+            }
+            for j, k, c, p, civ, piv in zip(i.tolist(), strikes.tolist(), call_ltp.tolist(), put_ltp.tolist(), call_iv.tolist(), put_iv.tolist())
+        ]
+
+    async def _quote_chain(self, symbol, expiry):
+        """
+        Chain rows from batched quotes of every listed strike of the expiry.
+        """
+        instruments = self.instruments.chain(symbol, expiry)
+        quotes = await self.quotes.quotes([i['token'] for i in instruments])
+        rows = {}
+        for inst in instruments:
+            quote = quotes.get(inst['token'])
+            if quote is None:
+                continue
+            prefix = 'call' if inst['type'] == 'CE' else 'put'
+            row = rows.setdefault(inst['strike'], {'strike': inst['strike'], 'call_ltp': None, 'put_ltp': None, 'call_oi': 0, 'put_oi': 0})
+            row[f'{prefix}_ltp'] = quote.get('ltp')
+            row[f'{prefix}_oi'] = quote.get('opnInterest', 0)
+        return [row for row in rows.values() if row['call_ltp'] is not None and row['put_ltp'] is not None]
 
     async def fetch_institutional_flow(self):
+        if self.simulator is not None:
+            return self.simulator.institutional_flow()
         # This would typically scrape NSE or use a premium API
         return {'fii': 1250, 'dii': 800} # Net values in Crores
 
     async def fetch_heavyweights(self):
+        if self.simulator is not None:
+            return self.simulator.heavyweights()
         # Simulated movers for Nifty Heavyweights
-        import numpy as np
         stocks = ["RELIANCE", "HDFCBANK", "ICICIBANK", "INFY", "TCS", "SBIN", "LT", "TATAMOTORS", "AXISBANK"]
         return {s: round(np.random.uniform(-2.0, 3.0), 2) for s in stocks}
 
     def _calculate_t_expiry(self, expiry_str):
-        # Calculate years remaining until expiry
-        # Placeholder
-        return 0.02 # ~1 week
+        # Calculate years remaining until expiry (15:30 close on expiry day)
+        if self.simulator is not None:
+            return self.simulator.time_to_expiry(expiry_str)
+        if not expiry_str:
+            return 0.02 # ~1 week placeholder when no expiry is given
+        expiry_dt = datetime.fromisoformat(str(expiry_str)).replace(hour=15, minute=30)
+        seconds = (expiry_dt - datetime.now()).total_seconds()
+        return max(seconds, 60) / (365 * 24 * 3600)
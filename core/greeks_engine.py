@@ -0,0 +1,281 @@
+# core/greeks_engine.py
+
+import numpy as np
+from scipy.special import ndtr
+import logging
+
+logger = logging.getLogger(__name__)
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+GREEK_KEYS = ('delta', 'gamma', 'theta', 'vega', 'vanna', 'vomma', 'charm')
+RESULT_KEYS = ('price',) + GREEK_KEYS
+
+# Decimal places used by every dict view of the Greeks
+ROUNDING = {'delta': 4, 'gamma': 6, 'theta': 4, 'vega': 4, 'vanna': 6, 'vomma': 6, 'charm': 6}
+
+class GreeksEngine:
+    """
+    Shared Black-Scholes engine used by GreeksAnalyzer and market_engine.Greeks.
+    First- and second-order Greeks are computed together so that d1, d2 and
+    the normal pdf/cdf are evaluated only once per option.
+    """
+    @staticmethod
+    def compute(is_call, S, K, t, r, sigma):
+        """
+        Vectorized Greeks for any number of options in one pass.
+        is_call: bool array (True for calls, False for puts)
+        S, K, t, sigma: arrays or scalars, broadcast against each other
+        r: Risk free rate
+        Returns a dict of unrounded arrays:
+            price
+            delta, gamma
+            theta  - per calendar day
+            vega   - per 1% IV
+            vanna  - change in delta per 1% IV
+            vomma  - change in vega (per 1% IV) per 1% IV
+            charm  - delta decay per calendar day
+        Entries with non-positive spot, strike, time or IV get zero Greeks.
+        """
+        is_call, S, K, t, sigma = np.broadcast_arrays(
+            np.asarray(is_call, dtype=bool), *(np.asarray(x, dtype=float) for x in (S, K, t, sigma))
+        )
+        valid = (S > 0) & (K > 0) & (t > 0) & (sigma > 0)
+
+        # Swap in harmless values for invalid entries so no warnings are raised
+        S_, K_, t_, sigma_ = (np.where(valid, x, 1.0) for x in (S, K, t, sigma))
+
+        sqrt_t = np.sqrt(t_)
+        vol_t = sigma_ * sqrt_t
+        d1 = (np.log(S_ / K_) + (r + 0.5 * sigma_ ** 2) * t_) / vol_t
+        d2 = d1 - vol_t
+
+        pdf_d1 = np.exp(-0.5 * d1 * d1) / SQRT_2PI
+        sign = np.where(is_call, 1.0, -1.0)
+        cdf_d1 = ndtr(sign * d1)  # N(d1) for calls, N(-d1) for puts
+        cdf_d2 = ndtr(sign * d2)
+        disc_k = K_ * np.exp(-r * t_)
+
+        price = sign * (S_ * cdf_d1 - disc_k * cdf_d2)
+        delta = sign * cdf_d1
+        gamma = pdf_d1 / (S_ * vol_t)
+        theta = -(S_ * pdf_d1 * sigma_) / (2 * sqrt_t) - sign * r * disc_k * cdf_d2
+        vega = S_ * pdf_d1 * sqrt_t
+
+        # Second order: identical for calls and puts without dividends
+        vanna = -pdf_d1 * d2 / sigma_
+        vomma = vega * d1 * d2 / sigma_
+        charm = -pdf_d1 * (2 * r * t_ - d2 * vol_t) / (2 * t_ * vol_t)
+
+        return {
+            'price': np.where(valid, price, 0.0),
+            'delta': np.where(valid, delta, 0.0),
+            'gamma': np.where(valid, gamma, 0.0),
+            'theta': np.where(valid, theta / 365, 0.0),
+            'vega': np.where(valid, vega / 100, 0.0),
+            'vanna': np.where(valid, vanna / 100, 0.0),
+            'vomma': np.where(valid, vomma / 10000, 0.0),
+            'charm': np.where(valid, charm / 365, 0.0)
+        }
+
+    @staticmethod
+    def gamma(S, K, t, r, sigma):
+        """
+        Gamma only (identical for calls and puts), broadcast over the inputs.
+        Cheaper than compute() when re-pricing a chain over many spot levels.
+        """
+        S, K, t, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, t, sigma)))
+        valid = (S > 0) & (K > 0) & (t > 0) & (sigma > 0)
+        S_, K_, t_, sigma_ = (np.where(valid, x, 1.0) for x in (S, K, t, sigma))
+
+        vol_t = sigma_ * np.sqrt(t_)
+        d1 = (np.log(S_ / K_) + (r + 0.5 * sigma_ ** 2) * t_) / vol_t
+        gamma = np.exp(-0.5 * d1 * d1) / SQRT_2PI / (S_ * vol_t)
+        return np.where(valid, gamma, 0.0)
+
+    @staticmethod
+    def price_vega(is_call, S, K, t, r, sigma):
+        """
+        Black-Scholes price and raw vega (dPrice/dSigma) only.
+        Inputs must already be valid; used in the IV solver's inner loop.
+        """
+        sqrt_t = np.sqrt(t)
+        vol_t = sigma * sqrt_t
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * t) / vol_t
+        d2 = d1 - vol_t
+        sign = np.where(is_call, 1.0, -1.0)
+        price = sign * (S * ndtr(sign * d1) - K * np.exp(-r * t) * ndtr(sign * d2))
+        vega = S * np.exp(-0.5 * d1 * d1) / SQRT_2PI * sqrt_t
+        return price, vega
+
+    @staticmethod
+    def to_dict_view(keys, greeks):
+        """
+        Per-key dict view of batch Greeks, rounded per ROUNDING.
+        """
+        columns = [np.round(greeks[g], ROUNDING[g]).tolist() for g in GREEK_KEYS]
+        return {k: dict(zip(GREEK_KEYS, row)) for k, *row in zip(keys, *columns)}
+
+    @staticmethod
+    def calculate(flag, S, K, t, r, sigma):
+        """
+        Scalar Greeks for a single option as a rounded dict.
+        flag: 'c' or 'p'
+        """
+        if t <= 0:
+            return dict.fromkeys(GREEK_KEYS, 0)
+
+        try:
+            greeks = GreeksEngine.compute(flag == 'c', S, K, t, r, sigma)
+            return GreeksEngine.to_dict_view([K], {k: np.atleast_1d(v) for k, v in greeks.items()})[K]
+        except Exception as e:
+            logger.error(f"Error calculating Greeks: {e}")
+            return dict.fromkeys(GREEK_KEYS, 0)
+
+class GreeksCache:
+    """
+    Optional memo around GreeksEngine.compute with one slot per (row, flag,
+    strike), row telling apart chains (e.g. expiries) priced in one call. A slot is reused while spot (i.e. moneyness, the strike being fixed), IV
+    and time stay within tolerance of the inputs it was priced at. Black-
+    Scholes is homogeneous in (S, K), so Greeks are stored per unit spot and
+    rescaled to the current spot on a hit. Lookups and tolerance checks are
+    vectorized, and the slot positions of the last chain layout are reused,
+    so an all-hit call costs a handful of array operations; only the missed
+    options are recomputed (in one batch), and the least recently used
+    slots are evicted beyond max_size.
+    """
+    # Power of spot each result scales with at fixed moneyness
+    SPOT_POWER = {g: {'gamma': -1, 'delta': 0, 'vanna': 0, 'charm': 0}.get(g, 1) for g in RESULT_KEYS}
+    # Slot keys are row * ROW_STRIDE +/- strike, so strikes must stay below ROW_STRIDE / 2
+    ROW_STRIDE = float(1 << 22)
+
+    def __init__(self, moneyness_tol=1e-5, iv_tol=0.0005, t_tol=1 / (365 * 24 * 12), max_size=50000):
+        self.moneyness_tol = moneyness_tol  # Relative spot move; default about a quarter point on NIFTY
+        self.iv_tol = iv_tol
+        self.t_tol = t_tol  # Default: 5 minutes, in years
+        self.max_size = max_size
+        self.r = None
+        self.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.last_hits = 0
+        self.last_misses = 0
+
+    def _scaled(self, greeks, S, inverse=False):
+        out = {}
+        for g, values in greeks.items():
+            power = -self.SPOT_POWER[g] if inverse else self.SPOT_POWER[g]
+            out[g] = values * S if power == 1 else values / S if power == -1 else values
+        return out
+
+    def compute(self, is_call, S, K, t, r, sigma, row=0):
+        """
+        Same contract as GreeksEngine.compute, served from the cache where possible.
+        row: non-negative integer id(s) of the chain each option belongs to,
+            broadcast like the other inputs; options of different rows never
+            share a slot.
+        """
+        is_call, S, K, t, sigma, row = np.broadcast_arrays(
+            np.asarray(is_call, dtype=bool), *(np.asarray(x, dtype=float) for x in (S, K, t, sigma, row))
+        )
+        shape = S.shape
+        is_call, S, K, t, sigma, row = (x.ravel() for x in (is_call, S, K, t, sigma, row))
+        if r != self.r:
+            self.clear()
+            self.r = r
+
+        # Strikes are positive, so the sign of the key's offset carries the flag
+        key = row * self.ROW_STRIDE + np.where(is_call, K, -K)
+        if self._last_key is not None and np.array_equal(key, self._last_key):
+            pos, found = self._last_pos, np.ones(len(key), dtype=bool)
+        elif len(self._keys):
+            pos = np.minimum(np.searchsorted(self._keys, key), len(self._keys) - 1)
+            found = self._keys[pos] == key
+        else:
+            pos, found = np.zeros(len(key), dtype=np.int64), np.zeros(len(key), dtype=bool)
+
+        spot = np.where(S > 0, S, 1.0)
+        if len(self._keys):
+            S0 = self._spot[pos]
+            hit = (found & (np.abs(S - S0) <= self.moneyness_tol * S0)
+                   & (np.abs(self._iv[pos] - sigma) <= self.iv_tol) & (np.abs(self._t[pos] - t) <= self.t_tol))
+        else:
+            hit = found
+        self._clock += 1
+
+        if hit.all():
+            self._used[pos] = self._clock
+            result = self._scaled({g: v[pos] for g, v in self._greeks.items()}, spot)
+            self.last_hits, self.last_misses = len(key), 0
+        else:
+            result = {g: np.empty(len(key)) for g in RESULT_KEYS}
+            hit_pos = pos[hit]
+            self._used[hit_pos] = self._clock
+            cached = self._scaled({g: v[hit_pos] for g, v in self._greeks.items()}, spot[hit])
+            missed = np.flatnonzero(~hit)
+            fresh = GreeksEngine.compute(is_call[missed], S[missed], K[missed], t[missed], r, sigma[missed])
+            for g in RESULT_KEYS:
+                result[g][hit] = cached[g]
+                result[g][missed] = fresh[g]
+            self._store(key, missed, found[missed], pos[missed], S, sigma, t, self._scaled(fresh, spot[missed], inverse=True))
+            self.last_hits, self.last_misses = len(key) - len(missed), len(missed)
+
+        self.hits += self.last_hits
+        self.misses += self.last_misses
+        return {g: result[g].reshape(shape) for g in RESULT_KEYS}
+
+    def _store(self, key, missed, found, pos, S, sigma, t, greeks):
+        # Existing slots are overwritten in place, new ones merged in key order
+        at = pos[found]
+        for column, values in ((self._spot, S), (self._iv, sigma), (self._t, t)):
+            column[at] = values[missed[found]]
+        for g in RESULT_KEYS:
+            self._greeks[g][at] = greeks[g][found]
+        self._used[at] = self._clock
+
+        new_keys, first = np.unique(key[missed[~found]], return_index=True)
+        if len(new_keys):
+            rows = np.flatnonzero(~found)[first]
+            src = missed[rows]
+            keys = np.concatenate([self._keys, new_keys])
+            order = np.argsort(keys, kind='stable')
+            self._keys = keys[order]
+            self._spot = np.concatenate([self._spot, S[src]])[order]
+            self._iv = np.concatenate([self._iv, sigma[src]])[order]
+            self._t = np.concatenate([self._t, t[src]])[order]
+            self._greeks = {g: np.concatenate([v, greeks[g][rows]])[order] for g, v in self._greeks.items()}
+            self._used = np.concatenate([self._used, np.full(len(rows), self._clock)])[order]
+
+        excess = len(self._keys) - self.max_size
+        if excess > 0:
+            keep = np.sort(np.argsort(self._used, kind='stable')[excess:])
+            self._keys, self._spot, self._iv, self._t, self._used = (
+                x[keep] for x in (self._keys, self._spot, self._iv, self._t, self._used)
+            )
+            self._greeks = {g: v[keep] for g, v in self._greeks.items()}
+            self.evictions += excess
+
+        # Remember this layout's slots when every option now has one
+        pos = np.minimum(np.searchsorted(self._keys, key), len(self._keys) - 1)
+        self._last_key, self._last_pos = (key, pos) if np.array_equal(self._keys[pos], key) else (None, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._keys),
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'last_hits': self.last_hits,
+            'last_misses': self.last_misses
+        }
+
+    def clear(self):
+        self._keys = np.empty(0)
+        self._spot, self._iv, self._t = np.empty(0), np.empty(0), np.empty(0)
+        self._greeks = {g: np.empty(0) for g in RESULT_KEYS}
+        self._used = np.empty(0, dtype=np.int64)
+        self._clock = 0
+        self._last_key, self._last_pos = None, None
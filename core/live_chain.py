@@ -0,0 +1,121 @@
+# core/live_chain.py
+
+import threading
+import time
+import numpy as np
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SmartAPI exchange types for subscriptions
+EXCHANGE_NSE, EXCHANGE_NFO = 1, 2
+
+class LiveChain:
+    """
+    In-memory option chain kept current by streaming ticks.
+    Ticks (SmartAPI tick dicts: token, last_traded_price in paise,
+    open_interest) are applied in place to per-strike arrays under a lock;
+    a batch of ticks is applied atomically, so snapshot() always returns
+    one consistent state of spot, futures and every strike, along with its
+    age in wall-clock seconds since the last batch arrived.
+    """
+    def __init__(self, symbol, expiry, spot_token, instruments, futures_token=None, clock=None):
+        """
+        instruments: list of {'token', 'strike', 'type': 'CE'|'PE'} for one expiry
+        clock: callable returning the current time (datetime.now by default)
+        """
+        self.symbol = symbol
+        self.expiry = expiry
+        self.spot_token = str(spot_token)
+        self.futures_token = str(futures_token) if futures_token is not None else None
+        self.clock = clock or datetime.now
+
+        self.strikes = np.array(sorted({float(i['strike']) for i in instruments}))
+        row = {k: j for j, k in enumerate(self.strikes.tolist())}
+        # token -> (side row: 0 calls / 1 puts, strike column)
+        self._index = {str(i['token']): (0 if i['type'] == 'CE' else 1, row[float(i['strike'])]) for i in instruments}
+
+        self._ltp = np.full((2, len(self.strikes)), np.nan)
+        self._oi = np.zeros((2, len(self.strikes)), dtype=np.int64)
+        self._spot = np.nan
+        self._futures = np.nan
+        self._lock = threading.Lock()
+        self.sequence = 0          # Ticks applied so far
+        self.last_tick_at = None
+        self._received_at = None   # time.monotonic() of the last batch
+
+    @property
+    def tokens(self):
+        return [self.spot_token] + ([self.futures_token] if self.futures_token else []) + list(self._index)
+
+    def token_list(self):
+        """
+        Subscription list in the SmartWebSocketV2 format.
+        """
+        nfo = ([self.futures_token] if self.futures_token else []) + list(self._index)
+        return [
+            {'exchangeType': EXCHANGE_NSE, 'tokens': [self.spot_token]},
+            {'exchangeType': EXCHANGE_NFO, 'tokens': nfo}
+        ]
+
+    def apply_ticks(self, ticks):
+        """
+        Applies a batch of ticks atomically; unknown tokens are ignored.
+        """
+        with self._lock:
+            for tick in ticks:
+                token = str(tick.get('token'))
+                price = tick.get('last_traded_price')
+                if price is None:
+                    continue
+                price = price / 100  # SmartAPI quotes in paise
+                if token == self.spot_token:
+                    self._spot = price
+                elif token == self.futures_token:
+                    self._futures = price
+                elif token in self._index:
+                    side, col = self._index[token]
+                    self._ltp[side, col] = price
+                    if tick.get('open_interest') is not None:
+                        self._oi[side, col] = tick['open_interest']
+                else:
+                    continue
+                self.sequence += 1
+            self.last_tick_at = self.clock()
+            self._received_at = time.monotonic()
+
+    def apply_tick(self, tick):
+        self.apply_ticks([tick])
+
+    def snapshot(self):
+        """
+        A consistent copy of the chain in the DataFetcher layout, or None
+        before the first spot tick. IVs are left to the analyzers, which
+        solve them from the LTPs.
+        """
+        with self._lock:
+            if np.isnan(self._spot):
+                return None
+            ltp, oi = self._ltp.copy(), self._oi.copy()
+            spot, futures, sequence, last_tick_at = self._spot, self._futures, self.sequence, self.last_tick_at
+            age = time.monotonic() - self._received_at
+
+        quoted = ~np.isnan(ltp).all(axis=0)
+        chain = [
+            {'strike': k, 'call_ltp': c, 'put_ltp': p, 'call_oi': coi, 'put_oi': poi}
+            for k, c, p, coi, poi in zip(
+                self.strikes[quoted].tolist(), ltp[0, quoted].tolist(), ltp[1, quoted].tolist(),
+                oi[0, quoted].tolist(), oi[1, quoted].tolist()
+            )
+        ]
+        return {
+            'timestamp': last_tick_at,
+            'symbol': self.symbol,
+            'expiry': self.expiry,
+            'spot_price': spot,
+            'futures_price': None if np.isnan(futures) else futures,
+            'option_chain': chain,
+            'sequence': sequence,
+            'age': age
+        }
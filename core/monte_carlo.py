@@ -0,0 +1,165 @@
+# core/monte_carlo.py
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from core.strategy_engine import StrategyLab
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+def _simulate_chunk(task):
+    """
+    One chunk of Monte Carlo paths, evaluated against every strategy.
+    Module-level so it can be shipped to a process pool. Returns partial
+    sums that merge exactly across chunks, plus the chunk's worst outcomes
+    for the CVaR tail.
+    """
+    seed, n_paths, leg_matrix, spot, iv, t, drift, steps, antithetic, tail_size = task
+    rng = np.random.default_rng(seed)
+    half = n_paths // 2 if antithetic else n_paths
+    n_steps = steps or 1
+    dt = t / n_steps
+
+    z = rng.standard_normal((half, n_steps))
+    if antithetic:
+        z = np.concatenate([z, -z])
+    log_paths = np.cumsum((drift - 0.5 * iv * iv) * dt + iv * np.sqrt(dt) * z, axis=1)
+    paths = spot * np.exp(log_paths)
+
+    pnl, _ = StrategyLab.calculate_payoff_batch(paths[:, -1], leg_matrix)  # (strategy, path)
+    profit = pnl > 0
+
+    # Antithetic pairs are not independent; the error is estimated over pair means
+    if antithetic:
+        pair_pnl = 0.5 * (pnl[:, :half] + pnl[:, half:])
+        pair_win = 0.5 * (profit[:, :half].astype(float) + profit[:, half:])
+    else:
+        pair_pnl, pair_win = pnl, profit.astype(float)
+
+    k = min(tail_size, pnl.shape[1])
+    tail = np.partition(pnl, k - 1, axis=1)[:, :k]
+
+    result = {
+        'n': pnl.shape[1],
+        'n_pairs': pair_pnl.shape[1],
+        'wins': profit.sum(axis=1),
+        'pnl_sum': pnl.sum(axis=1),
+        'pair_pnl_sum': pair_pnl.sum(axis=1),
+        'pair_pnl_sq': (pair_pnl ** 2).sum(axis=1),
+        'pair_win_sum': pair_win.sum(axis=1),
+        'pair_win_sq': (pair_win ** 2).sum(axis=1),
+        'tail': tail
+    }
+    if steps:
+        # Expiry payoff read along each path: did the spot ever sit in a loss zone?
+        path_pnl, _ = StrategyLab.calculate_payoff_batch(paths.ravel(), leg_matrix)
+        result['touches'] = (path_pnl.reshape(len(leg_matrix), *paths.shape).min(axis=2) < 0).sum(axis=1)
+    return result
+
+class MonteCarloEngine:
+    """
+    Probability-of-profit engine for StrategyLab leg sets.
+    Spot follows geometric Brownian motion at the given IV. Draws are made in
+    chunks with antithetic variates, each chunk seeded from one SeedSequence,
+    so results depend on the seed and chunking but not on the worker count.
+    Memory is bounded by chunk_size (simulated spot values held per chunk).
+    Chunks run in a process pool of workers processes (one per CPU by
+    default), started on first use and kept until close().
+    """
+    def __init__(self, n_paths=200000, seed=42, antithetic=True, chunk_size=1 << 18, workers=None, cvar_level=0.05):
+        self.n_paths = n_paths
+        self.seed = seed
+        self.antithetic = antithetic
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.cvar_level = cvar_level
+        self._pool = None
+
+    def _map(self, tasks):
+        if self.workers > 1 and len(tasks) > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return list(self._pool.map(_simulate_chunk, tasks))
+        return [_simulate_chunk(task) for task in tasks]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _tasks(self, leg_matrix, spot, iv, t, drift, steps, n_paths):
+        per_chunk = max(2, self.chunk_size // (steps or 1))
+        if self.antithetic:
+            per_chunk -= per_chunk % 2
+            n_paths += n_paths % 2
+        sizes = [per_chunk] * (n_paths // per_chunk)
+        if n_paths % per_chunk:
+            sizes.append(n_paths % per_chunk)
+
+        tail_size = max(1, int(np.ceil(self.cvar_level * n_paths)))
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        return [
+            (seed, size, leg_matrix, spot, iv, t, drift, steps, self.antithetic, tail_size)
+            for seed, size in zip(seeds, sizes)
+        ], tail_size
+
+    def simulate_batch(self, leg_matrix, spot, iv, dte_days, steps=None, drift=None, n_paths=None):
+        """
+        Monte Carlo metrics for many strategies sharing one set of paths.
+        leg_matrix: (strategy x leg x 5) array from StrategyLab.legs_to_matrix
+        iv: annualized volatility; dte_days: calendar days to expiry
+        steps: if set, full paths with this many steps are drawn and the
+            probability of touching a loss zone before expiry is reported
+        drift: annual drift of the spot, risk free rate by default
+        Returns a dict of (strategy,) arrays: pop, expected_pnl, std_error,
+        pop_std_error, var and cvar (P&L at the cvar_level tail), prob_touch.
+        """
+        leg_matrix = np.asarray(leg_matrix, dtype=float)
+        drift = settings.RISK_FREE_RATE if drift is None else drift
+        t = max(dte_days, 0) / 365
+        tasks, tail_size = self._tasks(leg_matrix, float(spot), float(iv), t, drift, steps, n_paths or self.n_paths)
+
+        parts = self._map(tasks)
+
+        n = sum(p['n'] for p in parts)
+        n_pairs = sum(p['n_pairs'] for p in parts)
+        total = {key: sum(p[key] for p in parts) for key in ('wins', 'pnl_sum', 'pair_pnl_sum', 'pair_pnl_sq', 'pair_win_sum', 'pair_win_sq')}
+
+        def std_error(s, sq):
+            var = (sq - s * s / n_pairs) / max(n_pairs - 1, 1)
+            return np.sqrt(np.maximum(var, 0) / n_pairs)
+
+        tail = np.concatenate([p['tail'] for p in parts], axis=1)
+        k = min(tail_size, tail.shape[1])
+        tail = np.sort(np.partition(tail, k - 1, axis=1)[:, :k], axis=1)
+
+        result = {
+            'n_paths': n,
+            'pop': total['wins'] / n,
+            'expected_pnl': total['pnl_sum'] / n,
+            'std_error': std_error(total['pair_pnl_sum'], total['pair_pnl_sq']),
+            'pop_std_error': std_error(total['pair_win_sum'], total['pair_win_sq']),
+            'var': tail[:, -1],
+            'cvar': tail.mean(axis=1)
+        }
+        if steps:
+            result['prob_touch'] = sum(p['touches'] for p in parts) / n
+        return result
+
+    def simulate(self, legs, spot, iv, dte_days, steps=None, drift=None, n_paths=None):
+        """
+        Monte Carlo metrics for one leg set (StrategyLab leg dicts), as floats.
+        """
+        res = self.simulate_batch(StrategyLab.legs_to_matrix([legs]), spot, iv, dte_days, steps, drift, n_paths)
+        return {
+            key: (value if key == 'n_paths' else round(float(value[0]), 4))
+            for key, value in res.items()
+        }
@@ -0,0 +1,80 @@
+# core/pipeline.py
+
+import logging
+from core.analyzers import GreeksAnalyzer, GEXAnalyzer, OIAnalyzer, SmartMoneyAnalyzer
+from core.signal_generator import SignalGenerator
+from core.knowledge_base import KnowledgeBase
+from core.validator import MultiLevelValidator
+
+logger = logging.getLogger(__name__)
+
+class SignalPipeline:
+    """
+    Per-snapshot analysis, pattern matching, signal generation and
+    validation, shared by the live loop in main.py and the backtest replay
+    so that both run exactly the same steps on a market snapshot.
+    """
+    def __init__(self, greeks_cache=None):
+        self.greeks_analyzer = GreeksAnalyzer(cache=greeks_cache)
+        self.gex_analyzer = GEXAnalyzer()
+        self.oi_analyzer = OIAnalyzer()
+        self.smart_money_analyzer = SmartMoneyAnalyzer()
+        self.signal_generator = SignalGenerator()
+        self.knowledge_base = KnowledgeBase()
+        self.validator = MultiLevelValidator(self.knowledge_base)
+
+    def analyze(self, market_data, greeks=None, extra=None):
+        """
+        Core analyses of one snapshot, in the analysis_results layout.
+        greeks: the snapshot's Greeks when already computed (e.g. as a row
+            of the chain block); solved here otherwise
+        extra: additional analysis_results entries
+        """
+        greeks = greeks if greeks is not None else self.greeks_analyzer.analyze(market_data)
+        analysis_results = {
+            'market_data': market_data,
+            'greeks': greeks,
+            'gex': self.gex_analyzer.analyze(market_data, greeks),
+            'oi': self.oi_analyzer.analyze(market_data),
+            'smart_money': self.smart_money_analyzer.analyze(market_data)
+        }
+        analysis_results.update(extra or {})
+        return analysis_results
+
+    def validate_signals(self, signals, analysis_results):
+        """
+        Multi-level validation; approved signals that match a known failure
+        scenario carry its warnings and lose 20 confidence points.
+        """
+        validated = []
+        for signal in signals:
+            validation_result = self.validator.validate_signal(signal, analysis_results)
+
+            if validation_result['decision'] == 'APPROVED':
+                # Check for known failure scenarios
+                failure_check = self.knowledge_base.check_failure_scenarios(signal, analysis_results)
+
+                if failure_check.get('warnings'):
+                    signal['warnings'] = failure_check['warnings']
+                    signal['confidence'] -= 20
+
+                validated.append(signal)
+        return validated
+
+    def signals(self, analysis_results):
+        """
+        Pattern matching, signal generation and validation on analyzed data.
+        Returns (matched_patterns, preliminary_signals, validated_signals).
+        """
+        matched_patterns = self.knowledge_base.find_matching_patterns(analysis_results)
+        preliminary = self.signal_generator.generate_signals(analysis_results, matched_patterns)
+        return matched_patterns, preliminary, self.validate_signals(preliminary, analysis_results)
+
+    def run(self, market_data, extra=None, greeks=None):
+        """
+        All steps for one snapshot (see analyze and signals).
+        Returns (analysis_results, matched_patterns, validated_signals).
+        """
+        analysis_results = self.analyze(market_data, greeks, extra)
+        matched_patterns, _, validated = self.signals(analysis_results)
+        return analysis_results, matched_patterns, validated
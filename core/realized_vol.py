@@ -0,0 +1,215 @@
+# core/realized_vol.py
+
+import numpy as np
+import pandas as pd
+from collections import deque
+import logging
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+LN2 = np.log(2)
+
+# Bars per trading year for Angel One candle intervals (375-minute session)
+BARS_PER_YEAR = {
+    'ONE_MINUTE': 252 * 375,
+    'THREE_MINUTE': 252 * 125,
+    'FIVE_MINUTE': 252 * 75,
+    'FIFTEEN_MINUTE': 252 * 25,
+    'THIRTY_MINUTE': 252 * 12.5,
+    'ONE_HOUR': 252 * 6.25,
+    'ONE_DAY': 252
+}
+
+# Candle length in seconds for the same intervals
+INTERVAL_SECONDS = {
+    'ONE_MINUTE': 60,
+    'THREE_MINUTE': 180,
+    'FIVE_MINUTE': 300,
+    'FIFTEEN_MINUTE': 900,
+    'THIRTY_MINUTE': 1800,
+    'ONE_HOUR': 3600,
+    'ONE_DAY': 86400
+}
+
+ESTIMATORS = ('close_to_close', 'parkinson', 'garman_klass')
+
+class CandleBuilder:
+    """
+    Builds OHLC candles of one interval from sampled spot prices (one per
+    analysis cycle, or every tick when streaming). A bar opens at the
+    previous bar's close, so sparsely sampled bars still span the move
+    into them. update() returns the bars completed by a new sample.
+    """
+    def __init__(self, interval=settings.CANDLE_INTERVAL):
+        self.interval = interval
+        self.seconds = INTERVAL_SECONDS[interval]
+        self._bars = {}  # symbol -> open bar
+        self._last_close = {}
+
+    def _bar_start(self, timestamp):
+        return pd.Timestamp(timestamp).floor(f"{self.seconds}s")
+
+    def update(self, symbol, timestamp, price):
+        start = self._bar_start(timestamp)
+        bar = self._bars.get(symbol)
+        completed = []
+        if bar is not None and start > bar['timestamp']:
+            completed.append(self._close(symbol))
+            bar = None
+        if bar is None:
+            open_ = self._last_close.get(symbol, price)
+            self._bars[symbol] = {'timestamp': start, 'open': open_, 'high': max(open_, price),
+                                  'low': min(open_, price), 'close': price, 'volume': 0}
+        else:
+            bar['high'], bar['low'], bar['close'] = max(bar['high'], price), min(bar['low'], price), price
+        return completed
+
+    def _close(self, symbol):
+        bar = self._bars.pop(symbol)
+        self._last_close[symbol] = bar['close']
+        return bar
+
+    def flush(self, symbol):
+        """
+        Closes the open bar early, e.g. at the session close or on shutdown.
+        """
+        return [self._close(symbol)] if symbol in self._bars else []
+
+class RealizedVolEngine:
+    """
+    Rolling historical volatility over the stored candles.
+    Close-to-close, Parkinson and Garman-Klass estimates are kept for several
+    windows per symbol. History is read from the candles table once; after
+    that only candles newer than the last one seen are fetched, and each new
+    candle updates every window in O(1) through running sums.
+    """
+    def __init__(self, db_manager, interval=settings.CANDLE_INTERVAL, windows=(10, 20, 60)):
+        self.db = db_manager
+        self.interval = interval
+        self.windows = tuple(sorted(windows))
+        self.bars_per_year = BARS_PER_YEAR.get(interval, 252)
+        self._state = {}  # symbol -> rolling state
+
+    @staticmethod
+    def bar_terms(df):
+        """
+        Per-candle variance contributions for each estimator (vectorized).
+        """
+        o, h, l, c = (df[col].to_numpy(dtype=float) for col in ('open', 'high', 'low', 'close'))
+        log_ret = np.empty(len(c))
+        log_ret[:1] = np.nan
+        log_ret[1:] = np.log(c[1:] / c[:-1])
+        hl = np.log(h / l)
+        co = np.log(c / o)
+        return pd.DataFrame({
+            'close_to_close': log_ret,
+            'parkinson': hl ** 2 / (4 * LN2),
+            'garman_klass': 0.5 * hl ** 2 - (2 * LN2 - 1) * co ** 2
+        }, index=df.index)
+
+    def history(self, df):
+        """
+        Annualized rolling HV series for every estimator and window over a
+        candle DataFrame, e.g. for charts. Columns are named '<estimator>_<window>'.
+        """
+        terms = self.bar_terms(df)
+        out = {}
+        for w in self.windows:
+            out[f'close_to_close_{w}'] = terms['close_to_close'].rolling(w).std() * np.sqrt(self.bars_per_year)
+            for est in ('parkinson', 'garman_klass'):
+                out[f'{est}_{w}'] = np.sqrt(terms[est].rolling(w).mean().clip(lower=0) * self.bars_per_year)
+        return pd.DataFrame(out, index=df.index)
+
+    def _new_state(self):
+        return {
+            'last_timestamp': None,
+            'prev_close': None,
+            'terms': {est: deque(maxlen=self.windows[-1]) for est in ESTIMATORS},
+            'sums': {(est, w): 0.0 for est in ESTIMATORS for w in self.windows},
+            'sq_sums': {w: 0.0 for w in self.windows}  # close-to-close only
+        }
+
+    def _push(self, state, est, value):
+        buf = state['terms'][est]
+        for w in self.windows:
+            if len(buf) >= w:
+                old = buf[-w]
+                state['sums'][(est, w)] -= old
+                if est == 'close_to_close':
+                    state['sq_sums'][w] -= old * old
+            state['sums'][(est, w)] += value
+            if est == 'close_to_close':
+                state['sq_sums'][w] += value * value
+        buf.append(value)
+
+    def update(self, symbol, candle):
+        """
+        Adds one candle (mapping with timestamp, open, high, low, close) in O(1).
+        """
+        state = self._state.setdefault(symbol, self._new_state())
+        o, h, l, c = (float(candle[k]) for k in ('open', 'high', 'low', 'close'))
+        if state['prev_close'] is not None:
+            self._push(state, 'close_to_close', np.log(c / state['prev_close']))
+        hl, co = np.log(h / l), np.log(c / o)
+        self._push(state, 'parkinson', hl ** 2 / (4 * LN2))
+        self._push(state, 'garman_klass', 0.5 * hl ** 2 - (2 * LN2 - 1) * co ** 2)
+        state['prev_close'] = c
+        state['last_timestamp'] = candle.get('timestamp')
+        return self.get(symbol)
+
+    def _seed(self, symbol, df):
+        """
+        Builds the rolling state from a block of history in one vectorized pass.
+        """
+        state = self._new_state()
+        terms = self.bar_terms(df)
+        for est in ESTIMATORS:
+            values = terms[est].to_numpy()
+            values = values[np.isfinite(values)][-self.windows[-1]:]
+            state['terms'][est].extend(values.tolist())
+            for w in self.windows:
+                state['sums'][(est, w)] = float(values[-w:].sum())
+                if est == 'close_to_close':
+                    state['sq_sums'][w] = float((values[-w:] ** 2).sum())
+        state['prev_close'] = float(df['close'].iloc[-1])
+        state['last_timestamp'] = df['timestamp'].iloc[-1]
+        self._state[symbol] = state
+
+    def refresh(self, symbol):
+        """
+        Pulls candles newer than the last one seen and folds them in.
+        The first call for a symbol loads its full history.
+        """
+        state = self._state.get(symbol)
+        if state is None:
+            df = self.db.get_candles(symbol, self.interval)
+            if not df.empty:
+                self._seed(symbol, df)
+        else:
+            df = self.db.get_candles(symbol, self.interval, since=state['last_timestamp'])
+            for candle in df.to_dict('records'):
+                self.update(symbol, candle)
+        return self.get(symbol)
+
+    def get(self, symbol):
+        """
+        {estimator: {window: annualized HV or NaN while the window is filling}}
+        """
+        state = self._state.get(symbol)
+        result = {est: {w: np.nan for w in self.windows} for est in ESTIMATORS}
+        if state is None:
+            return result
+
+        for est in ESTIMATORS:
+            n_avail = len(state['terms'][est])
+            for w in self.windows:
+                if n_avail < w:
+                    continue
+                total = state['sums'][(est, w)]
+                if est == 'close_to_close':
+                    var = (state['sq_sums'][w] - total * total / w) / (w - 1)
+                else:
+                    var = total / w
+                result[est][w] = float(np.sqrt(max(var, 0.0) * self.bars_per_year))
+        return result
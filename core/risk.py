@@ -0,0 +1,124 @@
+# core/risk.py
+
+import numpy as np
+from datetime import datetime
+import logging
+from core.greeks_engine import GreeksEngine, GREEK_KEYS
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class PortfolioRisk:
+    """
+    Aggregate Greeks and a spot x vol stress matrix for open option positions.
+    positions: list of dicts {
+        'type': 'CE'|'PE', 'action': 'BUY'|'SELL', 'strike': float, 'qty': int,
+        'iv': float, 'expiry': 'YYYY-MM-DD' or 'time_to_expiry': years,
+        'symbol': str (optional, default NIFTY), 'lot_size': int (optional, default 1)
+    }
+    The stress matrix revalues every position under every scenario as one
+    (position x scenario) Black-Scholes evaluation. Expired positions are
+    valued at intrinsic value throughout.
+    """
+    def __init__(self, spot_shocks=None, vol_shocks=None, horizon_days=0, r=None):
+        # Relative spot moves and absolute IV moves (vol points / 100)
+        self.spot_shocks = np.linspace(-0.10, 0.10, 41) if spot_shocks is None else np.asarray(spot_shocks, dtype=float)
+        self.vol_shocks = np.linspace(-0.10, 0.10, 25) if vol_shocks is None else np.asarray(vol_shocks, dtype=float)
+        self.horizon_days = horizon_days
+        self.r = settings.RISK_FREE_RATE if r is None else r
+
+    @staticmethod
+    def _years_to_expiry(position, now):
+        if position.get('time_to_expiry') is not None:
+            return float(position['time_to_expiry'])
+        expiry_dt = datetime.fromisoformat(str(position['expiry'])).replace(hour=15, minute=30)
+        return max((expiry_dt - now).total_seconds(), 0) / (365 * 24 * 3600)
+
+    def position_arrays(self, positions, spots, now=None):
+        """
+        Columnar view of the positions: is_call, strike, t, iv, symbol, spot
+        and signed quantity (side x qty x lot size), one entry per position.
+        """
+        now = now or datetime.now()
+        spot_of = spots if isinstance(spots, dict) else {}
+        return {
+            'is_call': np.array([p['type'] == 'CE' for p in positions]),
+            'strike': np.array([p['strike'] for p in positions], dtype=float),
+            't': np.array([self._years_to_expiry(p, now) for p in positions]),
+            'iv': np.array([p['iv'] for p in positions], dtype=float),
+            'symbol': np.array([p.get('symbol', 'NIFTY') for p in positions], dtype=object),
+            'spot': np.array([spot_of.get(p.get('symbol', 'NIFTY'), np.nan) if spot_of else spots for p in positions], dtype=float),
+            'signed_qty': np.array([
+                (1 if p['action'] == 'BUY' else -1) * p['qty'] * p.get('lot_size', 1) for p in positions
+            ], dtype=float)
+        }
+
+    @staticmethod
+    def _value(price, a):
+        # compute() prices expired positions at 0; they are worth intrinsic value
+        intrinsic = np.maximum(np.where(a['is_call'], a['spot'] - a['strike'], a['strike'] - a['spot']), 0)
+        return np.where(a['t'] > 0, price, intrinsic)
+
+    def greeks(self, positions, spots, now=None):
+        """
+        Portfolio Greeks. by_underlying holds, per symbol, the signed-quantity
+        sums of every position's Greeks (delta in underlying units, theta per
+        day, vega per 1% IV) and market value. Across underlyings only rupee
+        figures are added: theta, vega, vomma and value, plus delta and gamma
+        weighted by spot as rupee_delta (P&L of a 1% move in every underlying)
+        and rupee_gamma (change in rupee_delta over that move).
+        """
+        a = self.position_arrays(positions, spots, now)
+        g = GreeksEngine.compute(a['is_call'], a['spot'], a['strike'], a['t'], self.r, a['iv'])
+        value = self._value(g['price'], a)
+        qty, spot = a['signed_qty'], a['spot']
+
+        by_underlying = {}
+        for symbol in dict.fromkeys(a['symbol']):
+            q = np.where(a['symbol'] == symbol, qty, 0.0)
+            by_underlying[symbol] = {k: float(g[k] @ q) for k in GREEK_KEYS}
+            by_underlying[symbol]['value'] = float(value @ q)
+        return {
+            'by_underlying': by_underlying,
+            'rupee_delta': float((g['delta'] * spot / 100) @ qty),
+            'rupee_gamma': float((g['gamma'] * spot * spot / 10000) @ qty),
+            **{k: float(g[k] @ qty) for k in ('theta', 'vega', 'vomma')},
+            'value': float(value @ qty)
+        }
+
+    def stress(self, positions, spots, now=None):
+        """
+        P&L of the portfolio under every (spot shock, vol shock) pair, after
+        horizon_days have passed. Returns spot_shocks, vol_shocks and pnl of
+        shape (spot shock, vol shock).
+        """
+        a = self.position_arrays(positions, spots, now)
+        base = self._value(GreeksEngine.compute(a['is_call'], a['spot'], a['strike'], a['t'], self.r, a['iv'])['price'], a)
+
+        # (position, spot shock, vol shock)
+        S = a['spot'][:, None, None] * (1 + self.spot_shocks[None, :, None])
+        sigma = np.maximum(a['iv'][:, None, None] + self.vol_shocks[None, None, :], 0.01)
+        t = np.maximum(a['t'] - self.horizon_days / 365, 0)[:, None, None]
+        K, is_call = a['strike'][:, None, None], a['is_call'][:, None, None]
+
+        live = t > 0
+        # price_vega needs valid inputs; expired positions are worth intrinsic value
+        price, _ = GreeksEngine.price_vega(is_call, S, K, np.where(live, t, 1.0), self.r, sigma)
+        value = np.where(live, price, np.maximum(np.where(is_call, S - K, K - S), 0))
+
+        pnl = np.tensordot(a['signed_qty'], value - base[:, None, None], axes=1)
+        return {'spot_shocks': self.spot_shocks, 'vol_shocks': self.vol_shocks, 'pnl': pnl}
+
+    def analyze(self, positions, spots, now=None):
+        now = now or datetime.now()
+        stress = self.stress(positions, spots, now)
+        i, j = np.unravel_index(np.argmin(stress['pnl']), stress['pnl'].shape)
+        return {
+            'greeks': self.greeks(positions, spots, now),
+            'stress': stress,
+            'worst_case': {
+                'pnl': float(stress['pnl'][i, j]),
+                'spot_shock': float(self.spot_shocks[i]),
+                'vol_shock': float(self.vol_shocks[j])
+            }
+        }
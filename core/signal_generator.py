@@ -5,8 +5,15 @@ import logging
 logger = logging.getLogger(__name__)
 
 class SignalGenerator:
+    # Knowledge-base patterns each strategy's trigger rests on; a signal's
+    # 'patterns' lists those that matched, so it is credited to them alone
+    STRATEGY_PATTERNS = {
+        'Aggressive Call Buy': ('Negative GEX Regime',)
+    }
+
     def generate_signals(self, analysis_results, matched_patterns):
         signals = []
+        matched = {p['name'] for p in matched_patterns}
         # Basic signal logic based on analysis
         if analysis_results['gex']['regime'] == 'Negative' and analysis_results['oi']['pcr'] < 0.7:
             signals.append({
@@ -19,6 +26,7 @@ class SignalGenerator:
                 'risk_reward': 2.0,
                 'reasoning': 'Negative GEX expansion with Bullish PCR divergence',
                 'symbol': 'NIFTY',
-                'price': analysis_results['market_data']['spot_price']
+                'price': analysis_results['market_data']['spot_price'],
+                'patterns': [name for name in self.STRATEGY_PATTERNS['Aggressive Call Buy'] if name in matched]
             })
         return signals
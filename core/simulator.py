@@ -1,8 +1,13 @@
 # core/simulator.py
 
+import threading
 import numpy as np
 import pandas as pd
+from scipy.signal import lfilter
 from datetime import datetime, timedelta
+from core.greeks_engine import GreeksEngine
+from core.data_fetcher import MOCK_SPOTS, STRIKE_STEPS
+from config import settings
 
 class RealisticSimulator:
     """
@@ -10,34 +15,43 @@ class RealisticSimulator:
     Generates correlated multi-index flows and realistic GBM price paths.
     """
     @staticmethod
-    def generate_price_path(start_price, steps=100, drift=0.00005, volatility=0.005):
+    def generate_price_paths(start_price, n_paths, steps=100, drift=0.00005, volatility=0.005, mean_reversion=0.01, seed=None):
+        """
+        N paths x T steps in one shot, as an (n_paths, steps) array starting at start_price.
+        Log-price deviation x = ln(P / start_price) follows the AR(1) update
+            x[t+1] = (1 - mean_reversion) * x[t] + drift + volatility * eps
+        i.e. GBM with a per-step pull back towards the start price. The
+        recursion is run as a linear filter along the time axis, vectorized
+        across paths. The same seed always gives the same paths.
+        """
+        rng = np.random.default_rng(seed)
+        shocks = drift + volatility * rng.standard_normal((n_paths, steps))
+        shocks[:, 0] = 0.0  # Every path starts exactly at start_price
+        log_dev = lfilter([1.0], [1.0, -(1.0 - mean_reversion)], shocks, axis=1)
+        return start_price * np.exp(log_dev)
+
+    @staticmethod
+    def generate_price_path(start_price, steps=100, drift=0.00005, volatility=0.005, seed=None):
         """
         Refined GBM with mean-reversion tendencies for realistic intraday behavior.
         """
-        price_path = [start_price]
-        curr = start_price
-        for _ in range(steps - 1):
-            # GBM + Mean reversion to start price if it drifts too far
-            mr_factor = (start_price - curr) * 0.01
-            ret = np.random.normal(drift + mr_factor, volatility)
-            curr = curr * np.exp(ret)
-            price_path.append(curr)
-        return np.array(price_path)
+        return RealisticSimulator.generate_price_paths(start_price, 1, steps, drift, volatility, seed=seed)[0]
 
     @staticmethod
-    def generate_stock_data(symbol, start_price, steps=100):
+    def generate_stock_data(symbol, start_price, steps=100, seed=None):
         # Align with clock minutes
         now = datetime.now().replace(second=0, microsecond=0)
         timestamps = [now - timedelta(minutes=i) for i in range(steps)]
         timestamps.reverse()
 
-        prices = RealisticSimulator.generate_price_path(start_price, steps)
+        rng = np.random.default_rng(seed)
+        prices = RealisticSimulator.generate_price_path(start_price, steps, seed=rng)
 
         # Noise injection for OHLC consistency
-        opens = prices * (1 + np.random.normal(0, 0.0005, steps))
+        opens = prices * (1 + rng.normal(0, 0.0005, steps))
         closes = prices
-        highs = np.maximum(opens, closes) * (1 + abs(np.random.normal(0, 0.001, steps)))
-        lows = np.minimum(opens, closes) * (1 - abs(np.random.normal(0, 0.001, steps)))
+        highs = np.maximum(opens, closes) * (1 + abs(rng.normal(0, 0.001, steps)))
+        lows = np.minimum(opens, closes) * (1 - abs(rng.normal(0, 0.001, steps)))
 
         df = pd.DataFrame({
             'timestamp': timestamps,
@@ -45,10 +59,104 @@ class RealisticSimulator:
             'high': highs,
             'low': lows,
             'close': closes,
-            'volume': np.random.randint(5000, 25000, steps)
+            'volume': rng.integers(5000, 25000, steps)
         })
         return df
 
+    @staticmethod
+    def generate_option_chains(spot, n_strikes=201, expiry_days=(7, 14, 28, 56), atm_iv=0.14, rho=-0.4, eta=1.0, gamma=0.5,
+                               range_sd=4.0, step=None, oi_scale=100000, r=None, seed=None, as_arrays=False, symbol='NIFTY'):
+        """
+        Synthetic option chains free of static arbitrage, for fixtures and load tests.
+        Total variance follows the SSVI smile
+            w(k) = theta / 2 * (1 + rho * phi * k + sqrt((phi * k + rho) ** 2 + 1 - rho ** 2))
+        with theta = atm_iv^2 * t (non-decreasing across expiries) and
+        phi = eta / theta^gamma, which has no butterfly or calendar arbitrage
+        while eta * (1 + |rho|) <= 2. atm_iv may be one value or one per expiry.
+        Strikes are shared by every expiry: n_strikes evenly spaced over
+        +/- range_sd standard deviations of the longest expiry, or centred
+        on spot at a fixed step when one is given. Expiries may come in any
+        order; they are priced in ascending order and returned in the
+        caller's.
+        Returns chain snapshots in the fetch_chain_block layout, or with
+        as_arrays a dict of (expiry, strike) arrays.
+        """
+        if eta * (1 + abs(rho)) > 2 or not 0 < gamma <= 0.5:
+            raise ValueError("SSVI parameters admit arbitrage: need eta * (1 + |rho|) <= 2 and 0 < gamma <= 0.5")
+        r = settings.RISK_FREE_RATE if r is None else r
+        rng = np.random.default_rng(seed)
+
+        days = np.asarray(expiry_days, dtype=float)
+        by_days = np.argsort(days, kind='stable')
+        atm = np.broadcast_to(np.asarray(atm_iv, dtype=float), days.shape)[by_days]
+        t = days[by_days] / 365
+        theta = np.maximum.accumulate(atm ** 2 * t)[:, None]                    # (E, 1)
+
+        if step is None:
+            span = range_sd * atm.max() * np.sqrt(t.max())
+            strikes = spot * np.exp(np.linspace(-span, span, n_strikes))
+        else:
+            strikes = round(spot / step) * step + step * (np.arange(n_strikes) - n_strikes // 2)
+            if strikes[0] <= 0:
+                raise ValueError(f"{n_strikes} strikes at step {step} reach non-positive strikes")
+
+        k = np.log(strikes[None, :] / (spot * np.exp(r * t[:, None])))        # (E, N)
+        phi = eta / theta ** gamma
+        w = theta / 2 * (1 + rho * phi * k + np.sqrt((phi * k + rho) ** 2 + 1 - rho ** 2))
+        iv = np.sqrt(w / t[:, None])
+
+        call = GreeksEngine.compute(True, spot, strikes, t[:, None], r, iv)['price']
+        put = GreeksEngine.compute(False, spot, strikes, t[:, None], r, iv)['price']
+
+        # Writers' OI: calls pile up above spot, puts below, both peaking about one sd OTM,
+        # with extra interest at round strikes and less in far expiries
+        sd = np.sqrt(theta)
+        x = np.log(strikes / spot)[None, :] / sd
+        round_bump = 1 + 0.5 * (np.isclose(np.mod(strikes, 500), 0) | np.isclose(np.mod(strikes, 500), 500))
+        decay = 1 / (1 + np.arange(len(t)))[:, None]
+        call_oi = oi_scale * decay * round_bump * np.exp(-0.5 * (x - 1) ** 2) * rng.gamma(4, 0.25, k.shape)
+        put_oi = oi_scale * decay * round_bump * np.exp(-0.5 * (x + 1) ** 2) * rng.gamma(4, 0.25, k.shape)
+
+        # Back from ascending expiries to the caller's order
+        restore = np.argsort(by_days)
+        labels = [(datetime.now().date() + timedelta(days=int(d))).isoformat() for d in days]
+        arrays = {
+            'symbol': symbol,
+            'spot_price': float(spot),
+            'expiries': labels,
+            'time_to_expiry': t[restore],
+            'strikes': strikes,
+            'call_ltp': call[restore],
+            'put_ltp': put[restore],
+            'call_iv': iv[restore],
+            'put_iv': iv[restore],
+            'call_oi': np.round(call_oi[restore]).astype(np.int64),
+            'put_oi': np.round(put_oi[restore]).astype(np.int64)
+        }
+        return arrays if as_arrays else RealisticSimulator.chain_snapshots(arrays)
+
+    @staticmethod
+    def chain_snapshots(arrays):
+        """
+        Converts generate_option_chains arrays into per-expiry snapshots whose
+        option_chain is the DataFetcher list-of-dicts layout.
+        """
+        strikes = arrays['strikes'].tolist()
+        snapshots = []
+        for i, expiry in enumerate(arrays['expiries']):
+            columns = [arrays[c][i].tolist() for c in ('call_ltp', 'put_ltp', 'call_oi', 'put_oi', 'call_iv', 'put_iv')]
+            snapshots.append({
+                'symbol': arrays['symbol'],
+                'expiry': expiry,
+                'spot_price': arrays['spot_price'],
+                'time_to_expiry': float(arrays['time_to_expiry'][i]),
+                'option_chain': [
+                    {'strike': k, 'call_ltp': c, 'put_ltp': p, 'call_oi': coi, 'put_oi': poi, 'call_iv': civ, 'put_iv': piv}
+                    for k, c, p, coi, poi, civ, piv in zip(strikes, *columns)
+                ]
+            })
+        return snapshots
+
     @staticmethod
     def generate_market_state():
         # Correlated metrics
@@ -70,3 +178,208 @@ class RealisticSimulator:
             "net_gex": net_gex,
             "updated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
+
+# Trading seconds in a year (252 sessions of 375 minutes)
+TRADING_SECONDS_PER_YEAR = 252 * 375 * 60
+
+# Demo-mode heavyweights and their reference prices
+HEAVYWEIGHT_PRICES = {
+    'RELIANCE': 2900.0, 'HDFCBANK': 1650.0, 'ICICIBANK': 1250.0, 'INFY': 1850.0, 'TCS': 4200.0,
+    'SBIN': 820.0, 'LT': 3600.0, 'TATAMOTORS': 950.0, 'AXISBANK': 1150.0
+}
+
+# Loading on the common market factor and annualized vol per asset
+FACTOR_LOADINGS = {'NIFTY': 0.95, 'BANKNIFTY': 0.85}
+ASSET_VOLS = {'NIFTY': 0.14, 'BANKNIFTY': 0.18}
+
+class MarketSimulator:
+    """
+    Coherent synthetic market for demo mode and load testing.
+    Indices and heavyweights move as correlated GBM paths: correlations
+    come from a one-factor model (loadings) and are Cholesky-factored once.
+    Option chains are priced off the simulated spot with Black-Scholes on a
+    skewed smile, and open interest builds around the moving spot. Time is
+    simulated: advance() moves the market in ticks of tick_seconds, and OI
+    is updated every chain_seconds. State changes and reads that draw from
+    the shared rng or span several fields hold lock, so a tick feed thread
+    can advance the market while the fetcher reads it.
+    """
+    def __init__(self, indices=None, constituents=None, loadings=None, vols=None, skew=-0.1, curvature=0.04,
+                 n_strikes=41, tick_seconds=1.0, chain_seconds=5.0, oi_rate=100, start=None, seed=None, r=None):
+        indices = dict(indices or MOCK_SPOTS)
+        constituents = dict(HEAVYWEIGHT_PRICES if constituents is None else constituents)
+        self.indices = list(indices)
+        self.constituents = list(constituents)
+        self.symbols = self.indices + self.constituents
+        self.r = settings.RISK_FREE_RATE if r is None else r
+        self.skew = skew
+        self.curvature = curvature
+        self.tick_seconds = tick_seconds
+        self.chain_seconds = chain_seconds
+        self.oi_rate = oi_rate
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.RLock()
+
+        loadings = {**FACTOR_LOADINGS, **(loadings or {})}
+        vols = {**ASSET_VOLS, **(vols or {})}
+        self.loadings = np.array([loadings.get(s, 0.6) for s in self.symbols])
+        self.vols = np.array([vols.get(s, 0.25) for s in self.symbols])
+        corr = np.outer(self.loadings, self.loadings)
+        np.fill_diagonal(corr, 1.0)
+        self.chol = np.linalg.cholesky(corr)
+
+        self.prices = np.array([indices[s] for s in self.indices] + [constituents[s] for s in self.constituents], dtype=float)
+        self.open_prices = self.prices.copy()
+        self.now = start or datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
+        self._chain_clock = 0.0
+
+        # Listed strikes stay fixed for the session, centred on the opening spot
+        self.strikes = {}
+        for i, symbol in enumerate(self.indices):
+            step = STRIKE_STEPS.get(symbol, 50)
+            atm = round(self.prices[i] / step) * step
+            self.strikes[symbol] = atm + step * (np.arange(n_strikes) - n_strikes // 2)
+        self._oi = {}
+
+    @property
+    def expiries(self):
+        """
+        The next four weekly Thursday expiries from the simulated date.
+        """
+        today = self.now.date()
+        first = today + timedelta(days=(3 - today.weekday()) % 7)
+        if first == today and self.now.hour * 60 + self.now.minute >= 15 * 60 + 30:
+            first += timedelta(weeks=1)
+        return [(first + timedelta(weeks=i)).isoformat() for i in range(4)]
+
+    def time_to_expiry(self, expiry=None):
+        expiry = expiry or self.expiries[0]
+        expiry_dt = datetime.fromisoformat(str(expiry)).replace(hour=15, minute=30)
+        return max((expiry_dt - self.now).total_seconds(), 60) / (365 * 24 * 3600)
+
+    def spot(self, symbol):
+        return float(self.prices[self.symbols.index(symbol)])
+
+    def _oi_profile(self, symbol, t, spot):
+        """
+        Writers' OI build-up per strike: calls peak one sd above spot, puts one sd below.
+        """
+        strikes = self.strikes[symbol]
+        sd = spot * ASSET_VOLS.get(symbol, 0.15) * np.sqrt(max(t, 1 / 365))
+        call = np.exp(-0.5 * ((strikes - spot - sd) / sd) ** 2)
+        put = np.exp(-0.5 * ((strikes - spot + sd) / sd) ** 2)
+        return call, put
+
+    def _open_interest(self, symbol, expiry):
+        key = (symbol, expiry)
+        if key not in self._oi:
+            call, put = self._oi_profile(symbol, self.time_to_expiry(expiry), self.spot(symbol))
+            self._oi[key] = (20000 + 200 * self.oi_rate * call, 20000 + 200 * self.oi_rate * put)
+        return self._oi[key]
+
+    def _update_open_interest(self, spots):
+        """
+        Applies one OI refresh per row of spots (refresh x index).
+        """
+        for expiry in self.expiries:
+            t = self.time_to_expiry(expiry)
+            for i, symbol in enumerate(self.indices):
+                call_oi, put_oi = self._open_interest(symbol, expiry)
+                call, put = self._oi_profile(symbol, t, spots[:, i, None])
+                noise = 1 + 0.3 * self.rng.standard_normal((2, *call.shape))
+                call_oi = np.maximum(call_oi + self.oi_rate * (call * noise[0]).sum(axis=0), 0)
+                put_oi = np.maximum(put_oi + self.oi_rate * (put * noise[1]).sum(axis=0), 0)
+                self._oi[(symbol, expiry)] = (call_oi, put_oi)
+
+    def advance(self, seconds):
+        """
+        Moves the market forward by seconds of simulated time in one vectorized
+        draw. Returns the tick path (tick x symbol) for feeds and tests.
+        """
+        with self.lock:
+            n = int(round(seconds / self.tick_seconds))
+            if n <= 0:
+                return np.empty((0, len(self.symbols)))
+            dt = self.tick_seconds / TRADING_SECONDS_PER_YEAR
+            z = self.rng.standard_normal((n, len(self.symbols))) @ self.chol.T
+            log_ret = -0.5 * self.vols ** 2 * dt + self.vols * np.sqrt(dt) * z
+            path = self.prices * np.exp(np.cumsum(log_ret, axis=0))
+
+            start_date = self.now.date()
+            self.prices = path[-1]
+            self.now += timedelta(seconds=n * self.tick_seconds)
+            if self.now.date() != start_date:
+                self.open_prices = self.prices.copy()
+
+            # OI refreshes that fell inside this window, each at the spot of its tick
+            elapsed = self._chain_clock + n * self.tick_seconds
+            refreshes = int(elapsed // self.chain_seconds)
+            self._chain_clock = elapsed - refreshes * self.chain_seconds
+            if refreshes:
+                ticks = np.minimum(((np.arange(1, refreshes + 1) * self.chain_seconds - (elapsed - n * self.tick_seconds)) / self.tick_seconds).astype(int), n) - 1
+                self._update_open_interest(path[np.maximum(ticks, 0), :len(self.indices)])
+            return path
+
+    def stream(self, duration_seconds):
+        """
+        Tick feed over simulated time: yields {'timestamp', 'prices', 'chain_updated'}
+        every tick_seconds, flagging ticks at which the chains were refreshed.
+        """
+        for _ in range(int(round(duration_seconds / self.tick_seconds))):
+            before = self._chain_clock
+            self.advance(self.tick_seconds)
+            yield {
+                'timestamp': self.now,
+                'prices': dict(zip(self.symbols, self.prices.tolist())),
+                'chain_updated': self._chain_clock < before + self.tick_seconds - 1e-9
+            }
+
+    def option_chain(self, symbol='NIFTY', expiry=None):
+        """
+        Chain for one expiry in the DataFetcher row format, priced at the current spot.
+        IV follows a quadratic smile in standardized moneyness ln(K/F) / (atm_iv sqrt(t)).
+        """
+        with self.lock:
+            expiry = expiry or self.expiries[0]
+            spot, t = self.spot(symbol), self.time_to_expiry(expiry)
+            atm_iv = ASSET_VOLS.get(symbol, 0.15)
+            strikes = self.strikes[symbol]
+            x = np.log(strikes / (spot * np.exp(self.r * t))) / (atm_iv * np.sqrt(t))
+            iv = atm_iv * np.clip(1 + self.skew * x + self.curvature * x * x, 0.25, 3.0)
+
+            # Exchange tick of 0.05, never below one tick
+            call = np.maximum(np.round(GreeksEngine.compute(True, spot, strikes, t, self.r, iv)['price'] * 20) / 20, 0.05)
+            put = np.maximum(np.round(GreeksEngine.compute(False, spot, strikes, t, self.r, iv)['price'] * 20) / 20, 0.05)
+            call_oi, put_oi = self._open_interest(symbol, expiry)
+
+            return [
+                {
+                    'strike': int(k),
+                    'call_ltp': c,
+                    'put_ltp': p,
+                    'call_oi': int(coi),
+                    'put_oi': int(poi),
+                    'call_iv': round(v, 4),
+                    'put_iv': round(v, 4)
+                }
+                for k, c, p, coi, poi, v in zip(strikes.tolist(), call.tolist(), put.tolist(), call_oi.tolist(), put_oi.tolist(), iv.tolist())
+            ]
+
+    def heavyweights(self):
+        """
+        % change from the session open per constituent, as DataFetcher.fetch_heavyweights returns.
+        """
+        with self.lock:
+            n = len(self.indices)
+            change = (self.prices[n:] / self.open_prices[n:] - 1) * 100
+            return {s: round(c, 2) for s, c in zip(self.constituents, change.tolist())}
+
+    def institutional_flow(self):
+        """
+        Net cash flows in Crores; FII flow leans with the index's move on the day.
+        """
+        with self.lock:
+            day_move = (self.prices[0] / self.open_prices[0] - 1) * 100
+            fii = 1500 * day_move + self.rng.normal(0, 300)
+            dii = -0.6 * fii + self.rng.normal(0, 200)
+            return {'fii': round(float(fii)), 'dii': round(float(dii))}
@@ -2,11 +2,63 @@
 
 import numpy as np
 import pandas as pd
+from core.greeks_engine import GreeksEngine
+from config import settings
+
+# Columns of a leg matrix row; padding rows are all zeros (qty 0)
+LEG_TYPE, LEG_SIDE, LEG_STRIKE, LEG_PREMIUM, LEG_QTY = range(5)
 
 class StrategyLab:
     """
     Core engine for strategy modeling and payoff calculations.
     """
+    @staticmethod
+    def legs_to_matrix(strategies):
+        """
+        Packs a list of strategies (each a list of leg dicts) into a
+        (strategy x leg x 5) float matrix, padded to the longest strategy.
+        Columns: type (1 = CE, 0 = PE), side (+1 BUY / -1 SELL), strike, premium, qty.
+        """
+        width = max((len(legs) for legs in strategies), default=0)
+        matrix = np.zeros((len(strategies), width, 5))
+        for i, legs in enumerate(strategies):
+            for j, leg in enumerate(legs):
+                matrix[i, j] = (
+                    1.0 if leg['type'] == 'CE' else 0.0,
+                    1.0 if leg['action'] == 'BUY' else -1.0,
+                    leg['strike'],
+                    leg['premium'],
+                    leg['qty']
+                )
+        return matrix
+
+    @staticmethod
+    def calculate_payoff_batch(spot_range, leg_matrix, chunk_size=256):
+        """
+        Expiry payoff curves for many strategies in one call.
+        leg_matrix: (strategy x leg x 5) array from legs_to_matrix
+        Evaluated as a (strategy x leg x spot) broadcast, chunked over
+        strategies so the working set stays cache-sized for large batches.
+        Returns (payoffs of shape (strategy, spot), net premium per strategy).
+        """
+        spot_range = np.asarray(spot_range, dtype=float)
+        leg_matrix = np.asarray(leg_matrix, dtype=float)
+        # Intrinsic value is max(direction * (spot - strike), 0) with direction +1 for calls, -1 for puts
+        direction = np.where(leg_matrix[..., LEG_TYPE] > 0, 1.0, -1.0)
+        strike = leg_matrix[..., LEG_STRIKE]
+        signed_qty = leg_matrix[..., LEG_SIDE] * leg_matrix[..., LEG_QTY]
+        net_credit_debit = (leg_matrix[..., LEG_PREMIUM] * signed_qty).sum(axis=1)
+
+        payoffs = np.empty((len(leg_matrix), spot_range.size))
+        for start in range(0, len(leg_matrix), chunk_size):
+            sl = slice(start, start + chunk_size)
+            intrinsic = (spot_range - strike[sl, :, None]) * direction[sl, :, None]
+            np.maximum(intrinsic, 0, out=intrinsic)
+            payoffs[sl] = np.matmul(signed_qty[sl, None, :], intrinsic)[:, 0]
+        payoffs -= net_credit_debit[:, None]
+
+        return payoffs, net_credit_debit
+
     @staticmethod
     def calculate_payoff(spot_range, legs):
         """
@@ -18,42 +70,140 @@ class StrategyLab:
             'qty': int
         }
         """
-        total_payoff = np.zeros_like(spot_range)
-        net_credit_debit = 0
+        payoffs, net_credit_debit = StrategyLab.calculate_payoff_batch(spot_range, StrategyLab.legs_to_matrix([legs]))
+        return payoffs[0], net_credit_debit[0]
 
-        for leg in legs:
-            strike = leg['strike']
-            premium = leg['premium']
-            qty = leg['qty']
-            multiplier = 1 if leg['action'] == 'BUY' else -1
+    @staticmethod
+    def model_premium(leg, spot, t, surface, r=None):
+        """
+        Black-Scholes premium for a leg at any strike, quoted or not.
+        IV is read off a VolatilitySurface; t is time to expiry in years.
+        """
+        r = settings.RISK_FREE_RATE if r is None else r
+        iv = surface.iv(leg['strike'], t)
+        return float(GreeksEngine.compute(leg['type'] == 'CE', spot, leg['strike'], t, r, iv)['price'])
+
+    @staticmethod
+    def calculate_pnl_curves(spot_range, legs, dte_days, horizons, iv=None, surface=None, r=None):
+        """
+        Mark-to-model P&L curves at several dates before expiry.
+        horizons: days from today (0 = today); at or past dte_days the curve
+            is the expiry payoff
+        IV per leg: leg['iv'] when given, else surface.iv(strike, t) when a
+            VolatilitySurface is passed, else the scalar iv
+        Every leg is revalued with Black-Scholes over the whole
+        (horizon x spot x leg) block in one evaluation.
+        Returns (curves of shape (horizon, spot), net premium).
+        Raises ValueError when a leg has no IV or a non-positive one.
+        """
+        r = settings.RISK_FREE_RATE if r is None else r
+        spot_range = np.asarray(spot_range, dtype=float)
+        leg_matrix = StrategyLab.legs_to_matrix([legs])[0]
+        is_call = leg_matrix[:, LEG_TYPE] > 0
+        strike = leg_matrix[:, LEG_STRIKE]
+        signed_qty = leg_matrix[:, LEG_SIDE] * leg_matrix[:, LEG_QTY]
+        net_credit_debit = float(leg_matrix[:, LEG_PREMIUM] @ signed_qty)
 
-            if leg['type'] == 'CE':
-                payoff = np.maximum(0, spot_range - strike) - premium
-            else:
-                payoff = np.maximum(0, strike - spot_range) - premium
+        t = np.maximum(dte_days - np.asarray(horizons, dtype=float), 0)[:, None] / 365   # (H, 1)
+        if surface is not None:
+            sigma = surface.iv(strike[None, :], np.maximum(t, 1e-6))                     # (H, L)
+        else:
+            sigma = np.broadcast_to(np.asarray(np.nan if iv is None else iv, dtype=float), strike.shape)[None, :]
+        given = np.array([leg.get('iv') is not None for leg in legs])
+        if given.any():
+            sigma = np.where(given, [np.nan if leg.get('iv') is None else leg['iv'] for leg in legs], sigma)
+        if not np.all(sigma > 0):
+            raise ValueError("calculate_pnl_curves needs a positive IV for every leg (leg 'iv', surface or iv)")
 
-            total_payoff += payoff * qty * multiplier
-            net_credit_debit += premium * qty * multiplier
+        S = spot_range[None, :, None]
+        live = t[:, :, None] > 0
+        # price_vega needs valid inputs; expired slices are replaced by intrinsic value below
+        price, _ = GreeksEngine.price_vega(is_call, S, strike, np.where(live, t[:, :, None], 1.0), r, sigma[:, None, :])
+        intrinsic = np.maximum(np.where(is_call, S - strike, strike - S), 0)
+        value = np.where(live, price, intrinsic)                                           # (H, N, L)
 
-        return total_payoff, net_credit_debit
+        return value @ signed_qty - net_credit_debit, net_credit_debit
 
     @staticmethod
-    def get_strategy_metrics(spot_range, payoff):
+    def kink_profile(leg_matrix, zero_tol=1e-9):
+        """
+        Expiry payoffs as piecewise-linear profiles.
+        Returns the kinks xs (S = 0 plus every strike, sorted), the payoff ys
+        at each kink, both (strategy x leg+1), and the slope above the highest strike.
+        """
+        leg_matrix = np.asarray(leg_matrix, dtype=float)
+        n = len(leg_matrix)
+        direction = np.where(leg_matrix[..., LEG_TYPE] > 0, 1.0, -1.0)
+        strike = leg_matrix[..., LEG_STRIKE]
+        signed_qty = leg_matrix[..., LEG_SIDE] * leg_matrix[..., LEG_QTY]
+        net_credit_debit = (leg_matrix[..., LEG_PREMIUM] * signed_qty).sum(axis=1)
+
+        # Padding legs sit at strike 0, which is always a kink anyway
+        xs = np.sort(np.concatenate([np.zeros((n, 1)), strike], axis=1), axis=1)
+        intrinsic = np.maximum((xs[:, :, None] - strike[:, None, :]) * direction[:, None, :], 0)
+        ys = np.einsum('skl,sl->sk', intrinsic, signed_qty) - net_credit_debit[:, None]
+        ys[np.abs(ys) < zero_tol] = 0.0
+        # Above every strike only the calls still move with spot
+        right_slope = (signed_qty * (direction > 0)).sum(axis=1)
+        return xs, ys, right_slope
+
+    @staticmethod
+    def exact_metrics_batch(leg_matrix, zero_tol=1e-9):
+        """
+        Exact expiry metrics for many strategies, independent of any spot grid.
+        Expiry payoffs are piecewise linear with kinks only at strikes, so
+        each payoff is evaluated at S = 0 and at its strikes, and the slope
+        above the highest strike decides whether profit or loss is unbounded.
+        Returns max_profit and max_loss arrays (+inf / -inf when unbounded)
+        and a list of ascending breakeven arrays, one per strategy.
+        """
+        xs, ys, right_slope = StrategyLab.kink_profile(leg_matrix, zero_tol)
+
+        max_profit = np.where(right_slope > 0, np.inf, ys.max(axis=1, initial=-np.inf))
+        max_loss = np.where(right_slope < 0, -np.inf, ys.min(axis=1, initial=np.inf))
+
+        # Breakevens: kinks that sit on zero, strict sign changes between kinks, and the right tail
+        y0, y1 = ys[:, :-1], ys[:, 1:]
+        x0, x1 = xs[:, :-1], xs[:, 1:]
+        crosses = y0 * y1 < 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            seg_be = np.where(crosses, x0 - y0 * (x1 - x0) / (y1 - y0), np.nan)
+            tail_be = np.where(ys[:, -1] * right_slope < 0, xs[:, -1] - ys[:, -1] / right_slope, np.nan)
+        point_be = np.where(ys == 0, xs, np.nan)
+        candidates = np.concatenate([point_be, seg_be, tail_be[:, None]], axis=1)
+
+        breakevens = [np.unique(np.round(row[np.isfinite(row)], 2)) for row in candidates]
+        return {
+            'max_profit': max_profit,
+            'max_loss': max_loss,
+            'breakevens': breakevens
+        }
+
+    @staticmethod
+    def get_strategy_metrics(spot_range, payoff, legs=None):
+        """
+        With legs, metrics are exact (see exact_metrics_batch) and max profit /
+        max loss may be +/-inf. Without legs they are read off the sampled payoff.
+        """
+        if legs is not None:
+            exact = StrategyLab.exact_metrics_batch(StrategyLab.legs_to_matrix([legs]))
+            return {
+                "max_profit": round(float(exact['max_profit'][0]), 2),
+                "max_loss": round(float(exact['max_loss'][0]), 2),
+                "breakevens": exact['breakevens'][0].tolist()
+            }
+
         max_profit = np.max(payoff)
         max_loss = np.min(payoff)
 
-        # Find breakevens (where payoff crosses zero)
-        breakevens = []
-        for i in range(len(payoff) - 1):
-            if (payoff[i] <= 0 and payoff[i+1] > 0) or (payoff[i] >= 0 and payoff[i+1] < 0):
-                # Linear interpolation for more accurate breakeven
-                x1, x2 = spot_range[i], spot_range[i+1]
-                y1, y2 = payoff[i], payoff[i+1]
-                be = x1 - y1 * (x2 - x1) / (y2 - y1)
-                breakevens.append(round(be, 2))
+        # Find breakevens (where payoff crosses zero), with linear interpolation
+        y1, y2 = payoff[:-1], payoff[1:]
+        x1, x2 = spot_range[:-1], spot_range[1:]
+        crossing = ((y1 <= 0) & (y2 > 0)) | ((y1 >= 0) & (y2 < 0))
+        be = x1[crossing] - y1[crossing] * (x2[crossing] - x1[crossing]) / (y2[crossing] - y1[crossing])
 
         return {
             "max_profit": round(max_profit, 2),
             "max_loss": round(max_loss, 2),
-            "breakevens": breakevens
+            "breakevens": [round(b, 2) for b in be.tolist()]
         }
@@ -0,0 +1,304 @@
+# core/strategy_scanner.py
+
+import os
+import numpy as np
+from scipy.special import ndtr
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from core.greeks_engine import GreeksEngine
+from core.analyzers import GreeksAnalyzer
+from core.strategy_engine import StrategyLab, LEG_TYPE, LEG_SIDE, LEG_STRIKE, LEG_PREMIUM, LEG_QTY
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+RANK_KEYS = ('expected_pnl', 'pop', 'return_on_risk')
+
+def _lognormal_cdf(x, spot, sigma, t, r):
+    with np.errstate(divide='ignore'):
+        z = (np.log(x / spot) - (r - 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+    return ndtr(z)
+
+def _score_batch(task):
+    """
+    Exact expiry metrics for a batch of candidates under a lognormal
+    terminal spot. Module-level so batches can run in a process pool.
+    Probabilities integrate the piecewise-linear payoff's positive
+    segments; the expected payoff uses each leg's forward option value.
+    """
+    leg_matrix, spot, sigma, t, r = task
+    xs, ys, right_slope = StrategyLab.kink_profile(leg_matrix)
+
+    # POP: probability mass of every kink-to-kink segment where the payoff is positive
+    y0, y1, x0, x1 = ys[:, :-1], ys[:, 1:], xs[:, :-1], xs[:, 1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = x0 - y0 * (x1 - x0) / (y1 - y0)
+        tail_root = xs[:, -1] - ys[:, -1] / right_slope
+    lo = np.where(y0 > 0, x0, root)
+    hi = np.where(y1 > 0, x1, root)
+    seg_mass = np.where((y0 > 0) | (y1 > 0), _lognormal_cdf(hi, spot, sigma, t, r) - _lognormal_cdf(lo, spot, sigma, t, r), 0.0)
+
+    # Above the highest strike the payoff moves with right_slope
+    y_last = ys[:, -1]
+    tail_lo = np.where(y_last > 0, xs[:, -1], tail_root)
+    tail_hi = np.where((y_last > 0) & (right_slope < 0), tail_root, np.inf)
+    tail_mass = np.where(
+        (y_last > 0) | (right_slope > 0),
+        np.where(np.isinf(tail_hi), 1.0, _lognormal_cdf(tail_hi, spot, sigma, t, r)) - _lognormal_cdf(tail_lo, spot, sigma, t, r),
+        0.0
+    )
+
+    # Expected payoff: forward value of each leg at the scan vol, less the premium paid
+    is_call = leg_matrix[..., LEG_TYPE] > 0
+    strike = leg_matrix[..., LEG_STRIKE]
+    signed_qty = leg_matrix[..., LEG_SIDE] * leg_matrix[..., LEG_QTY]
+    forward_value = GreeksEngine.compute(is_call, spot, strike, t, r, sigma)['price'] * np.exp(r * t)
+    expected_pnl = ((forward_value - leg_matrix[..., LEG_PREMIUM]) * signed_qty).sum(axis=1)
+
+    return {
+        'pop': seg_mass.sum(axis=1) + tail_mass,
+        'expected_pnl': expected_pnl,
+        'max_profit': np.where(right_slope > 0, np.inf, ys.max(axis=1)),
+        'max_loss': np.where(right_slope < 0, -np.inf, ys.min(axis=1))
+    }
+
+class StrategyScanner:
+    """
+    Searches an option chain for the best verticals, butterflies, strangles
+    and iron condors.
+    Candidates are enumerated as index combinations over the strikes within
+    band_sd standard deviations of spot; as a sanity bound, combinations
+    with a net debit or credit outside (0, width) are dropped before
+    scoring. After scoring, candidates dominated by another on every
+    ranking metric (expected P&L, POP and return on risk) are pruned.
+    Survivors are scored in vectorized batches, across a process pool
+    (one worker per CPU by default, kept until close()) when there is more
+    than one batch, and ranked by expected P&L, POP or return on risk.
+    """
+    def __init__(self, max_width=4, band_sd=3.0, batch_size=8192, workers=None):
+        self.max_width = max_width      # In strike steps
+        self.band_sd = band_sd
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @staticmethod
+    def _chain_arrays(chain):
+        strikes = np.array([row['strike'] for row in chain], dtype=float)
+        order = np.argsort(strikes)
+        call_ltp = np.array([row.get('call_ltp', 0) for row in chain], dtype=float)[order]
+        put_ltp = np.array([row.get('put_ltp', 0) for row in chain], dtype=float)[order]
+        call_iv = np.array([row.get('call_iv', np.nan) for row in chain], dtype=float)[order]
+        put_iv = np.array([row.get('put_iv', np.nan) for row in chain], dtype=float)[order]
+        return strikes[order], call_ltp, put_ltp, call_iv, put_iv
+
+    @staticmethod
+    def _atm_iv(spot, strikes, call_ltp, put_ltp, call_iv, put_iv, t, r):
+        """
+        Mean of the ATM call and put IVs, solved from their LTPs when the
+        chain carries no IVs. NaN when neither can be had.
+        """
+        i = int(np.argmin(np.abs(strikes - spot)))
+        ivs = np.array([call_iv[i], put_iv[i]])
+        if np.isnan(ivs).all():
+            ivs, _, _ = GreeksAnalyzer.implied_vol_batch([True, False], [call_ltp[i], put_ltp[i]], spot, strikes[i], t, r)
+        ivs = ivs[np.isfinite(ivs)]
+        return float(ivs.mean()) if len(ivs) else float('nan')
+
+    def _pairs(self, idx):
+        """
+        (lower, upper) index pairs at most max_width strike steps apart.
+        """
+        lower, upper = np.triu_indices(len(idx), k=1)
+        keep = idx[upper] - idx[lower] <= self.max_width
+        return idx[lower[keep]], idx[upper[keep]]
+
+    def enumerate_candidates(self, spot, strikes, call_ltp, put_ltp, sigma, t):
+        """
+        Returns (names, leg_matrix) for every candidate that survives pruning.
+        """
+        band = self.band_sd * sigma * np.sqrt(t) * spot
+        in_band = np.abs(strikes - spot) <= band
+        call_idx = np.flatnonzero(in_band & (call_ltp > 0))
+        put_idx = np.flatnonzero(in_band & (put_ltp > 0))
+
+        groups = []
+
+        def add(name, legs, width):
+            # legs: list of (is_call, side, idx array, qty); sanity bound 0 < |net premium| < width
+            net = sum(side * qty * np.where(is_call, call_ltp, put_ltp)[idx] for is_call, side, idx, qty in legs)
+            keep = (np.abs(net) > 0) & (np.abs(net) < width) if width is not None else net != 0
+            if not keep.any():
+                return
+            block = np.zeros((int(keep.sum()), 4, 5))
+            for j, (is_call, side, idx, qty) in enumerate(legs):
+                idx = idx[keep]
+                block[:, j, LEG_TYPE] = 1.0 if is_call else 0.0
+                block[:, j, LEG_SIDE] = side
+                block[:, j, LEG_STRIKE] = strikes[idx]
+                block[:, j, LEG_PREMIUM] = np.where(is_call, call_ltp, put_ltp)[idx]
+                block[:, j, LEG_QTY] = qty
+            groups.append((name, block))
+
+        # Verticals
+        lo, hi = self._pairs(call_idx)
+        width = strikes[hi] - strikes[lo]
+        add('Bull Call Spread', [(True, 1, lo, 1), (True, -1, hi, 1)], width)
+        add('Bear Call Spread', [(True, -1, lo, 1), (True, 1, hi, 1)], width)
+        call_lo, call_hi = lo, hi
+        lo, hi = self._pairs(put_idx)
+        width = strikes[hi] - strikes[lo]
+        add('Bull Put Spread', [(False, 1, lo, 1), (False, -1, hi, 1)], width)
+        add('Bear Put Spread', [(False, -1, lo, 1), (False, 1, hi, 1)], width)
+        put_lo, put_hi = lo, hi
+
+        # Butterflies: equally spaced wings around the body
+        for is_call, idx in ((True, call_idx), (False, put_idx)):
+            available = np.zeros(len(strikes), dtype=bool)
+            available[idx] = True
+            for w in range(1, self.max_width + 1):
+                body = idx[(idx - w >= 0) & (idx + w < len(strikes))]
+                body = body[available[body - w] & available[body + w]]
+                body = body[np.isclose(strikes[body] - strikes[body - w], strikes[body + w] - strikes[body])]
+                name = 'Call Butterfly' if is_call else 'Put Butterfly'
+                add(name, [(is_call, 1, body - w, 1), (is_call, -1, body, 2), (is_call, 1, body + w, 1)],
+                    strikes[body + w] - strikes[body])
+
+        # Strangles: OTM put below spot, OTM call above
+        otm_puts = put_idx[strikes[put_idx] < spot]
+        otm_calls = call_idx[strikes[call_idx] > spot]
+        p, c = (g.ravel() for g in np.meshgrid(otm_puts, otm_calls, indexing='ij'))
+        add('Long Strangle', [(False, 1, p, 1), (True, 1, c, 1)], None)
+        add('Short Strangle', [(False, -1, p, 1), (True, -1, c, 1)], None)
+
+        # Iron condors: an OTM bull put spread under an OTM bear call spread
+        put_side = np.flatnonzero(strikes[put_hi] < spot)
+        call_side = np.flatnonzero(strikes[call_lo] > spot)
+        ps, cs = (g.ravel() for g in np.meshgrid(put_side, call_side, indexing='ij'))
+        wing = np.maximum(strikes[put_hi[ps]] - strikes[put_lo[ps]], strikes[call_hi[cs]] - strikes[call_lo[cs]])
+        add('Iron Condor', [(False, 1, put_lo[ps], 1), (False, -1, put_hi[ps], 1),
+                            (True, -1, call_lo[cs], 1), (True, 1, call_hi[cs], 1)], wing)
+
+        if not groups:
+            return np.array([], dtype=object), np.zeros((0, 4, 5))
+        names = np.concatenate([np.full(len(block), name, dtype=object) for name, block in groups])
+        return names, np.concatenate([block for _, block in groups])
+
+    def score(self, leg_matrix, spot, sigma, t, r=None):
+        """
+        Exact POP, expected P&L, max profit/loss and return on risk for every
+        candidate, in batches of batch_size.
+        """
+        r = settings.RISK_FREE_RATE if r is None else r
+        tasks = [
+            (leg_matrix[start:start + self.batch_size], spot, sigma, t, r)
+            for start in range(0, len(leg_matrix), self.batch_size)
+        ]
+        if self.workers > 1 and len(tasks) > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            parts = list(self._pool.map(_score_batch, tasks))
+        else:
+            parts = [_score_batch(task) for task in tasks]
+
+        keys = ('pop', 'expected_pnl', 'max_profit', 'max_loss')
+        res = {k: np.concatenate([p[k] for p in parts]) if parts else np.zeros(0) for k in keys}
+        # Expected return per unit of capital at risk; undefined when risk is unbounded
+        with np.errstate(divide='ignore', invalid='ignore'):
+            res['return_on_risk'] = np.where(np.isfinite(res['max_loss']) & (res['max_loss'] < 0),
+                                             res['expected_pnl'] / -res['max_loss'], np.nan)
+        return res
+
+    @staticmethod
+    def non_dominated(metrics, chunk=64):
+        """
+        Mask of the candidates no other candidate dominates, i.e. beats or
+        ties on every metric and beats on at least one. metrics: (metric,
+        candidate) array, higher is better; NaN counts as the worst value.
+        Candidates are visited in descending lexicographic order, so only
+        earlier ones can dominate, and by transitivity only the frontier
+        found so far needs checking.
+        """
+        m = np.where(np.isnan(metrics), -np.inf, metrics)
+        order = np.lexsort(m[::-1])[::-1]
+        m = m[:, order]
+        keep = np.zeros(m.shape[1], dtype=bool)
+        frontier = np.empty((len(m), 0))
+        for start in range(0, m.shape[1], chunk):
+            block = m[:, start:start + chunk]
+            ge = np.all(frontier[:, :, None] >= block[:, None, :], axis=0)
+            gt = np.any(frontier[:, :, None] > block[:, None, :], axis=0)
+            alive = ~np.any(ge & gt, axis=0)
+            # Within the chunk, against the earlier candidates only
+            ge = np.all(block[:, :, None] >= block[:, None, :], axis=0)
+            gt = np.any(block[:, :, None] > block[:, None, :], axis=0)
+            alive &= ~np.any(np.triu(ge & gt, k=1), axis=0)
+            keep[start:start + block.shape[1]] = alive
+            frontier = np.concatenate([frontier, block[:, alive]], axis=1)
+        mask = np.zeros_like(keep)
+        mask[order] = keep
+        return mask
+
+    def scan(self, market_data, rank_by='expected_pnl', top_n=10, iv=None, min_pop=0.0, greeks=None):
+        """
+        Top-N strategies on market_data's option_chain as a list of dicts.
+        iv: volatility of the terminal distribution; defaults to the chain's
+            ATM IV, taken from greeks (a GreeksAnalyzer result for this chain)
+            when given, else from the chain rows or their LTPs.
+        """
+        if rank_by not in RANK_KEYS:
+            raise ValueError(f"rank_by must be one of {RANK_KEYS}")
+
+        spot = float(market_data['spot_price'])
+        t = float(market_data.get('time_to_expiry', 0.02))
+        strikes, call_ltp, put_ltp, call_iv, put_iv = self._chain_arrays(market_data['option_chain'])
+        if greeks is not None:
+            order = np.argsort(greeks['strikes'])
+            call_iv, put_iv = np.asarray(greeks['call_iv'])[order], np.asarray(greeks['put_iv'])[order]
+        sigma = iv if iv is not None else self._atm_iv(spot, strikes, call_ltp, put_ltp, call_iv, put_iv, t, settings.RISK_FREE_RATE)
+        if not sigma > 0:
+            logger.warning(f"Strategy scan skipped: no usable ATM IV for {market_data.get('symbol', 'chain')}")
+            return []
+
+        names, leg_matrix = self.enumerate_candidates(spot, strikes, call_ltp, put_ltp, sigma, t)
+        if not len(names):
+            return []
+        res = self.score(leg_matrix, spot, sigma, t)
+
+        # Dominated candidates never make the table
+        alive = self.non_dominated(np.stack([res[k] for k in RANK_KEYS]))
+        eligible = np.flatnonzero(alive & (res['pop'] >= min_pop))
+        key = np.where(np.isnan(res[rank_by]), -np.inf, res[rank_by])[eligible]
+        top = eligible[np.argsort(-key, kind='stable')[:top_n]]
+        breakevens = StrategyLab.exact_metrics_batch(leg_matrix[top])['breakevens']
+
+        table = []
+        for i, be in zip(top, breakevens):
+            legs = [
+                {
+                    'type': 'CE' if leg[LEG_TYPE] > 0 else 'PE',
+                    'action': 'BUY' if leg[LEG_SIDE] > 0 else 'SELL',
+                    'strike': float(leg[LEG_STRIKE]),
+                    'premium': round(float(leg[LEG_PREMIUM]), 2),
+                    'qty': int(leg[LEG_QTY])
+                }
+                for leg in leg_matrix[i] if leg[LEG_QTY] > 0
+            ]
+            table.append({
+                'strategy': names[i],
+                'legs': legs,
+                'net_premium': round(float((leg_matrix[i, :, LEG_PREMIUM] * leg_matrix[i, :, LEG_SIDE] * leg_matrix[i, :, LEG_QTY]).sum()), 2),
+                'max_profit': round(float(res['max_profit'][i]), 2),
+                'max_loss': round(float(res['max_loss'][i]), 2),
+                'breakevens': be.tolist(),
+                'pop': round(float(res['pop'][i]), 4),
+                'expected_pnl': round(float(res['expected_pnl'][i]), 2),
+                'return_on_risk': round(float(res['return_on_risk'][i]), 4)
+            })
+        logger.debug(f"Scanned {len(names)} candidates at IV {sigma:.3f}, {int(alive.sum())} not dominated")
+        return table
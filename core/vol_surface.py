@@ -0,0 +1,176 @@
+# core/vol_surface.py
+
+import time
+import numpy as np
+import logging
+from core.analyzers import ChainBlockAnalyzer
+from core.greeks_engine import GreeksEngine
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class VolatilitySurface:
+    """
+    Smooth implied volatility surface for one underlying.
+    Each expiry's smile is a quadratic fit of total variance (IV^2 * t) in
+    log-moneyness ln(K/F) over OTM quotes. Expiries are joined by linear
+    interpolation in total variance. The fit runs once; iv() lookups are
+    vectorized and cost a few array operations per query.
+    """
+    def __init__(self, spot, r, expiries, times, coefs, k_min, k_max):
+        self.spot = spot
+        self.r = r
+        self.expiries = list(expiries)
+        self.times = np.asarray(times, dtype=float)   # (E,) sorted ascending
+        self.coefs = np.asarray(coefs, dtype=float)   # (E, 3) quadratic in k
+        self.k_min = np.asarray(k_min, dtype=float)   # Fitted log-moneyness range per slice;
+        self.k_max = np.asarray(k_max, dtype=float)   # wings beyond it are held flat
+        self.skew = self._skew_metrics()
+
+    @classmethod
+    def fit(cls, strikes, call_iv, put_iv, mask, spot, times, expiries=None, r=None):
+        """
+        strikes, call_iv, put_iv, mask: (E, N) arrays, one row per expiry
+        spot: underlying price
+        times: (E,) time to expiry in years
+        """
+        r = settings.RISK_FREE_RATE if r is None else r
+        times = np.asarray(times, dtype=float)
+        expiries = list(expiries) if expiries is not None else times.tolist()
+
+        slices = []
+        for i in np.argsort(times):
+            t = times[i]
+            if t <= 0:
+                continue
+            forward = spot * np.exp(r * t)
+            k = np.log(strikes[i] / forward)
+            # OTM side of the smile: puts below the forward, calls above
+            iv = np.where(k < 0, put_iv[i], call_iv[i])
+            ok = mask[i] & np.isfinite(k) & np.isfinite(iv) & (iv > 0)
+            if not ok.any():
+                continue
+            k, w = k[ok], iv[ok] ** 2 * t
+            deg = min(2, len(np.unique(k)) - 1)
+            coef = np.zeros(3)
+            coef[2 - deg:] = np.polyfit(k, w, deg)
+            slices.append((expiries[i], t, coef, k.min(), k.max()))
+
+        if not slices:
+            raise ValueError("No usable IV quotes to fit a volatility surface")
+
+        labels, ts, coefs, k_min, k_max = zip(*slices)
+        return cls(spot, r, labels, ts, coefs, k_min, k_max)
+
+    @classmethod
+    def from_snapshots(cls, snapshots, analyzer=None):
+        """
+        Fits the surface from chain snapshots of one underlying (one per expiry),
+        using the IVs ChainBlockAnalyzer resolves for them.
+        """
+        analyzer = analyzer or ChainBlockAnalyzer()
+        res = analyzer.analyze(snapshots)
+        return cls.fit(
+            res['strikes'], res['call_iv'], res['put_iv'], res['mask'],
+            float(res['spot'][0]), res['time_to_expiry'],
+            expiries=[expiry for _, expiry in res['rows']]
+        )
+
+    def _resolve_t(self, expiry):
+        if isinstance(expiry, str) or expiry is None:
+            if expiry not in self.expiries:
+                raise KeyError(f"Expiry {expiry} is not on the surface")
+            return self.times[self.expiries.index(expiry)]
+        return np.asarray(expiry, dtype=float)
+
+    def total_variance(self, strike, t):
+        """
+        Total variance at each (strike, t) query; arrays broadcast.
+        """
+        strike, t = np.broadcast_arrays(np.asarray(strike, dtype=float), np.asarray(t, dtype=float))
+        shape = strike.shape
+        strike, t = strike.ravel(), t.ravel()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.log(strike / (self.spot * np.exp(self.r * t)))
+        # Every slice evaluated at the query's moneyness: (E, n)
+        kc = np.clip(k[None], self.k_min[:, None], self.k_max[:, None])
+        w = np.maximum(self.coefs[:, :1] * kc ** 2 + self.coefs[:, 1:2] * kc + self.coefs[:, 2:], 1e-10)
+
+        ts = self.times
+        cols = np.arange(len(t))
+        if len(ts) == 1:
+            wt = w[0] / ts[0] * t
+        else:
+            j = np.clip(np.searchsorted(ts, t), 1, len(ts) - 1)
+            t0, t1 = ts[j - 1], ts[j]
+            w0, w1 = w[j - 1, cols], w[j, cols]
+            wt = w0 + (t - t0) / (t1 - t0) * (w1 - w0)
+            # Outside the quoted expiries, hold the nearest slice's vol flat
+            wt = np.where(t <= ts[0], w[0] / ts[0] * t, wt)
+            wt = np.where(t >= ts[-1], w[-1] / ts[-1] * t, wt)
+        return wt.reshape(shape)
+
+    def iv(self, strike, expiry):
+        """
+        Interpolated IV. expiry is a fitted expiry label or time(s) in years.
+        """
+        t = self._resolve_t(expiry)
+        w = self.total_variance(strike, t)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(np.asarray(t) > 0, np.sqrt(w / t), np.nan)
+
+    def _skew_metrics(self, grid_points=201):
+        """
+        ATM IV, 25-delta risk reversal and butterfly for every fitted expiry.
+        25-delta strikes are read off a dense strike grid per slice.
+        """
+        metrics = []
+        for label, t in zip(self.expiries, self.times):
+            atm_iv = float(self.iv(self.spot * np.exp(self.r * t), t))
+            width = 4 * atm_iv * np.sqrt(t)
+            strikes = self.spot * np.exp(self.r * t + np.linspace(-width, width, grid_points))
+            vols = self.iv(strikes, t)
+            call_delta = GreeksEngine.compute(True, self.spot, strikes, t, self.r, vols)['delta']
+
+            # Call delta falls with strike; a -25 delta put sits at call delta 0.75
+            k25c = np.interp(0.25, call_delta[::-1], strikes[::-1])
+            k25p = np.interp(0.75, call_delta[::-1], strikes[::-1])
+            iv25c = float(self.iv(k25c, t))
+            iv25p = float(self.iv(k25p, t))
+
+            metrics.append({
+                'expiry': label,
+                'time_to_expiry': float(t),
+                'atm_iv': round(atm_iv, 4),
+                'rr25': round(iv25c - iv25p, 4),
+                'bf25': round(0.5 * (iv25c + iv25p) - atm_iv, 4)
+            })
+        return metrics
+
+class VolSurfaceCache:
+    """
+    Keeps one fitted surface per key (e.g. underlying) for a cycle, so every
+    consumer in the cycle shares the same fit.
+    """
+    def __init__(self, ttl=settings.UPDATE_INTERVAL_SECONDS):
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, key, build):
+        """
+        Returns the cached surface for key, calling build() when it is stale.
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self.ttl:
+            return entry[1]
+        surface = build()
+        self._entries[key] = (now, surface)
+        return surface
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
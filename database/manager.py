@@ -60,6 +60,17 @@ class DatabaseManager:
                     matched_patterns TEXT
                 )
             ''')
+            # Full market snapshots, replayed by the backtest engine
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS market_snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME,
+                    symbol TEXT,
+                    spot_price REAL,
+                    payload TEXT
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_symbol_ts ON market_snapshots (symbol, timestamp)")
             # System state
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS system_config (
@@ -102,6 +113,78 @@ class DatabaseManager:
 
             conn.commit()
 
+    def save_candles(self, symbol, df, interval):
+        """
+        Stores OHLCV rows (timestamp, open, high, low, close, volume); duplicates are skipped.
+        """
+        rows = [
+            (symbol, str(pd.Timestamp(r.timestamp)), float(r.open), float(r.high), float(r.low), float(r.close), int(r.volume), interval)
+            for r in df.itertuples(index=False)
+        ]
+        with self._get_connection() as conn:
+            conn.executemany('''
+                INSERT OR IGNORE INTO candles (symbol, timestamp, open, high, low, close, volume, interval)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+
+    def get_candles(self, symbol, interval, since=None):
+        """
+        Candles for a symbol in timestamp order, optionally only those after `since`.
+        """
+        query = "SELECT timestamp, open, high, low, close, volume FROM candles WHERE symbol = ? AND interval = ?"
+        params = [symbol, interval]
+        if since is not None:
+            query += " AND timestamp > ?"
+            params.append(str(pd.Timestamp(since)))
+        query += " ORDER BY timestamp"
+        with self._get_connection() as conn:
+            return pd.read_sql_query(query, conn, params=params, parse_dates=['timestamp'])
+
+    def save_market_snapshot(self, market_data):
+        """
+        Stores a fetch_all_data snapshot (front chain included, chain block left out) as JSON.
+        """
+        market_data = {k: v for k, v in market_data.items() if k != 'chain_block'}
+        timestamp = str(pd.Timestamp(market_data['timestamp']))
+        with self._get_connection() as conn:
+            conn.execute('''
+                INSERT INTO market_snapshots (timestamp, symbol, spot_price, payload)
+                VALUES (?, ?, ?, ?)
+            ''', (timestamp, market_data.get('symbol'), market_data.get('spot_price'), json.dumps(market_data, default=str)))
+            conn.commit()
+
+    def get_snapshot_days(self, symbol, start=None, end=None):
+        """
+        Trading days (YYYY-MM-DD) with stored snapshots, optionally within [start, end].
+        """
+        query = "SELECT DISTINCT substr(timestamp, 1, 10) AS day FROM market_snapshots WHERE symbol = ?"
+        params = [symbol]
+        if start is not None:
+            query += " AND day >= ?"
+            params.append(str(start)[:10])
+        if end is not None:
+            query += " AND day <= ?"
+            params.append(str(end)[:10])
+        with self._get_connection() as conn:
+            return [row[0] for row in conn.execute(query + " ORDER BY day", params)]
+
+    def get_market_snapshots(self, symbol, day):
+        """
+        The day's snapshots in time order, decoded back into market data dicts.
+        """
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT payload FROM market_snapshots WHERE symbol = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+                (symbol, day, f"{day}~")
+            ).fetchall()
+        snapshots = []
+        for (payload,) in rows:
+            data = json.loads(payload)
+            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+            snapshots.append(data)
+        return snapshots
+
     def get_config(self, key, default=None):
         with self._get_connection() as conn:
             cursor = conn.cursor()
@@ -92,14 +92,14 @@ def run_demo_setup():
     try:
         from database.manager import DatabaseManager
         from core.simulator import RealisticSimulator
+        from config import settings
         import json
 
         db = DatabaseManager()
         # 1. Populate Realistic Data
         print("📈 Generating high-fidelity price history...")
         df_nifty = RealisticSimulator.generate_stock_data("NIFTY", 24500.0)
-        # Assuming db has save_candles method, if not I'll need to check
-        # For now I'll just set config to look "alive"
+        db.save_candles("NIFTY", df_nifty, settings.CANDLE_INTERVAL)
 
         market_state = RealisticSimulator.generate_market_state()
         db.set_config("market_state", json.dumps(market_state))
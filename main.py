@@ -4,8 +4,10 @@ Production-ready, self-learning options analysis system
 """
 
 import asyncio
+import argparse
 import logging
-from datetime import datetime
+import pandas as pd
+from datetime import datetime, date
 import sys
 import os
 
@@ -14,10 +16,15 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 # Import core modules
 from core.data_fetcher import DataFetcher
-from core.analyzers import GreeksAnalyzer, GEXAnalyzer, OIAnalyzer, SmartMoneyAnalyzer
-from core.signal_generator import SignalGenerator
-from core.knowledge_base import KnowledgeBase
-from core.validator import MultiLevelValidator
+from core.analyzers import ChainBlockAnalyzer
+from core.realized_vol import RealizedVolEngine, CandleBuilder
+from core.strategy_scanner import StrategyScanner
+from core.simulator import MarketSimulator
+from core.live_chain import LiveChain
+from services.tick_feed import LocalTickServer, LocalTickFeed, SmartAPITickFeed
+from services.instrument_master import InstrumentMaster
+from services.quote_client import QuoteClient
+from core.pipeline import SignalPipeline
 from core.learner import SelfLearningEngine
 from core.error_detector import ErrorDetectionSystem
 from database.manager import DatabaseManager
@@ -37,27 +44,41 @@ class ANZAOptionsAnalyzer:
     Combines all components into cohesive analysis engine
     """
 
-    def __init__(self):
+    def __init__(self, simulator=None, update_interval=settings.UPDATE_INTERVAL_SECONDS, stream=False):
         logger.info("🚀 Initializing ANZA Options Analyzer...")
+        self.simulator = simulator
+        self.update_interval = update_interval
+        self.stream = stream
+        self.tick_server = None
+        self.tick_feed = None
 
         # Initialize services
         self.angel_service = AngelOneService()
         self.alert_service = AlertService()
         self.db_manager = DatabaseManager()
+        self.instrument_master = InstrumentMaster()
+        self.quote_client = QuoteClient(self.angel_service)
 
         # Initialize data layer
-        self.data_fetcher = DataFetcher(self.angel_service)
+        self.data_fetcher = DataFetcher(self.angel_service, simulator=simulator, quotes=self.quote_client,
+                                        block_symbols=("NIFTY", "BANKNIFTY"))
 
         # Initialize analysis components
-        self.greeks_analyzer = GreeksAnalyzer()
-        self.gex_analyzer = GEXAnalyzer()
-        self.oi_analyzer = OIAnalyzer()
-        self.smart_money_analyzer = SmartMoneyAnalyzer()
-        self.signal_generator = SignalGenerator()
+        # Snapshot-level steps are shared with the backtest replay
+        self.pipeline = SignalPipeline()
+        self.greeks_analyzer = self.pipeline.greeks_analyzer
+        self.gex_analyzer = self.pipeline.gex_analyzer
+        self.oi_analyzer = self.pipeline.oi_analyzer
+        self.smart_money_analyzer = self.pipeline.smart_money_analyzer
+        self.chain_block_analyzer = ChainBlockAnalyzer(greeks_analyzer=self.greeks_analyzer)
+        self.realized_vol = RealizedVolEngine(self.db_manager)
+        self.candle_builder = CandleBuilder(self.realized_vol.interval)
+        self.strategy_scanner = StrategyScanner()
+        self.signal_generator = self.pipeline.signal_generator
 
         # Initialize intelligence layer
-        self.knowledge_base = KnowledgeBase()
-        self.validator = MultiLevelValidator(self.knowledge_base)
+        self.knowledge_base = self.pipeline.knowledge_base
+        self.validator = self.pipeline.validator
         self.learner = SelfLearningEngine(self.db_manager)
         self.error_detector = ErrorDetectionSystem()
 
@@ -76,19 +97,28 @@ class ANZAOptionsAnalyzer:
         logger.info("🎯 ANZA OPTIONS ANALYZER STARTING")
         logger.info("="*80)
 
-        # Login to Angel One
-        try:
-            # Check validation
-            missing = settings.validate()
-            if missing:
-                logger.error(f"❌ Missing credentials: {missing}")
-                return
-
-            await self.angel_service.login()
-            logger.info("✅ Angel One API connected")
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to Angel One: {e}")
-            # return # Continue for simulation/demo if requested, but production should return
+        # Login to Angel One (a simulated market needs no broker)
+        if self.simulator is not None:
+            logger.info(f"🎮 Simulated market: {len(self.simulator.symbols)} instruments, {self.simulator.tick_seconds}s ticks")
+        else:
+            try:
+                # Check validation
+                missing = settings.validate()
+                if missing:
+                    logger.error(f"❌ Missing credentials: {missing}")
+                    return
+
+                await self.angel_service.login()
+                self.angel_service.start_session_refresh()
+                logger.info("✅ Angel One API connected")
+
+                # Cached daily; only the first start of the day downloads
+                await asyncio.to_thread(self.instrument_master.load)
+                self.data_fetcher.instruments = self.instrument_master
+                logger.info(f"✅ Instrument master loaded ({self.instrument_master.as_of})")
+            except Exception as e:
+                logger.error(f"❌ Failed to connect to Angel One: {e}")
+                # return # Continue for simulation/demo if requested, but production should return
 
         # Test database connection
         if not self.db_manager.test_connection():
@@ -96,7 +126,11 @@ class ANZAOptionsAnalyzer:
             return
 
         logger.info("✅ Database connected")
-        logger.info("🔄 Starting analysis loop (60-second intervals)")
+
+        if self.stream:
+            self.start_tick_stream()
+
+        logger.info(f"🔄 Starting analysis loop ({self.update_interval}-second intervals)")
         logger.info("-"*80)
 
         # Start main loop
@@ -141,6 +175,8 @@ class ANZAOptionsAnalyzer:
                     await asyncio.sleep(60)
                     continue
 
+                if market_data.get('stale_fields'):
+                    logger.warning(f"⚠️ Stale fields carried from the last cycle: {', '.join(market_data['stale_fields'])}")
                 logger.info(f"✅ Data fetched - NIFTY spot: {market_data['spot_price']:.2f}\n")
 
                 # ===== STEP 3: DATA QUALITY CHECK =====
@@ -157,70 +193,52 @@ class ANZAOptionsAnalyzer:
                 # ===== STEP 4: RUN ANALYSES =====
                 logger.info("🧮 Step 4: Running comprehensive analysis...")
 
-                # Greeks analysis
-                logger.info("  • Calculating Greeks...")
-                greeks_results = self.greeks_analyzer.analyze(market_data)
-
-                # GEX analysis
-                logger.info("  • Calculating GEX...")
-                gex_results = self.gex_analyzer.analyze(market_data, greeks_results)
+                # Greeks and term structure: the front chain is a row of the block, analyzed once
+                logger.info("  • Calculating Greeks and term structure...")
+                block_results = self.chain_block_analyzer.analyze(market_data.get('chain_block') or [])
+                greeks_results = self.chain_block_analyzer.row_greeks(block_results, (market_data['symbol'], market_data.get('expiry')))
+                if greeks_results is None:
+                    greeks_results = self.greeks_analyzer.analyze(market_data)
+                logger.info(f"    ✓ {len(block_results['rows'])} chains analyzed in one block")
+                if self.greeks_analyzer.cache is not None:
+                    cache_stats = self.greeks_analyzer.cache.stats()
+                    logger.info(f"    ✓ Greeks cache: {cache_stats['last_hits']} reused, {cache_stats['last_misses']} repriced (hit rate {cache_stats['hit_rate']*100:.1f}%)")
+
+                # Realized volatility from stored candles (incremental); this cycle's spot extends them
+                logger.info("  • Updating realized volatility...")
+                self.save_candles(market_data)
+                realized_vol = self.realized_vol.refresh(market_data['symbol'])
+                front_atm_iv = block_results['term_structure'][0]['atm_iv'] if block_results['term_structure'] else float('nan')
+                iv_hv_spread = front_atm_iv - realized_vol['close_to_close'][20]
+                logger.info(f"    ✓ IV-HV(20) spread: {iv_hv_spread*100:.2f} vol pts")
+
+                # Strategy scan over the live chain
+                logger.info("  • Scanning strategies...")
+                strategy_scan = self.strategy_scanner.scan(market_data, rank_by='expected_pnl', top_n=10, greeks=greeks_results)
+                if strategy_scan:
+                    best = strategy_scan[0]
+                    logger.info(f"    ✓ Top: {best['strategy']} {[leg['strike'] for leg in best['legs']]} (EV {best['expected_pnl']:.2f}, POP {best['pop']*100:.1f}%)")
+
+                # GEX, OI and Smart Money: the same pipeline steps the backtest replays
+                logger.info("  • Calculating GEX, OI and Smart Money...")
+                analysis_results = self.pipeline.analyze(market_data, greeks=greeks_results, extra={
+                    'term_structure': block_results['term_structure'],
+                    'realized_vol': realized_vol,
+                    'iv_hv_spread': iv_hv_spread,
+                    'strategy_scan': strategy_scan
+                })
+                gex_results = analysis_results['gex']
                 logger.info(f"    ✓ Net GEX: {gex_results['net_gex']/1e9:.2f}B ({gex_results['regime']})")
-
-                # OI analysis
-                logger.info("  • Analyzing Open Interest...")
-                oi_results = self.oi_analyzer.analyze(market_data)
-                logger.info(f"    ✓ PCR: {oi_results['pcr']:.3f}")
-
-                # Smart Money analysis
-                logger.info("  • Tracking Smart Money...")
-                smart_money_results = self.smart_money_analyzer.analyze(market_data)
+                logger.info(f"    ✓ PCR: {analysis_results['oi']['pcr']:.3f}")
 
                 logger.info("✅ Analysis complete\n")
 
-                # ===== STEP 5: PATTERN MATCHING =====
-                logger.info("🎯 Step 5: Matching patterns from knowledge base...")
-
-                analysis_results = {
-                    'market_data': market_data,
-                    'greeks': greeks_results,
-                    'gex': gex_results,
-                    'oi': oi_results,
-                    'smart_money': smart_money_results
-                }
-
-                matched_patterns = self.knowledge_base.find_matching_patterns(analysis_results)
-
-                logger.info(f"✅ Found {len(matched_patterns)} matching patterns\n")
-
-                # ===== STEP 6: GENERATE SIGNALS =====
-                logger.info("💡 Step 6: Generating trade signals...")
-
-                preliminary_signals = self.signal_generator.generate_signals(
-                    analysis_results,
-                    matched_patterns
-                )
-
-                logger.info(f"✅ Generated {len(preliminary_signals)} preliminary signals\n")
-
-                # ===== STEP 7: MULTI-LEVEL VALIDATION =====
-                logger.info("✔️ Step 7: Validating signals through multiple layers...")
-
-                validated_signals = []
-                for signal in preliminary_signals:
-                    validation_result = self.validator.validate_signal(signal, analysis_results)
-
-                    if validation_result['decision'] == 'APPROVED':
-                        # Check for known failure scenarios
-                        failure_check = self.knowledge_base.check_failure_scenarios(
-                            signal, analysis_results
-                        )
-
-                        if failure_check.get('warnings'):
-                            signal['warnings'] = failure_check['warnings']
-                            signal['confidence'] -= 20
-
-                        validated_signals.append(signal)
+                # ===== STEPS 5-7: PATTERNS, SIGNALS AND VALIDATION =====
+                logger.info("🎯 Step 5: Matching patterns, generating and validating signals...")
+                matched_patterns, preliminary_signals, validated_signals = self.pipeline.signals(analysis_results)
 
+                logger.info(f"✅ Found {len(matched_patterns)} matching patterns")
+                logger.info(f"✅ Generated {len(preliminary_signals)} preliminary signals")
                 logger.info(f"✅ {len(validated_signals)} signals passed validation\n")
 
                 # ===== STEP 8: FINAL SIGNALS =====
@@ -255,6 +273,7 @@ class ANZAOptionsAnalyzer:
                     analysis_results=analysis_results,
                     signals=validated_signals
                 )
+                self.db_manager.save_market_snapshot(market_data)
 
                 logger.info("✅ Analysis saved\n")
 
@@ -269,7 +288,8 @@ class ANZAOptionsAnalyzer:
                 self.db_manager.set_config("engine_running", "ON")
 
                 cycle_duration = (datetime.now() - cycle_start_time).total_seconds()
-                wait_time = max(0, 60 - cycle_duration)
+                logger.info(f"⏱️ Cycle took {cycle_duration:.2f}s")
+                wait_time = max(0, self.update_interval - cycle_duration)
                 await asyncio.sleep(wait_time)
 
             except KeyboardInterrupt:
@@ -280,21 +300,75 @@ class ANZAOptionsAnalyzer:
 
         await self.shutdown()
 
+    def start_tick_stream(self, symbol="NIFTY"):
+        """
+        Keeps a LiveChain current from a tick feed; the data fetcher then
+        reads spot and chain from its snapshots instead of polling.
+        """
+        if self.simulator is not None:
+            self.tick_server = LocalTickServer(self.simulator, symbol).start()
+            live_chain = LiveChain(symbol, self.tick_server.expiry, self.tick_server.spot_token,
+                                   self.tick_server.instruments, clock=lambda: self.simulator.now)
+            self.tick_feed = LocalTickFeed(self.tick_server.host, self.tick_server.port, live_chain.tokens, live_chain.apply_ticks)
+            source = "the local tick server"
+        else:
+            if self.instrument_master.columns is None:
+                logger.warning("⚠️ No instrument master for tick tokens; polling instead")
+                return
+            master = self.instrument_master
+            expiry = next(e for e in master.expiries(symbol) if e >= date.today().isoformat())
+            live_chain = LiveChain(symbol, expiry, master.spot_token(symbol), master.chain(symbol, expiry),
+                                   futures_token=master.futures_token(symbol))
+            self.tick_feed = SmartAPITickFeed(self.angel_service, live_chain.token_list(), live_chain.apply_ticks)
+            source = "SmartAPI"
+
+        self.tick_feed.start()
+        self.data_fetcher.live_chain = live_chain
+        logger.info(f"📡 Streaming {len(live_chain.tokens)} tokens from {source}")
+
+    def save_candles(self, market_data, flush=False):
+        """
+        Folds the snapshot's spot into the current candle and stores completed ones.
+        """
+        symbol = market_data['symbol']
+        closed = self.candle_builder.update(symbol, market_data['timestamp'], market_data['spot_price'])
+        if flush:
+            closed += self.candle_builder.flush(symbol)
+        if closed:
+            self.db_manager.save_candles(symbol, pd.DataFrame(closed), self.candle_builder.interval)
+
     async def shutdown(self):
         logger.info("🧹 Cleaning up...")
+        if self.data_fetcher.last_data:
+            self.save_candles(self.data_fetcher.last_data, flush=True)
+        for name, stats in self.angel_service.metrics().items():
+            logger.info(f"📈 SmartAPI {name}: {stats}")
+        if self.tick_feed is not None:
+            self.tick_feed.stop()
+        if self.tick_server is not None:
+            self.tick_server.stop()
+        self.strategy_scanner.close()
         self.angel_service.close()
         self.db_manager.close()
         self.db_manager.set_config("engine_running", "OFF")
         logger.info("\n✅ Shutdown complete.")
 
 
-async def main():
-    analyzer = ANZAOptionsAnalyzer()
+async def main(simulate=False, seed=None, interval=settings.UPDATE_INTERVAL_SECONDS, strikes=41, stream=False):
+    simulator = MarketSimulator(seed=seed, n_strikes=strikes) if simulate else None
+    analyzer = ANZAOptionsAnalyzer(simulator=simulator, update_interval=interval, stream=stream)
     await analyzer.start()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--simulate", action="store_true", help="Run against the correlated market simulator instead of the broker")
+    parser.add_argument("--seed", type=int, default=None, help="Simulator seed")
+    parser.add_argument("--interval", type=float, default=settings.UPDATE_INTERVAL_SECONDS, help="Seconds between cycles (0 to run back to back)")
+    parser.add_argument("--strikes", type=int, default=41, help="Listed strikes per simulated chain")
+    parser.add_argument("--stream", action="store_true", help="Stream ticks into a live chain instead of polling snapshots")
+    args = parser.parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.simulate, args.seed, args.interval, args.strikes, args.stream))
     except KeyboardInterrupt:
         pass
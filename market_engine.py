@@ -1,6 +1,7 @@
 import numpy as np
-from scipy.stats import norm
 import pandas as pd
+from core.greeks_engine import GreeksEngine
+from config import settings
 
 # ==========================================
 # PART 1: OPTION GREEKS ENGINE (Black-Scholes)
@@ -16,33 +17,10 @@ class Greeks:
         S: Spot Price (Underlying)
         K: Strike Price
         t: Time to expiration (in years)
-        r: Risk-free interest rate (e.g., 0.10 for 10%)
+        r: Risk-free interest rate (e.g., settings.RISK_FREE_RATE)
         sigma: Implied Volatility (e.g., 0.20 for 20%)
         """
-
-        # Safety check for zero time
-        if t <= 0:
-            return {'delta': 0, 'gamma': 0, 'theta': 0, 'vega': 0}
-
-        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
-        d2 = d1 - sigma * np.sqrt(t)
-
-        if flag == 'c':
-            delta = norm.cdf(d1)
-            theta = (- (S * norm.pdf(d1) * sigma) / (2 * np.sqrt(t)) - r * K * np.exp(-r * t) * norm.cdf(d2))
-        else:
-            delta = -norm.cdf(-d1)
-            theta = (- (S * norm.pdf(d1) * sigma) / (2 * np.sqrt(t)) + r * K * np.exp(-r * t) * norm.cdf(-d2))
-
-        gamma = norm.pdf(d1) / (S * sigma * np.sqrt(t))
-        vega = S * norm.pdf(d1) * np.sqrt(t) # Note: Result is usually divided by 100 for percentage view
-
-        return {
-            'delta': round(delta, 3),
-            'gamma': round(gamma, 6),
-            'theta': round(theta / 365, 3), # Daily Theta decay
-            'vega': round(vega / 100, 3)
-        }
+        return GreeksEngine.calculate(flag, S, K, t, r, sigma)
 
 # ==========================================
 # PART 2: SMART MONEY ANALYSIS (OI Logic)
@@ -110,7 +88,7 @@ class GEX:
 # ==========================================
 if __name__ == "__main__":
     # 1. Test Greeks
-    greeks = Greeks.calculate('c', 24500, 24600, 0.02, 0.10, 0.15)
+    greeks = Greeks.calculate('c', 24500, 24600, 0.02, settings.RISK_FREE_RATE, 0.15)
     print(f"Nifty 24600 CE Greeks: {greeks}")
 
     # 2. Test Smart Money
@@ -0,0 +1,29 @@
+# scripts/run_backtest.py
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.backtest import BacktestEngine
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbol", default="NIFTY")
+    parser.add_argument("--start", default=None, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--horizon", type=int, default=15, help="Forward window in cycles")
+    args = parser.parse_args()
+
+    print(f"⏪ Replaying stored {args.symbol} snapshots...")
+    result = BacktestEngine(workers=args.workers, horizon=args.horizon).run(args.symbol, args.start, args.end)
+    print(f"✅ {result['cycles']} cycles over {len(result['days'])} days in {result['elapsed']:.1f}s, {result['signals']} signals")
+    for name, stats in sorted(result['patterns'].items(), key=lambda kv: -kv[1]['occurrences']):
+        print(f"  • {name}: {stats['occurrences']} hits, fwd {stats['mean_forward_return']*100:+.3f}%, "
+              f"up {stats['up_rate']*100:.0f}%, win rate {stats['win_rate']*100:.0f}%, P&L {stats['total_pnl']:+.2f}")
+
+if __name__ == "__main__":
+    run()
@@ -1,27 +1,113 @@
 # services/angel_one.py
 
+import asyncio
+import base64
+import json
+import time
 import pyotp
 import logging
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from SmartApi import SmartConnect
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Assumed session lifetime when the JWT carries no readable expiry
+DEFAULT_SESSION_SECONDS = 6 * 3600
+
 class AngelOneService:
-    def __init__(self):
+    """
+    Async facade over the blocking SmartAPI client.
+    Every SmartConnect call runs in a bounded thread pool, so the event loop
+    never waits on the network. Session calls retry transient failures with
+    backoff; market data is sent once per call, as QuoteClient retries it
+    under its rate limiter.
+    After login, a background task refreshes the session refresh_margin
+    seconds before the JWT expires. metrics() reports per-call latency and
+    retry counts.
+    """
+    def __init__(self, max_workers=4, retries=2, retry_delay=0.5, refresh_margin=600):
         self.smart_api = None
         self.jwt_token = None
         self.feed_token = None
+        self.refresh_token = None
+        self.expires_at = None  # Epoch seconds
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.refresh_margin = refresh_margin
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="smartapi")
+        self._refresh_task = None
+        self._latency = defaultdict(lambda: deque(maxlen=500))
+        self._counts = defaultdict(lambda: {'calls': 0, 'retries': 0, 'errors': 0})
+
+    async def _call(self, name, fn, *args, retries=None, retry=False):
+        """
+        Runs a blocking SmartAPI call in the pool, retrying transient errors
+        up to retries times (self.retries by default). retry marks the call
+        itself as a caller's retry in the metrics.
+        """
+        loop = asyncio.get_running_loop()
+        counts = self._counts[name]
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            # Every attempt counts as a request sent; all but a caller's first one as a retry
+            counts['calls'] += 1
+            counts['retries'] += bool(attempt or retry)
+            start = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(self._executor, fn, *args)
+                self._latency[name].append(time.perf_counter() - start)
+                return result
+            except (ConnectionError, TimeoutError, OSError) as e:
+                self._latency[name].append(time.perf_counter() - start)
+                if attempt == retries:
+                    counts['errors'] += 1
+                    raise
+                logger.warning(f"SmartAPI {name} failed ({e}), retry {attempt + 1}/{retries}")
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+            except Exception:
+                counts['errors'] += 1
+                raise
+
+    def metrics(self):
+        """
+        Per-call counts, retries, errors and latency percentiles in milliseconds.
+        """
+        report = {}
+        for name, counts in self._counts.items():
+            latency = sorted(self._latency[name])
+            pick = lambda q: round(1000 * latency[min(int(q * len(latency)), len(latency) - 1)], 1) if latency else None
+            report[name] = {**counts, 'p50_ms': pick(0.5), 'p95_ms': pick(0.95), 'max_ms': pick(1.0)}
+        return report
+
+    @staticmethod
+    def _token_expiry(jwt_token):
+        """
+        The JWT 'exp' claim (read without verification), if present.
+        """
+        try:
+            payload = jwt_token.split(" ")[-1].split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            return float(claims['exp'])
+        except (IndexError, KeyError, ValueError, TypeError):
+            return None
+
+    def _set_session(self, data):
+        self.jwt_token = data['jwtToken']
+        self.refresh_token = data.get('refreshToken', self.refresh_token)
+        self.expires_at = self._token_expiry(self.jwt_token) or time.time() + DEFAULT_SESSION_SECONDS
 
     async def login(self):
         try:
             self.smart_api = SmartConnect(api_key=settings.ANGEL_API_KEY)
             totp = pyotp.TOTP(settings.ANGEL_TOTP_SECRET).now()
-            data = self.smart_api.generateSession(settings.ANGEL_CLIENT_ID, settings.ANGEL_PASSWORD, totp)
+            data = await self._call('generateSession', self.smart_api.generateSession,
+                                    settings.ANGEL_CLIENT_ID, settings.ANGEL_PASSWORD, totp)
 
             if data['status']:
-                self.jwt_token = data['data']['jwtToken']
-                self.feed_token = self.smart_api.getfeedToken()
+                self._set_session(data['data'])
+                self.feed_token = await self._call('getfeedToken', self.smart_api.getfeedToken)
                 return True
             else:
                 raise Exception(data['message'])
@@ -29,10 +115,48 @@ class AngelOneService:
             logger.error(f"Angel One Login Error: {e}")
             raise
 
+    async def refresh_session(self):
+        """
+        Renews the JWT with the refresh token, falling back to a full login.
+        """
+        try:
+            data = await self._call('generateToken', self.smart_api.generateToken, self.refresh_token)
+            if not data or not data.get('status'):
+                raise ConnectionError(data.get('message') if data else "empty token response")
+            self._set_session(data['data'])
+            self.feed_token = data['data'].get('feedToken', self.feed_token)
+            logger.info("Angel One session refreshed")
+        except Exception as e:
+            logger.warning(f"Session refresh failed ({e}), logging in again")
+            await self.login()
+
+    def start_session_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(max(self.expires_at - self.refresh_margin - time.time(), 0))
+            try:
+                await self.refresh_session()
+            except Exception as e:
+                logger.error(f"Angel One session could not be renewed: {e}")
+                await asyncio.sleep(60)
+
+    async def market_data(self, mode, exchange_tokens, retry=False):
+        """
+        Quotes for up to 50 tokens, e.g. market_data("FULL", {"NFO": ["43650"]}).
+        A single request: rate-limited retries are QuoteClient's job, with
+        retry=True on every resend.
+        """
+        return await self._call('getMarketData', self.smart_api.getMarketData, mode, exchange_tokens, retries=0, retry=retry)
+
     def get_spot_price(self, symbol="NIFTY"):
         # Placeholder for real LTP fetch
         # In production, this would call smart_api.ltpData
         return 24500.0
 
     def close(self):
-        pass
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,161 @@
+# services/instrument_master.py
+
+import os
+import numpy as np
+import pandas as pd
+from datetime import date
+import logging
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SCRIP_MASTER_URL = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
+
+# NSE index tokens used for spot subscriptions
+INDEX_TOKENS = {'NIFTY': '26000', 'BANKNIFTY': '26009', 'FINNIFTY': '26037'}
+
+# Instrument type codes in the cached arrays
+TYPE_CODES = {'CE': 0, 'PE': 1, 'FUT': 2}
+TYPE_NAMES = {v: k for k, v in TYPE_CODES.items()}
+
+class InstrumentMaster:
+    """
+    Broker scrip master cached on disk and indexed in memory.
+    The raw JSON (every listed instrument) is downloaded at most once a
+    day and kept as a columnar .npz of the NFO index derivatives, which
+    loads in milliseconds. Lookups go through dict indexes by token and by
+    (underlying, expiry, strike, type); whole chains are resolved once per
+    (underlying, expiry) and memoized.
+    """
+    def __init__(self, cache_dir=settings.CACHE_DIR, url=SCRIP_MASTER_URL, underlyings=tuple(INDEX_TOKENS)):
+        self.cache_path = os.path.join(cache_dir, "scrip_master.npz")
+        self.url = url
+        self.underlyings = underlyings
+        self.as_of = None
+        self.columns = None
+        self._by_token = {}
+        self._by_key = {}
+        self._chains = {}
+
+    def _download(self):
+        import requests
+
+        response = requests.get(self.url, timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    def columns_from_records(self, records):
+        """
+        Parses raw scrip master records into the cached columnar layout,
+        keeping index options and futures of the tracked underlyings.
+        """
+        df = pd.DataFrame.from_records(records, columns=['token', 'symbol', 'name', 'expiry', 'strike', 'lotsize', 'instrumenttype', 'exch_seg'])
+        df = df[(df['exch_seg'] == 'NFO') & df['instrumenttype'].isin(['OPTIDX', 'FUTIDX']) & df['name'].isin(self.underlyings)]
+
+        is_future = (df['instrumenttype'] == 'FUTIDX').to_numpy()
+        opt_type = np.where(is_future, 'FUT', df['symbol'].str[-2:])
+        return {
+            'token': df['token'].to_numpy(dtype=np.int64),
+            'underlying': df['name'].to_numpy(dtype=str),
+            'symbol': df['symbol'].to_numpy(dtype=str),
+            'expiry': pd.to_datetime(df['expiry'], format="%d%b%Y").to_numpy(dtype='datetime64[D]'),
+            # The master quotes strikes in paise (-1 for futures)
+            'strike': np.where(is_future, 0.0, pd.to_numeric(df['strike']).to_numpy() / 100),
+            'type': pd.Series(opt_type).map(TYPE_CODES).to_numpy(dtype=np.int8),
+            'lot_size': pd.to_numeric(df['lotsize']).to_numpy(dtype=np.int32)
+        }
+
+    def load(self, today=None):
+        """
+        Loads the cached master, downloading a fresh one when the cache is
+        missing or from an earlier day. A failed download falls back to the
+        stale cache.
+        """
+        today = today or date.today()
+        cached = os.path.exists(self.cache_path)
+        if cached:
+            with np.load(self.cache_path) as npz:
+                columns = {k: npz[k] for k in npz.files if k != 'as_of'}
+                as_of = date.fromisoformat(str(npz['as_of']))
+            if as_of >= today:
+                self._index(columns, as_of)
+                return self
+
+        try:
+            columns = self.columns_from_records(self._download())
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            np.savez(self.cache_path, as_of=today.isoformat(), **columns)
+            self._index(columns, today)
+            logger.info(f"Instrument master refreshed: {len(columns['token'])} instruments")
+        except Exception as e:
+            if not cached:
+                raise
+            logger.warning(f"Instrument master download failed, using the {as_of} cache: {e}")
+            self._index(columns, as_of)
+        return self
+
+    def _index(self, columns, as_of):
+        self.columns = columns
+        self.as_of = as_of
+        tokens = columns['token'].astype(str).tolist()
+        keys = zip(
+            columns['underlying'].tolist(), columns['expiry'].astype(str).tolist(),
+            columns['strike'].tolist(), [TYPE_NAMES[t] for t in columns['type'].tolist()]
+        )
+        self._by_token = dict(zip(tokens, range(len(tokens))))
+        self._by_key = {key: token for key, token in zip(keys, tokens)}
+        self._chains = {}
+
+    def token(self, underlying, expiry, strike, opt_type):
+        """
+        Token for one contract, or None if it is not listed. Futures use strike 0.
+        """
+        return self._by_key.get((underlying, str(expiry), float(strike), opt_type))
+
+    def instrument(self, token):
+        row = self._by_token.get(str(token))
+        if row is None:
+            return None
+        c = self.columns
+        return {
+            'token': str(token),
+            'underlying': str(c['underlying'][row]),
+            'symbol': str(c['symbol'][row]),
+            'expiry': str(c['expiry'][row]),
+            'strike': float(c['strike'][row]),
+            'type': TYPE_NAMES[int(c['type'][row])],
+            'lot_size': int(c['lot_size'][row])
+        }
+
+    def expiries(self, underlying, kind='options'):
+        c = self.columns
+        mask = (c['underlying'] == underlying) & ((c['type'] == TYPE_CODES['FUT']) if kind == 'futures' else (c['type'] != TYPE_CODES['FUT']))
+        return np.unique(c['expiry'][mask]).astype(str).tolist()
+
+    def chain(self, underlying, expiry):
+        """
+        Every listed option of one expiry as {'token', 'strike', 'type'},
+        sorted by strike (the LiveChain instruments format).
+        """
+        key = (underlying, str(expiry))
+        if key not in self._chains:
+            c = self.columns
+            rows = np.flatnonzero((c['underlying'] == underlying) & (c['expiry'] == np.datetime64(str(expiry))) & (c['type'] != TYPE_CODES['FUT']))
+            rows = rows[np.lexsort((c['type'][rows], c['strike'][rows]))]
+            self._chains[key] = [
+                {'token': str(t), 'strike': k, 'type': TYPE_NAMES[o]}
+                for t, k, o in zip(c['token'][rows].tolist(), c['strike'][rows].tolist(), c['type'][rows].tolist())
+            ]
+        return self._chains[key]
+
+    def spot_token(self, underlying):
+        return INDEX_TOKENS.get(underlying)
+
+    def futures_token(self, underlying, expiry=None):
+        """
+        Token of the future expiring on expiry, or of the nearest one.
+        """
+        expiries = self.expiries(underlying, kind='futures')
+        if expiry is None:
+            expiry = next((e for e in expiries if e >= self.as_of.isoformat()), None)
+        return self.token(underlying, expiry, 0.0, 'FUT') if expiry else None
@@ -0,0 +1,128 @@
+# services/quote_client.py
+
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SmartAPI market data limits: tokens per request and requests per second
+MAX_TOKENS_PER_REQUEST = 50
+REQUESTS_PER_SECOND = 10
+
+class TokenBucket:
+    """
+    Async token bucket: acquire() waits until a request may go out, allowing
+    bursts of up to capacity and rate requests per second on average.
+    """
+    def __init__(self, rate=REQUESTS_PER_SECOND, capacity=REQUESTS_PER_SECOND):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class QuoteClient:
+    """
+    Batched market-data quotes through AngelOneService.
+    Requested tokens are collected for coalesce_window seconds, so that
+    concurrent callers asking for the same tokens (or for tokens already in
+    flight) share one request, then
+    split into batches of batch_size sent in parallel under a shared
+    TokenBucket. quotes() returns {token: quote} with None for tokens the
+    broker did not return. A cancelled caller (e.g. on a fetch timeout)
+    does not cancel the shared request for the others.
+    """
+    def __init__(self, angel_service, batch_size=MAX_TOKENS_PER_REQUEST, limiter=None,
+                 coalesce_window=0.02, retries=2, retry_delay=0.5):
+        self.angel = angel_service
+        self.batch_size = batch_size
+        self.limiter = limiter or TokenBucket()
+        self.coalesce_window = coalesce_window
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._pending = {}   # (exchange, mode) -> {token: future} awaiting the next flush
+        self._inflight = {}  # (exchange, mode) -> {token: future} sent and not yet answered
+        self._flushes = set()
+        self.requests_sent = 0
+
+    async def _fetch_batch(self, exchange, mode, tokens, retry=False):
+        """
+        One market-data request; returns the list of fetched quotes.
+        """
+        response = await self.angel.market_data(mode, {exchange: tokens}, retry=retry)
+        if not response or not response.get('status'):
+            raise ConnectionError(response.get('message') if response else "empty market data response")
+        return response['data']['fetched']
+
+    async def _send(self, exchange, mode, tokens):
+        # The only retry layer for market data: every attempt waits for the limiter
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            self.requests_sent += 1
+            try:
+                return await self._fetch_batch(exchange, mode, tokens, retry=attempt > 0)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"Quote batch of {len(tokens)} failed ({e}), retry {attempt + 1}/{self.retries}")
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    async def _flush(self, key):
+        await asyncio.sleep(self.coalesce_window)
+        waiting = self._pending.pop(key)
+        inflight = self._inflight.setdefault(key, {})
+        inflight.update(waiting)
+        exchange, mode = key
+        tokens = list(waiting)
+        batches = [tokens[i:i + self.batch_size] for i in range(0, len(tokens), self.batch_size)]
+        results = await asyncio.gather(*(self._send(exchange, mode, b) for b in batches), return_exceptions=True)
+        for token in tokens:
+            inflight.pop(token, None)
+
+        for batch, result in zip(batches, results):
+            pending = [token for token in batch if not waiting[token].done()]
+            if isinstance(result, Exception):
+                for token in pending:
+                    waiting[token].set_exception(result)
+                continue
+            fetched = {str(q.get('symbolToken')): q for q in result}
+            for token in pending:
+                waiting[token].set_result(fetched.get(token))
+
+    async def quotes(self, tokens, exchange="NFO", mode="FULL"):
+        key = (exchange, mode)
+        if key not in self._pending:
+            self._pending[key] = {}
+            task = asyncio.create_task(self._flush(key))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        waiting = self._pending[key]
+        inflight = self._inflight.get(key, {})
+
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for token in map(str, tokens):
+            if token in inflight:
+                futures[token] = inflight[token]
+                continue
+            if token not in waiting:
+                waiting[token] = loop.create_future()
+            futures[token] = waiting[token]
+        # Shielded: cancelling this caller must not cancel futures other callers share
+        results = await asyncio.gather(*map(asyncio.shield, futures.values()), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return dict(zip(futures, results))
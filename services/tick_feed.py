@@ -0,0 +1,186 @@
+# services/tick_feed.py
+
+import asyncio
+import json
+import threading
+import logging
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class SmartAPITickFeed:
+    """
+    Streams SmartAPI WebSocket (SmartWebSocketV2) ticks into a callback.
+    The socket runs in its own thread, as SmartWebSocketV2.connect blocks.
+    on_ticks receives a list of parsed tick dicts.
+    """
+    MODE_LTP, MODE_QUOTE, MODE_SNAP_QUOTE = 1, 2, 3
+
+    def __init__(self, angel_service, token_list, on_ticks, mode=MODE_SNAP_QUOTE):
+        self.angel = angel_service
+        self.token_list = token_list
+        self.on_ticks = on_ticks
+        self.mode = mode
+        self._sws = None
+        self._thread = None
+
+    def start(self):
+        from SmartApi.smartWebSocketV2 import SmartWebSocketV2
+
+        self._sws = SmartWebSocketV2(self.angel.jwt_token, settings.ANGEL_API_KEY, settings.ANGEL_CLIENT_ID, self.angel.feed_token)
+        self._sws.on_open = lambda ws: self._sws.subscribe("anza", self.mode, self.token_list)
+        self._sws.on_data = lambda ws, message: self.on_ticks([message])
+        self._sws.on_error = lambda *args: logger.error(f"Tick feed error: {args[-1]}")
+        self._sws.on_close = lambda ws: logger.warning("Tick feed closed")
+        self._thread = threading.Thread(target=self._sws.connect, name="smartapi-ticks", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._sws is not None:
+            self._sws.close_connection()
+
+def simulated_instruments(simulator, symbol='NIFTY', expiry=None):
+    """
+    Synthetic tokens for a MarketSimulator chain: (spot_token, instruments).
+    """
+    expiry = expiry or simulator.expiries[0]
+    instruments = [
+        {'token': f"SIM-{symbol}-{expiry}-{int(k)}-{opt}", 'strike': float(k), 'type': opt}
+        for k in simulator.strikes[symbol] for opt in ('CE', 'PE')
+    ]
+    return f"SIM-{symbol}", instruments
+
+class LocalTickServer:
+    """
+    Local stand-in for the broker's tick feed, for tests and demos.
+    Streams a MarketSimulator over a TCP socket as JSON lines: a client
+    sends {"action": "subscribe", "tokens": [...]} and then receives, for
+    every simulated tick, one line holding that tick's batch of SmartAPI
+    style tick dicts for its tokens. Each tick is advanced and read under
+    the simulator's lock, as the data fetcher reads it from another thread.
+    """
+    def __init__(self, simulator, symbol='NIFTY', expiry=None, interval=0.05, host='127.0.0.1', port=0):
+        self.simulator = simulator
+        self.symbol = symbol
+        self.expiry = expiry or simulator.expiries[0]
+        self.interval = interval  # Wall-clock seconds between simulated ticks
+        self.host = host
+        self.port = port
+        self.spot_token, self.instruments = simulated_instruments(simulator, symbol, self.expiry)
+        self._clients = {}
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="local-tick-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = server.sockets[0].getsockname()[1]
+        self._loop.create_task(self._produce())
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    async def _handle(self, reader, writer):
+        request = json.loads(await reader.readline())
+        self._clients[writer] = set(map(str, request.get('tokens', [])))
+
+    def _ticks(self):
+        sim = self.simulator
+        stamp = int(sim.now.timestamp() * 1000)
+        ticks = [{'token': self.spot_token, 'last_traded_price': int(round(sim.spot(self.symbol) * 100)), 'exchange_timestamp': stamp}]
+        for row in sim.option_chain(self.symbol, self.expiry):
+            for opt, prefix in (('CE', 'call'), ('PE', 'put')):
+                ticks.append({
+                    'token': f"SIM-{self.symbol}-{self.expiry}-{row['strike']}-{opt}",
+                    'last_traded_price': int(round(row[f'{prefix}_ltp'] * 100)),
+                    'open_interest': row[f'{prefix}_oi'],
+                    'exchange_timestamp': stamp
+                })
+        return ticks
+
+    async def _produce(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            with self.simulator.lock:
+                self.simulator.advance(self.simulator.tick_seconds)
+                ticks = self._ticks() if self._clients else None
+            if ticks is None:
+                continue
+            for writer, tokens in list(self._clients.items()):
+                try:
+                    writer.write((json.dumps([t for t in ticks if t['token'] in tokens]) + "\n").encode())
+                    await writer.drain()
+                except (ConnectionError, RuntimeError):
+                    self._clients.pop(writer, None)
+
+class LocalTickFeed:
+    """
+    Client for LocalTickServer with the same start/stop/on_ticks interface
+    as SmartAPITickFeed. Reconnects until stopped.
+    """
+    def __init__(self, host, port, tokens, on_ticks, reconnect_delay=1.0):
+        self.host = host
+        self.port = port
+        self.tokens = [str(t) for t in tokens]
+        self.on_ticks = on_ticks
+        self.reconnect_delay = reconnect_delay
+        self._loop = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="local-tick-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: [t.cancel() for t in asyncio.all_tasks(self._loop)])
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._consume())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _consume(self):
+        while not self._stopped.is_set():
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write((json.dumps({'action': 'subscribe', 'tokens': self.tokens}) + "\n").encode())
+                await writer.drain()
+                while not self._stopped.is_set():
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self.on_ticks(json.loads(line))
+                writer.close()
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"Tick feed disconnected: {e}")
+            if not self._stopped.is_set():
+                await asyncio.sleep(self.reconnect_delay)
@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import json
+import time
+
+import pytest
+
+pytest.importorskip("pyotp")
+pytest.importorskip("SmartApi")
+
+from services.angel_one import AngelOneService
+from services.quote_client import QuoteClient, TokenBucket
+
+def make_jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': exp}).encode()).decode().rstrip("=")
+    return f"Bearer header.{payload}.signature"
+
+class BlockingSmartConnect:
+    """
+    SmartConnect stand-in whose calls block like real HTTP requests.
+    """
+    def __init__(self, fail_first=0, delay=0.2):
+        self.fail_first = fail_first
+        self.delay = delay
+        self.token_calls = 0
+        self.market_calls = 0
+
+    def getMarketData(self, mode, exchange_tokens):
+        self.market_calls += 1
+        time.sleep(self.delay)
+        if self.fail_first:
+            self.fail_first -= 1
+            raise ConnectionError("reset by peer")
+        return {'status': True, 'data': {'fetched': []}}
+
+    def generateToken(self, refresh_token):
+        self.token_calls += 1
+        return {'status': True, 'data': {'jwtToken': make_jwt(time.time() + 3600), 'refreshToken': 'r2', 'feedToken': 'f2'}}
+
+def test_blocking_calls_leave_the_loop_free():
+    service = AngelOneService(max_workers=4, retry_delay=0.01)
+    service.smart_api = BlockingSmartConnect()
+
+    async def run():
+        lags = []
+
+        async def heartbeat():
+            for _ in range(20):
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - start)
+
+        await asyncio.gather(heartbeat(), *(service.market_data("LTP", {"NSE": ["26000"]}) for _ in range(4)))
+        return max(lags)
+
+    assert asyncio.run(run()) < 0.1
+    stats = service.metrics()['getMarketData']
+    assert stats['calls'] == 4 and stats['retries'] == 0 and stats['errors'] == 0
+    assert stats['p50_ms'] >= 200
+    service.close()
+
+def test_failing_batch_is_retried_once_per_limiter_token():
+    service = AngelOneService(retries=2, retry_delay=0.01)
+    service.smart_api = BlockingSmartConnect(fail_first=100, delay=0.0)
+    limiter = TokenBucket(rate=100, capacity=100)
+    client = QuoteClient(service, limiter=limiter, retries=2, retry_delay=0.01)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(client.quotes(["43650"]))
+    # Three attempts in all, each one broker request under one limiter token
+    assert service.smart_api.market_calls == client.requests_sent == 3
+    stats = service.metrics()['getMarketData']
+    assert stats['calls'] == 3 and stats['retries'] == 2 and stats['errors'] == 3
+    service.close()
+
+def test_session_refreshes_before_expiry():
+    service = AngelOneService(refresh_margin=600)
+    service.smart_api = BlockingSmartConnect()
+    service._set_session({'jwtToken': make_jwt(time.time() + 600.2), 'refreshToken': 'r1'})
+
+    async def run():
+        service.start_session_refresh()
+        await asyncio.sleep(0.5)
+
+    asyncio.run(run())
+    assert service.smart_api.token_calls == 1
+    assert service.refresh_token == 'r2' and service.feed_token == 'f2'
+    assert service.expires_at > time.time() + 3000
+    service.close()
@@ -0,0 +1,53 @@
+import asyncio
+import pandas as pd
+from datetime import datetime
+
+from core.backtest import BacktestEngine, _signal_outcome
+from core.data_fetcher import DataFetcher
+from core.signal_generator import SignalGenerator
+from core.simulator import MarketSimulator
+from database.manager import DatabaseManager
+
+def _record_days(db, days, cycles):
+    for day in days:
+        sim = MarketSimulator(indices={'NIFTY': 24500.0}, start=datetime(2024, 7, day, 9, 15), seed=day)
+        fetcher = DataFetcher(None, simulator=sim)
+        for _ in range(cycles):
+            db.save_market_snapshot(asyncio.run(fetcher.fetch_all_data()))
+
+def test_signal_outcome_walks_target_and_stop():
+    import numpy as np
+    signal = {'direction': 'LONG', 'entry': 100.0, 'target': 110.0, 'stop_loss': 95.0}
+    assert _signal_outcome(signal, np.array([101.0, 111.0, 90.0])) == 10.0
+    assert _signal_outcome(signal, np.array([94.0, 111.0])) == -5.0
+    assert _signal_outcome(signal, np.array([102.0, 103.0])) == 3.0
+    assert _signal_outcome(signal, np.array([])) is None
+
+def test_replay_merges_days_independent_of_workers(tmp_path):
+    db_name = str(tmp_path / "replay.db")
+    db = DatabaseManager(db_name)
+    _record_days(db, days=(1, 2, 3), cycles=12)
+
+    assert db.get_snapshot_days('NIFTY') == ['2024-07-01', '2024-07-02', '2024-07-03']
+    snap = db.get_market_snapshots('NIFTY', '2024-07-02')
+    assert len(snap) == 12 and isinstance(snap[0]['timestamp'], datetime)
+
+    serial = BacktestEngine(db_name, workers=1, horizon=5).run('NIFTY')
+    pooled = BacktestEngine(db_name, workers=3, horizon=5).run('NIFTY')
+
+    assert serial['cycles'] == pooled['cycles'] == 36
+    # NaN rates (no resolved signals) compare equal in a DataFrame
+    assert pd.DataFrame(serial['patterns']).equals(pd.DataFrame(pooled['patterns']))
+    assert sum(p['occurrences'] for p in serial['patterns'].values()) > 0
+    # Only the pattern behind the call-buy signal is credited with its signals
+    assert all(p['signals'] == 0 for name, p in serial['patterns'].items() if name != 'Negative GEX Regime')
+
+    one_day = BacktestEngine(db_name, workers=1).run('NIFTY', start='2024-07-02', end='2024-07-02')
+    assert one_day['days'] == ['2024-07-02'] and one_day['cycles'] == 12
+
+def test_signals_name_the_patterns_that_generated_them():
+    analysis = {'gex': {'regime': 'Negative'}, 'oi': {'pcr': 0.6}, 'market_data': {'spot_price': 24500.0}}
+    matched = [{'name': 'FII Aggressive Short'}, {'name': 'Negative GEX Regime'}]
+    signals = SignalGenerator().generate_signals(analysis, matched)
+    assert [s['patterns'] for s in signals] == [['Negative GEX Regime']]
+    assert SignalGenerator().generate_signals(analysis, matched[:1])[0]['patterns'] == []
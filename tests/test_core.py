@@ -8,7 +8,8 @@ import numpy as np
 # Add project root to path
 sys.path.append(os.getcwd())
 
-from core.analyzers import Indicators, GreeksAnalyzer, SmartMoneyAnalyzer
+from core.analyzers import Indicators, StreamingEMA, StreamingRSI, StreamingVWAP, GreeksAnalyzer, GEXAnalyzer, OIAnalyzer, SmartMoneyAnalyzer, ChainBlockAnalyzer
+from core.greeks_engine import GreeksEngine, GreeksCache
 from database.manager import DatabaseManager
 
 def test_indicators():
@@ -32,6 +33,35 @@ def test_indicators():
     assert len(rsi) == 30
     print("RSI OK")
 
+def test_streaming_indicators_match_batch():
+    print("Testing streaming indicators...")
+    rng = np.random.default_rng(3)
+    close = pd.Series(24500 + np.cumsum(rng.normal(0, 15, 300)))
+    df = pd.DataFrame({'close': close, 'high': close + 10, 'low': close - 10,
+                       'volume': rng.integers(1000, 5000, 300).astype(float)})
+
+    ema, rsi, vwap = StreamingEMA(20), StreamingRSI(14), StreamingVWAP()
+    ema_out, rsi_out, vwap_out = [], [], []
+    for i, row in df.iterrows():
+        if i == 150:
+            # Round-trip state halfway through, as after an engine restart
+            ema = StreamingEMA.from_state(ema.get_state())
+            rsi = StreamingRSI.from_state(rsi.get_state())
+            vwap = StreamingVWAP.from_state(vwap.get_state())
+        ema_out.append(ema.update(row['close']))
+        rsi_out.append(rsi.update(row['close']))
+        vwap_out.append(vwap.update(row['high'], row['low'], row['close'], row['volume']))
+
+    assert np.allclose(ema_out, Indicators.ema(df['close'], 20))
+    assert np.allclose(rsi_out, Indicators.rsi(df['close'], 14), equal_nan=True)
+    assert np.allclose(vwap_out, Indicators.vwap(df))
+
+    # VWAP restarts on a new session
+    vwap = StreamingVWAP()
+    vwap.update(110, 90, 100, 1000, timestamp="2026-01-05 15:29")
+    assert vwap.update(210, 190, 200, 10, timestamp="2026-01-06 09:15") == 200
+    print("Streaming indicators OK")
+
 def test_greeks():
     print("Testing Greeks...")
     analyzer = GreeksAnalyzer()
@@ -40,10 +70,198 @@ def test_greeks():
     assert 'put_greeks' in res
     print("Greeks OK")
 
+def test_greeks_batch_matches_scalar():
+    print("Testing batch Greeks...")
+    strikes = np.array([24000.0, 24500.0, 25000.0])
+    ivs = np.array([0.14, 0.15, 0.17])
+    for flag in ('c', 'p'):
+        batch = GreeksAnalyzer.calculate_bs_batch(flag == 'c', 24500, strikes, 0.02, 0.10, ivs)
+        for i, k in enumerate(strikes):
+            scalar = GreeksAnalyzer.calculate_bs(flag, 24500, k, 0.02, 0.10, ivs[i])
+            assert abs(scalar['delta'] - batch['delta'][i]) < 1e-4
+            assert abs(scalar['gamma'] - batch['gamma'][i]) < 1e-6
+            assert abs(scalar['theta'] - batch['theta'][i]) < 1e-4
+            assert abs(scalar['vega'] - batch['vega'][i]) < 1e-4
+    print("Batch Greeks OK")
+
+def test_second_order_greeks_match_finite_differences():
+    print("Testing second-order Greeks...")
+    S, K, t, r, sigma, h = 24500.0, 24700.0, 0.05, 0.065, 0.16, 1e-4
+    base = GreeksEngine.compute(True, S, K, t, r, sigma)
+    up = GreeksEngine.compute(True, S, K, t, r, sigma + h)
+    down = GreeksEngine.compute(True, S, K, t, r, sigma - h)
+    sooner = GreeksEngine.compute(True, S, K, t - h, r, sigma)
+    later = GreeksEngine.compute(True, S, K, t + h, r, sigma)
+
+    vanna_fd = (up['delta'] - down['delta']) / (2 * h) / 100
+    vomma_fd = (up['vega'] - down['vega']) / (2 * h) / 100
+    assert abs(base['vanna'] - vanna_fd) < 1e-6
+    assert abs(base['vomma'] - vomma_fd) < 1e-4
+    charm_fd = (sooner['delta'] - later['delta']) / (2 * h) / 365
+    assert abs(base['charm'] - charm_fd) < 1e-6
+    print("Second-order Greeks OK")
+
+def test_gex_profile_and_flip_level():
+    print("Testing GEX profile...")
+    chain = [
+        {'strike': k, 'call_oi': 50000, 'put_oi': 200000 if k < 24500 else 10000, 'call_iv': 0.15, 'put_iv': 0.15}
+        for k in range(24000, 25050, 50)
+    ]
+    market_data = {'symbol': 'BANKNIFTY', 'spot_price': 24500.0, 'time_to_expiry': 0.02, 'option_chain': chain}
+    greeks = GreeksAnalyzer(solve_iv=False).analyze(market_data)
+    res = GEXAnalyzer().analyze(market_data, greeks)
+
+    assert res['lot_size'] == 25
+    assert len(res['strike_gex']) == len(chain)
+    assert abs(res['strike_gex'].sum() - res['net_gex']) < 1
+    # Put-heavy wings below spot: gamma turns positive only once spot rallies past the flip
+    assert res['net_gex'] < 0
+    assert res['gex_flip_level'] is not None and res['gex_flip_level'] > 24500
+    print("GEX OK")
+
+def test_max_pain_matches_brute_force():
+    print("Testing max pain...")
+    rng = np.random.default_rng(7)
+    strikes = np.arange(23000, 26050, 50)
+    chain = [
+        {'strike': int(k), 'call_oi': int(rng.integers(1000, 90000)), 'put_oi': int(rng.integers(1000, 90000))}
+        for k in strikes
+    ]
+    res = OIAnalyzer().analyze({'option_chain': chain[::-1]})
+
+    def payout(p):
+        return sum(s['call_oi'] * max(p - s['strike'], 0) + s['put_oi'] * max(s['strike'] - p, 0) for s in chain)
+
+    assert res['max_pain'] == min(strikes, key=payout)
+    assert res['total_call_oi'] == sum(s['call_oi'] for s in chain)
+    assert OIAnalyzer().analyze({})['max_pain'] == 0
+    print("Max pain OK")
+
+def test_greeks_cache_reuses_unmoved_strikes():
+    print("Testing Greeks cache...")
+    cache = GreeksCache(moneyness_tol=1e-4, iv_tol=0.001, max_size=150)
+    strikes = np.arange(24000, 25000, 10.0)
+    iv = np.full(strikes.shape, 0.15)
+
+    first = cache.compute(True, 24500.0, strikes, 0.02, 0.065, iv)
+    assert cache.last_misses == 100
+
+    # Sub-tolerance spot move and a real IV move on 10 strikes
+    iv[:10] = 0.17
+    second = cache.compute(True, 24500.2, strikes, 0.02, 0.065, iv)
+    assert cache.last_hits == 90 and cache.last_misses == 10
+    # Hits are rescaled to the new spot at the cached moneyness
+    assert np.allclose(second['delta'][10:], first['delta'][10:])
+    assert np.allclose(second['gamma'][10:], first['gamma'][10:] * 24500.0 / 24500.2)
+    fresh = GreeksEngine.compute(True, 24500.2, strikes[:10], 0.02, 0.065, 0.17)
+    assert np.allclose(second['delta'][:10], fresh['delta'])
+
+    # Repricing reuses each strike's slot
+    assert cache.stats()['size'] == 100
+    cache.compute(True, 24600.0, strikes, 0.02, 0.065, iv)
+    assert cache.last_misses == 100 and cache.stats()['size'] == 100
+    cache.compute(False, 24600.0, strikes, 0.02, 0.065, iv)
+    assert cache.stats()['size'] == 150 and cache.evictions == 50
+    print("Greeks cache OK")
+
+def test_chain_block_matches_single_chain_analyzers():
+    print("Testing chain block...")
+    def snapshot(symbol, spot, step, width, t):
+        chain = [
+            {'strike': spot + i * step, 'call_oi': 40000 + 900 * (i % 5), 'put_oi': 30000 + 1100 * (i % 7),
+             'call_iv': 0.14 + 0.002 * abs(i), 'put_iv': 0.15 + 0.002 * abs(i)}
+            for i in range(-width, width + 1)
+        ]
+        return {'symbol': symbol, 'expiry': t, 'spot_price': float(spot), 'time_to_expiry': t, 'option_chain': chain}
+
+    snapshots = [snapshot('NIFTY', 24500, 50, 10, 0.02), snapshot('NIFTY', 24500, 50, 15, 0.06),
+                 snapshot('BANKNIFTY', 52000, 100, 8, 0.02)]
+    res = ChainBlockAnalyzer(solve_iv=False).analyze(snapshots)
+    assert res['strikes'].shape == (3, 31)
+
+    for i, snap in enumerate(snapshots):
+        greeks = GreeksAnalyzer(solve_iv=False).analyze(snap)
+        gex = GEXAnalyzer().analyze(snap, greeks)
+        oi = OIAnalyzer().analyze(snap)
+        assert abs(res['net_gex'][i] - gex['net_gex']) < 1
+        assert abs(res['pcr'][i] - oi['pcr']) < 1e-3
+        assert res['max_pain'][i] == oi['max_pain']
+    print("Chain block OK")
+
+def test_greeks_cache_keeps_block_rows_apart():
+    print("Testing Greeks cache on a chain block...")
+    def snapshot(expiry, t, width):
+        chain = [{'strike': 24500 + 50 * i, 'call_iv': 0.14, 'put_iv': 0.15, 'call_oi': 1000, 'put_oi': 1000}
+                 for i in range(-width, width + 1)]
+        return {'symbol': 'NIFTY', 'expiry': expiry, 'spot_price': 24500.0, 'time_to_expiry': t, 'option_chain': chain}
+
+    # Two expiries listing the same strikes, the second with more of them
+    snapshots = [snapshot('2026-10-22', 0.02, 10), snapshot('2026-10-29', 0.04, 15)]
+    cache = GreeksCache()
+    analyzer = ChainBlockAnalyzer(greeks_analyzer=GreeksAnalyzer(solve_iv=False, cache=cache))
+    first = analyzer.analyze(snapshots)
+    assert cache.last_misses == 2 * (21 + 31)
+
+    second = analyzer.analyze(snapshots)
+    assert cache.last_hits == 2 * (21 + 31) and cache.last_misses == 0
+    assert np.allclose(second['net_gex'], first['net_gex'])
+    print("Greeks cache on a chain block OK")
+
+def test_implied_vol_roundtrip():
+    print("Testing IV solver...")
+    strikes = np.linspace(23000, 26000, 61)
+    is_call = strikes >= 24500
+    true_iv = 0.12 + 0.08 * np.abs(strikes - 24500) / 1500
+    prices, _ = GreeksEngine.price_vega(is_call, 24500.0, strikes, 0.05, 0.10, true_iv)
+
+    iv, converged, cold_iters = GreeksAnalyzer.implied_vol_batch(is_call, prices, 24500, strikes, 0.05, 0.10)
+    assert converged.all()
+    assert np.max(np.abs(iv - true_iv)) < 1e-3
+
+    _, _, warm_iters = GreeksAnalyzer.implied_vol_batch(is_call, prices, 24500, strikes, 0.05, 0.10, iv)
+    assert warm_iters <= 2 < cold_iters
+
+    # Price below intrinsic has no solution
+    iv, converged, _ = GreeksAnalyzer.implied_vol_batch(True, 10.0, 24500, 24000, 0.05, 0.10)
+    assert np.isnan(iv) and not converged
+    print("IV solver OK")
+
+def test_iv_seeds_survive_single_chain_calls():
+    print("Testing IV warm start across block and single-chain calls...")
+    def snapshot(expiry, t, true_iv):
+        strikes = 24500.0 + 50 * np.arange(-10, 11)
+        iv = true_iv + 0.5 * np.log(strikes / 24500.0) ** 2
+        call = GreeksEngine.compute(True, 24500.0, strikes, t, 0.065, iv)['price']
+        put = GreeksEngine.compute(False, 24500.0, strikes, t, 0.065, iv)['price']
+        chain = [{'strike': k, 'call_ltp': c, 'put_ltp': p} for k, c, p in zip(strikes, call, put)]
+        return {'symbol': 'NIFTY', 'expiry': expiry, 'spot_price': 24500.0, 'time_to_expiry': t, 'option_chain': chain}
+
+    snapshots = [snapshot('2026-10-22', 0.02, 0.12), snapshot('2026-10-29', 0.04, 0.16)]
+    analyzer = GreeksAnalyzer()
+    block = ChainBlockAnalyzer.build_block(snapshots)
+    analyzer.analyze_block(block)
+    cold = analyzer.iv_stats['iterations']
+
+    # The fallback single-chain path must not wipe the other row's seeds
+    analyzer.analyze(snapshots[0])
+    analyzer.analyze_block(block)
+    assert analyzer.iv_stats['iterations'] <= 2 < cold
+    print("IV warm start OK")
+
 if __name__ == "__main__":
     try:
         test_indicators()
+        test_streaming_indicators_match_batch()
         test_greeks()
+        test_greeks_batch_matches_scalar()
+        test_second_order_greeks_match_finite_differences()
+        test_implied_vol_roundtrip()
+        test_gex_profile_and_flip_level()
+        test_max_pain_matches_brute_force()
+        test_greeks_cache_reuses_unmoved_strikes()
+        test_chain_block_matches_single_chain_analyzers()
+        test_greeks_cache_keeps_block_rows_apart()
+        test_iv_seeds_survive_single_chain_calls()
         print("\nALL TESTS PASSED!")
     except Exception as e:
         print(f"\nTEST FAILED: {e}")
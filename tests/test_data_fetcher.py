@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import numpy as np
+
+from core.analyzers import ChainBlockAnalyzer, GreeksAnalyzer
+from core.data_fetcher import DataFetcher
+from core.simulator import MarketSimulator
+
+class SlowFetcher(DataFetcher):
+    """
+    Mock feeds with configurable per-source delays and failures.
+    """
+    def __init__(self, delays=None, fail=(), **kwargs):
+        super().__init__(None, **kwargs)
+        self.delays = delays or {}
+        self.fail = set(fail)
+
+    async def _source(self, name, fetch):
+        await asyncio.sleep(self.delays.get(name, 0))
+        if name in self.fail:
+            raise ConnectionError(f"{name} down")
+        return await fetch()
+
+    async def fetch_spot(self, symbol):
+        return await self._source('spot_price', lambda: DataFetcher.fetch_spot(self, symbol))
+
+    async def fetch_option_chain(self, symbol, expiry):
+        return await self._source('option_chain', lambda: DataFetcher.fetch_option_chain(self, symbol, expiry))
+
+    async def fetch_institutional_flow(self):
+        return await self._source('institutional_flow', lambda: DataFetcher.fetch_institutional_flow(self))
+
+    async def fetch_heavyweights(self):
+        return await self._source('heavyweights', lambda: DataFetcher.fetch_heavyweights(self))
+
+def test_sources_are_fetched_concurrently():
+    fetcher = SlowFetcher(delays=dict.fromkeys(('spot_price', 'option_chain', 'institutional_flow', 'heavyweights'), 0.2))
+    start = time.perf_counter()
+    data = asyncio.run(fetcher.fetch_all_data())
+    assert time.perf_counter() - start < 0.5
+    assert data['stale_fields'] == []
+
+def test_slow_or_failing_sources_fall_back_to_last_data():
+    fetcher = SlowFetcher()
+    first = asyncio.run(fetcher.fetch_all_data())
+
+    fetcher.delays = {'heavyweights': 1.0}
+    fetcher.fail = {'institutional_flow'}
+    fetcher.source_timeouts['heavyweights'] = 0.1
+    start = time.perf_counter()
+    second = asyncio.run(fetcher.fetch_all_data())
+
+    assert time.perf_counter() - start < 0.5
+    assert set(second['stale_fields']) == {'heavyweights', 'fii_net_cash', 'dii_net_cash'}
+    assert second['heavyweights'] == first['heavyweights']
+    assert second['fii_net_cash'] == first['fii_net_cash']
+    assert second['spot_price'] == first['spot_price'] and second['option_chain']
+
+    # The cycle deadline caps the whole snapshot, even under generous per-source timeouts
+    fetcher.fail = set()
+    fetcher.delays = {'option_chain': 1.0}
+    fetcher.cycle_deadline = 0.2
+    third = asyncio.run(fetcher.fetch_all_data())
+    assert third['stale_fields'] == ['option_chain']
+
+def test_missing_chain_without_cache_returns_nothing():
+    fetcher = SlowFetcher(fail={'option_chain'})
+    assert asyncio.run(fetcher.fetch_all_data()) is None
+
+def test_chain_block_is_one_timed_source_holding_the_front_chain():
+    calls = []
+
+    class CountingFetcher(SlowFetcher):
+        async def fetch_option_chain(self, symbol, expiry):
+            calls.append((symbol, expiry))
+            return await super().fetch_option_chain(symbol, expiry)
+
+    sim = MarketSimulator(seed=5, n_strikes=21)
+    fetcher = CountingFetcher(simulator=sim, block_symbols=("NIFTY", "BANKNIFTY"))
+    data = asyncio.run(fetcher.fetch_all_data())
+
+    # Every chain is fetched once, the front NIFTY chain included
+    assert sorted(calls) == sorted((s, e) for s in ("NIFTY", "BANKNIFTY") for e in sim.expiries)
+    assert data['expiry'] == sim.expiries[0] and data['stale_fields'] == []
+    assert data['option_chain'] is data['chain_block'][0]['option_chain']
+
+    # The front chain's Greeks come out of the block analysis unchanged
+    analyzer = ChainBlockAnalyzer()
+    block = analyzer.analyze(data['chain_block'])
+    front = analyzer.row_greeks(block, ('NIFTY', data['expiry']))
+    single = GreeksAnalyzer().analyze(data)
+    assert np.allclose(front['call_arrays']['gamma'], single['call_arrays']['gamma'])
+    assert np.allclose(front['put_iv'], single['put_iv'])
+
+    # A late block is one stale source, served from the last snapshot
+    fetcher.delays = {'option_chain': 1.0}
+    fetcher.source_timeouts['chain_block'] = 0.1
+    late = asyncio.run(fetcher.fetch_all_data())
+    assert set(late['stale_fields']) == {'spot_price', 'option_chain', 'chain_block'}
+    assert late['chain_block'] == data['chain_block']
+
+def test_demo_chain_prices_match_its_ivs():
+    data = asyncio.run(DataFetcher(None).fetch_all_data())
+    greeks = GreeksAnalyzer().analyze(data)
+    feed = np.array([[row['call_iv'], row['put_iv']] for row in data['option_chain']]).T
+    # Solving the demo LTPs gives back the chain's own IVs, to within the 0.05 price tick
+    atm = slice(5, 16)
+    assert np.allclose(greeks['call_iv'][atm], feed[0][atm], atol=2e-3)
+    assert np.allclose(greeks['put_iv'][atm], feed[1][atm], atol=2e-3)
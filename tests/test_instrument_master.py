@@ -0,0 +1,63 @@
+from datetime import date
+
+from services.instrument_master import InstrumentMaster
+
+def scrip_records():
+    records = [
+        {'token': '26000', 'symbol': 'Nifty 50', 'name': 'NIFTY', 'expiry': '', 'strike': '0.000000',
+         'lotsize': '1', 'instrumenttype': 'AMXIDX', 'exch_seg': 'NSE'},
+        {'token': '35001', 'symbol': 'NIFTY30OCT26FUT', 'name': 'NIFTY', 'expiry': '30OCT2026', 'strike': '-1.000000',
+         'lotsize': '75', 'instrumenttype': 'FUTIDX', 'exch_seg': 'NFO'},
+        {'token': '2885', 'symbol': 'RELIANCE-EQ', 'name': 'RELIANCE', 'expiry': '', 'strike': '-1.000000',
+         'lotsize': '1', 'instrumenttype': '', 'exch_seg': 'NSE'}
+    ]
+    token = 40000
+    for expiry in ('23OCT2026', '30OCT2026'):
+        for strike in range(24000, 25050, 50):
+            for opt in ('PE', 'CE'):
+                token += 1
+                records.append({
+                    'token': str(token), 'symbol': f"NIFTY{expiry[:5]}{expiry[-2:]}{strike}{opt}", 'name': 'NIFTY',
+                    'expiry': expiry, 'strike': f"{strike * 100:.6f}", 'lotsize': '75',
+                    'instrumenttype': 'OPTIDX', 'exch_seg': 'NFO'
+                })
+    return records
+
+class CountingMaster(InstrumentMaster):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.downloads = 0
+
+    def _download(self):
+        self.downloads += 1
+        return scrip_records()
+
+def test_master_indexes_contracts(tmp_path):
+    master = CountingMaster(cache_dir=str(tmp_path)).load(today=date(2026, 10, 17))
+
+    assert master.expiries('NIFTY') == ['2026-10-23', '2026-10-30']
+    token = master.token('NIFTY', '2026-10-23', 24500, 'CE')
+    assert master.instrument(token) == {
+        'token': token, 'underlying': 'NIFTY', 'symbol': 'NIFTY23OCT2624500CE', 'expiry': '2026-10-23',
+        'strike': 24500.0, 'type': 'CE', 'lot_size': 75
+    }
+    assert master.token('NIFTY', '2026-10-23', 24525, 'CE') is None
+    assert master.futures_token('NIFTY') == '35001'
+    assert master.instrument('2885') is None  # Equities are not kept
+
+    chain = master.chain('NIFTY', '2026-10-30')
+    assert len(chain) == 42
+    assert [row['strike'] for row in chain[:4]] == [24000.0, 24000.0, 24050.0, 24050.0]
+    assert [row['type'] for row in chain[:2]] == ['CE', 'PE']
+    assert all(master.token('NIFTY', '2026-10-30', row['strike'], row['type']) == row['token'] for row in chain)
+
+def test_master_downloads_once_a_day(tmp_path):
+    first = CountingMaster(cache_dir=str(tmp_path)).load(today=date(2026, 10, 17))
+    assert first.downloads == 1
+
+    # Same day: served from the on-disk cache
+    same_day = CountingMaster(cache_dir=str(tmp_path)).load(today=date(2026, 10, 17))
+    assert same_day.downloads == 0 and same_day.chain('NIFTY', '2026-10-23') == first.chain('NIFTY', '2026-10-23')
+
+    next_day = CountingMaster(cache_dir=str(tmp_path)).load(today=date(2026, 10, 18))
+    assert next_day.downloads == 1 and next_day.as_of == date(2026, 10, 18)
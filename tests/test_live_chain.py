@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import numpy as np
+
+from core.data_fetcher import DataFetcher
+from core.live_chain import LiveChain
+from core.simulator import MarketSimulator
+from services.tick_feed import LocalTickServer, LocalTickFeed
+
+def test_ticks_update_chain_in_place():
+    instruments = [{'token': f"{k}{t}", 'strike': k, 'type': t} for k in (24400, 24500, 24600) for t in ('CE', 'PE')]
+    chain = LiveChain('NIFTY', '2026-01-01', '26000', instruments, futures_token='FUT')
+    assert chain.snapshot() is None
+
+    chain.apply_ticks([
+        {'token': '26000', 'last_traded_price': 2450025},
+        {'token': '24500CE', 'last_traded_price': 12050, 'open_interest': 1500},
+        {'token': 'FUT', 'last_traded_price': 2460000},
+        {'token': 'unknown', 'last_traded_price': 100}
+    ])
+    chain.apply_tick({'token': '24500PE', 'last_traded_price': 11000, 'open_interest': 900})
+
+    snap = chain.snapshot()
+    assert snap['spot_price'] == 24500.25 and snap['futures_price'] == 24600.0
+    assert snap['sequence'] == 4
+    # Only quoted strikes are listed; the other side stays unquoted (NaN)
+    assert [row['strike'] for row in snap['option_chain']] == [24500.0]
+    row = snap['option_chain'][0]
+    assert (row['call_ltp'], row['put_ltp'], row['call_oi'], row['put_oi']) == (120.5, 110.0, 1500, 900)
+    assert chain.token_list()[1]['tokens'][0] == 'FUT'
+
+def test_local_feed_keeps_consistent_snapshots():
+    sim = MarketSimulator(seed=3, n_strikes=11)
+    server = LocalTickServer(sim, 'NIFTY', interval=0.01).start()
+    chain = LiveChain('NIFTY', server.expiry, server.spot_token, server.instruments, clock=lambda: sim.now)
+    feed = LocalTickFeed(server.host, server.port, chain.tokens, chain.apply_ticks)
+    feed.start()
+    try:
+        deadline = time.time() + 5
+        while chain.sequence < 10 * len(chain.tokens) and time.time() < deadline:
+            time.sleep(0.01)
+        assert chain.sequence >= 10 * len(chain.tokens)
+
+        # Spot and every strike come from the same simulated tick: put-call parity holds to the 0.05 price tick
+        for _ in range(20):
+            snap = chain.snapshot()
+            rows = snap['option_chain']
+            assert len(rows) == 11
+            k = np.array([r['strike'] for r in rows])
+            c, p = np.array([r['call_ltp'] for r in rows]), np.array([r['put_ltp'] for r in rows])
+            parity = c - p - (snap['spot_price'] - k * np.exp(-sim.r * sim.time_to_expiry(server.expiry)))
+            assert np.abs(parity[3:8]).max() < 0.1
+            time.sleep(0.005)
+
+        fetcher = DataFetcher(None, simulator=sim, live_chain=chain)
+        data = asyncio.run(fetcher.fetch_all_data())
+        assert data['stale_fields'] == []
+        assert len(data['option_chain']) == 11 and data['spot_price'] > 0
+    finally:
+        feed.stop()
+        server.stop()
+
+def test_fetcher_flags_a_frozen_feed_as_stale():
+    instruments = [{'token': f"{k}{t}", 'strike': k, 'type': t} for k in (24400, 24500, 24600) for t in ('CE', 'PE')]
+    chain = LiveChain('NIFTY', '2026-01-01', '26000', instruments)
+    chain.apply_ticks([{'token': '26000', 'last_traded_price': 2450000}, {'token': '24500CE', 'last_traded_price': 12000}])
+    fetcher = DataFetcher(None, simulator=MarketSimulator(seed=1), live_chain=chain, max_tick_age=0.05)
+
+    assert asyncio.run(fetcher.fetch_all_data())['stale_fields'] == []
+    time.sleep(0.1)
+    data = asyncio.run(fetcher.fetch_all_data())
+    # The last streamed state is kept, but flagged
+    assert data['stale_fields'] == ['spot_price', 'option_chain']
+    assert data['spot_price'] == 24500.0
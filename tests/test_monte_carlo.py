@@ -0,0 +1,41 @@
+import numpy as np
+from scipy.special import ndtr
+
+from core.greeks_engine import GreeksEngine
+from core.monte_carlo import MonteCarloEngine
+
+def _long_call(strike=24500, premium=150.0):
+    return [{'type': 'CE', 'action': 'BUY', 'strike': strike, 'premium': premium, 'qty': 1}]
+
+def test_pop_and_expected_pnl_match_closed_form():
+    spot, iv, dte, r = 24500.0, 0.15, 30, 0.065
+    t = dte / 365
+    legs = _long_call()
+    with MonteCarloEngine(n_paths=400000, seed=7) as engine:
+        res = engine.simulate(legs, spot, iv, dte, drift=r)
+
+    # Profit needs S_T > K + premium; expected payoff is the forward value of the BS price
+    breakeven = 24500 + 150.0
+    d2 = (np.log(spot / breakeven) + (r - 0.5 * iv ** 2) * t) / (iv * np.sqrt(t))
+    bs_price = GreeksEngine.compute(True, spot, 24500, t, r, iv)['price']
+    expected = bs_price * np.exp(r * t) - 150.0
+
+    assert abs(res['pop'] - ndtr(d2)) < 4 * res['pop_std_error'] + 1e-4
+    assert abs(res['expected_pnl'] - expected) < 4 * res['std_error']
+    # The worst tail of a long call is losing the whole premium
+    assert res['cvar'] == -150.0
+
+def test_seeded_results_do_not_depend_on_worker_count():
+    legs = _long_call()
+    serial = MonteCarloEngine(n_paths=60000, chunk_size=1 << 14, seed=3, workers=1)
+    pooled = MonteCarloEngine(n_paths=60000, chunk_size=1 << 14, seed=3, workers=2)
+
+    a = serial.simulate(legs, 24500, 0.15, 7, steps=20)
+    b = pooled.simulate(legs, 24500, 0.15, 7, steps=20)
+    # The pool is kept between calls
+    pool = pooled._pool
+    assert pooled.simulate(legs, 24500, 0.15, 7, steps=20) == b
+    assert pooled._pool is pool
+    pooled.close()
+    assert a == b
+    assert 0 < a['prob_touch'] <= 1
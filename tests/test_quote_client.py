@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+from core.data_fetcher import DataFetcher
+from services.quote_client import QuoteClient, TokenBucket
+from tests.test_instrument_master import CountingMaster
+
+class FakeQuotes(QuoteClient):
+    """
+    Broker stand-in: 50 ms per request, LTP derived from the token.
+    """
+    def __init__(self, fail=(), **kwargs):
+        super().__init__(None, **kwargs)
+        self.batches = []
+        self.fail = set(fail)
+
+    async def _fetch_batch(self, exchange, mode, tokens, retry=False):
+        self.batches.append(list(tokens))
+        await asyncio.sleep(0.05)
+        if self.fail & set(tokens):
+            raise ConnectionError("Access denied because of exceeding access rate")
+        return [{'symbolToken': t, 'ltp': int(t) / 100, 'opnInterest': 1000} for t in tokens if t != '9999']
+
+def test_batches_run_in_parallel_and_coalesce():
+    client = FakeQuotes()
+    tokens = [str(40000 + i) for i in range(320)]
+
+    async def run():
+        start = time.perf_counter()
+        # A second caller overlapping the first asks for a subset plus one unlisted token
+        full, part = await asyncio.gather(client.quotes(tokens), client.quotes(tokens[:60] + ['9999']))
+        return full, part, time.perf_counter() - start
+
+    full, part, elapsed = asyncio.run(run())
+    assert len(client.batches) == 7 and max(map(len, client.batches)) == 50
+    assert sorted(sum(client.batches, [])) == sorted(tokens + ['9999'])
+    assert elapsed < 0.2  # One round trip, not seven
+    assert full['40123']['ltp'] == 401.23
+    assert part['9999'] is None and part['40001'] is full['40001']
+
+def test_token_bucket_limits_rate_and_failures_propagate():
+    client = FakeQuotes(limiter=TokenBucket(rate=20, capacity=2), batch_size=10)
+
+    async def timed():
+        start = time.perf_counter()
+        await client.quotes([str(40000 + i) for i in range(60)])
+        return time.perf_counter() - start
+
+    # Six requests, two of them from the initial burst, then 20 per second
+    assert asyncio.run(timed()) >= (6 - 2) / 20
+
+    failing = FakeQuotes(fail={'40005'}, retries=1, retry_delay=0.01)
+    with pytest.raises(ConnectionError):
+        asyncio.run(failing.quotes([str(40000 + i) for i in range(10)]))
+    assert len(failing.batches) == 2
+
+def test_fetcher_builds_chain_from_quotes(tmp_path):
+    master = CountingMaster(cache_dir=str(tmp_path)).load()
+    fetcher = DataFetcher(None, instruments=master, quotes=FakeQuotes())
+
+    chain = asyncio.run(fetcher.fetch_option_chain('NIFTY', '2026-10-23'))
+    assert len(chain) == 21
+    assert chain[0]['strike'] == 24000.0 and chain[0]['call_oi'] == 1000
+    token = master.token('NIFTY', '2026-10-23', 24000, 'PE')
+    assert chain[0]['put_ltp'] == int(token) / 100
+
+def test_cancelled_caller_leaves_shared_quotes_intact():
+    client = FakeQuotes()
+    tokens = [str(40000 + i) for i in range(80)]
+
+    async def run():
+        first = asyncio.create_task(client.quotes(tokens))
+        second = asyncio.create_task(client.quotes(tokens[:10]))
+        await asyncio.sleep(0.03)  # Past the coalesce window: the batches are in flight
+        flush = next(iter(client._flushes))
+        first.cancel()
+        # A later caller joins the in-flight futures the cancelled one shared
+        late = await client.quotes(tokens[:5])
+        await flush  # Resolves the remaining futures without raising
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, late
+
+    second, late = asyncio.run(run())
+    assert len(client.batches) == 2
+    assert second['40009']['ltp'] == 400.09
+    assert late['40004'] is second['40004']
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from config import settings
+from core.realized_vol import RealizedVolEngine, CandleBuilder
+from database.manager import DatabaseManager
+
+def _candles(n, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 24500 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    open_ = close * (1 + rng.normal(0, 0.0003, n))
+    return pd.DataFrame({
+        'timestamp': pd.date_range("2026-10-16 09:15", periods=n, freq="min"),
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.0005, n))),
+        'low': np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.0005, n))),
+        'close': close,
+        'volume': rng.integers(1000, 5000, n)
+    })
+
+def test_incremental_hv_matches_vectorized_history(tmp_path):
+    db = DatabaseManager(db_name=str(tmp_path / "rv.db"))
+    candles = _candles(200)
+    db.save_candles("NIFTY", candles.iloc[:120], "ONE_MINUTE")
+
+    engine = RealizedVolEngine(db, interval="ONE_MINUTE", windows=(10, 30))
+    engine.refresh("NIFTY")
+
+    # Later candles arrive; refresh only folds in the new rows
+    db.save_candles("NIFTY", candles.iloc[120:], "ONE_MINUTE")
+    hv = engine.refresh("NIFTY")
+    assert engine._state["NIFTY"]["last_timestamp"] == pd.Timestamp(candles["timestamp"].iloc[-1])
+
+    expected = engine.history(candles).iloc[-1]
+    for est in ("close_to_close", "parkinson", "garman_klass"):
+        for w in (10, 30):
+            assert np.isclose(hv[est][w], expected[f"{est}_{w}"], rtol=1e-6)
+
+def test_hv_is_nan_until_window_fills(tmp_path):
+    db = DatabaseManager(db_name=str(tmp_path / "rv.db"))
+    engine = RealizedVolEngine(db, interval="ONE_MINUTE", windows=(5,))
+    assert np.isnan(engine.refresh("NIFTY")["parkinson"][5])
+
+    for i in range(5):
+        hv = engine.update("NIFTY", {"timestamp": i, "open": 100, "high": 101, "low": 99, "close": 100 + i})
+    assert not np.isnan(hv["parkinson"][5])
+    assert np.isnan(hv["close_to_close"][5])  # Only 4 returns so far
+
+def test_cycle_candles_round_trip_through_the_store(tmp_path):
+    # The live loop's path: spot per cycle -> CandleBuilder -> save_candles -> get_candles -> HV
+    db = DatabaseManager(db_name=str(tmp_path / "rv.db"))
+    engine = RealizedVolEngine(db, windows=(5,))
+    builder = CandleBuilder(engine.interval)
+    assert engine.interval == settings.CANDLE_INTERVAL
+
+    spots = 24500 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.001, 40)))
+    times = pd.date_range("2026-10-16 09:15:30", periods=40, freq="30s")
+    for ts, spot in zip(times, spots):
+        closed = builder.update("NIFTY", ts, spot)
+        if closed:
+            db.save_candles("NIFTY", pd.DataFrame(closed), builder.interval)
+    db.save_candles("NIFTY", pd.DataFrame(builder.flush("NIFTY")), builder.interval)
+
+    stored = db.get_candles("NIFTY", engine.interval)
+    assert len(stored) == 21
+    # Each bar opens at the previous close and closes on its last sample
+    assert np.allclose(stored['open'].iloc[1:], stored['close'].iloc[:-1])
+    assert np.isclose(stored['close'].iloc[-1], spots[-1])
+    assert (stored['high'] >= stored[['open', 'close']].max(axis=1)).all()
+
+    hv = engine.refresh("NIFTY")
+    assert all(np.isfinite(hv[est][5]) for est in ("close_to_close", "parkinson", "garman_klass"))
@@ -0,0 +1,59 @@
+import numpy as np
+
+from core.greeks_engine import GreeksEngine
+from core.risk import PortfolioRisk
+
+POSITIONS = [
+    {'type': 'CE', 'action': 'SELL', 'strike': 24800, 'qty': 2, 'iv': 0.14, 'time_to_expiry': 7 / 365, 'lot_size': 50},
+    {'type': 'PE', 'action': 'BUY', 'strike': 24200, 'qty': 1, 'iv': 0.17, 'time_to_expiry': 30 / 365, 'lot_size': 50},
+    {'type': 'CE', 'action': 'BUY', 'strike': 52000, 'qty': 3, 'iv': 0.16, 'time_to_expiry': 14 / 365, 'symbol': 'BANKNIFTY', 'lot_size': 25},
+]
+SPOTS = {'NIFTY': 24500.0, 'BANKNIFTY': 51800.0}
+
+def test_stress_matrix_matches_scenario_loop():
+    risk = PortfolioRisk(spot_shocks=[-0.05, 0.0, 0.03], vol_shocks=[-0.02, 0.0, 0.05], horizon_days=2, r=0.065)
+    pnl = risk.stress(POSITIONS, SPOTS)['pnl']
+
+    assert pnl.shape == (3, 3)
+    for i, ds in enumerate(risk.spot_shocks):
+        for j, dv in enumerate(risk.vol_shocks):
+            total = 0.0
+            for p in POSITIONS:
+                sign = (1 if p['action'] == 'BUY' else -1) * p['qty'] * p['lot_size']
+                spot, is_call = SPOTS[p.get('symbol', 'NIFTY')], p['type'] == 'CE'
+                now = GreeksEngine.compute(is_call, spot, p['strike'], p['time_to_expiry'], 0.065, p['iv'])['price']
+                later = GreeksEngine.compute(is_call, spot * (1 + ds), p['strike'], p['time_to_expiry'] - 2 / 365, 0.065, p['iv'] + dv)['price']
+                total += sign * (later - now)
+            assert np.isclose(pnl[i, j], total)
+
+def test_portfolio_greeks_explain_small_shocks():
+    risk = PortfolioRisk(spot_shocks=[-0.001, 0.0, 0.001], vol_shocks=[0.0, 0.001], r=0.065)
+    single = [POSITIONS[0]]
+    greeks = risk.greeks(single, SPOTS)['by_underlying']['NIFTY']
+    pnl = risk.stress(single, SPOTS)['pnl']
+
+    assert pnl[1, 0] == 0.0
+    move = 24500.0 * 0.001
+    assert np.isclose(pnl[2, 0], greeks['delta'] * move + 0.5 * greeks['gamma'] * move ** 2, rtol=1e-2)
+    # vega is per 1 vol point; the shock is 0.1 points
+    assert np.isclose(pnl[1, 1], 0.1 * greeks['vega'], rtol=1e-2)
+
+def test_greeks_are_kept_per_underlying():
+    risk = PortfolioRisk(r=0.065)
+    greeks = risk.greeks(POSITIONS, SPOTS)
+    nifty = risk.greeks(POSITIONS[:2], SPOTS)['by_underlying']['NIFTY']
+    bank = risk.greeks(POSITIONS[2:], SPOTS)['by_underlying']['BANKNIFTY']
+
+    assert greeks['by_underlying'] == {'NIFTY': nifty, 'BANKNIFTY': bank}
+    assert np.isclose(greeks['rupee_delta'], (nifty['delta'] * 24500.0 + bank['delta'] * 51800.0) / 100)
+    assert np.isclose(greeks['vega'], nifty['vega'] + bank['vega'])
+
+def test_expired_positions_are_worth_intrinsic_value():
+    expired = [{'type': 'CE', 'action': 'BUY', 'strike': 24300, 'qty': 1, 'iv': 0.14, 'time_to_expiry': 0.0, 'lot_size': 50}]
+    risk = PortfolioRisk(spot_shocks=[-0.01, 0.0, 0.01], vol_shocks=[0.0], r=0.065)
+
+    assert risk.greeks(expired, SPOTS)['value'] == 200.0 * 50
+    # No phantom P&L when nothing moves
+    pnl = risk.stress(expired, SPOTS)['pnl'][:, 0]
+    assert pnl[1] == 0.0
+    assert np.isclose(pnl[2], 245.0 * 50)
@@ -0,0 +1,96 @@
+import numpy as np
+
+from core.simulator import RealisticSimulator
+
+def test_batch_paths_follow_the_mean_reverting_recursion():
+    paths = RealisticSimulator.generate_price_paths(24500.0, 4000, steps=375, drift=0.0, volatility=0.005, mean_reversion=0.01, seed=5)
+
+    assert paths.shape == (4000, 375)
+    assert np.all(paths[:, 0] == 24500.0)
+    # Same seed, same paths; the single-path API is the first row of the batch
+    assert np.array_equal(paths, RealisticSimulator.generate_price_paths(24500.0, 4000, 375, 0.0, 0.005, 0.01, seed=5))
+    assert np.array_equal(RealisticSimulator.generate_price_path(24500.0, 375, drift=0.0, seed=5), paths[0])
+
+    # AR(1) log deviation: var after n steps is vol^2 (1 - a^2n) / (1 - a^2)
+    a, n = 0.99, 374
+    expected_std = 0.005 * np.sqrt((1 - a ** (2 * n)) / (1 - a ** 2))
+    log_dev = np.log(paths[:, -1] / 24500.0)
+    assert abs(log_dev.std() / expected_std - 1) < 0.05
+    assert abs(log_dev.mean()) < 4 * expected_std / np.sqrt(4000)
+
+def test_market_simulator_correlation_and_consistent_chains():
+    import asyncio
+    from datetime import datetime
+    from core.data_fetcher import DataFetcher
+    from core.simulator import MarketSimulator
+
+    sim = MarketSimulator(seed=9, start=datetime(2024, 7, 1, 9, 15))
+    path = sim.advance(375 * 60)
+    assert path.shape == (375 * 60, len(sim.symbols))
+
+    # One-factor model: corr(i, j) = loading_i * loading_j
+    returns = np.diff(np.log(path), axis=0)
+    corr = np.corrcoef(returns.T)
+    expected = np.outer(sim.loadings, sim.loadings)
+    off_diag = ~np.eye(len(sim.symbols), dtype=bool)
+    assert np.abs(corr - expected)[off_diag].max() < 0.05
+
+    # Chains are priced off the simulated spot: put-call parity up to the 0.05 tick
+    chain = sim.option_chain('NIFTY')
+    spot, t = sim.spot('NIFTY'), sim.time_to_expiry()
+    strikes = np.array([row['strike'] for row in chain], dtype=float)
+    calls = np.array([row['call_ltp'] for row in chain])
+    puts = np.array([row['put_ltp'] for row in chain])
+    parity = calls - puts - (spot - strikes * np.exp(-sim.r * t))
+    liquid = (calls > 0.05) & (puts > 0.05)
+    assert np.all(np.abs(parity[liquid]) <= 0.05 + 1e-9)
+
+    # OI builds as the market moves
+    before = sum(row['call_oi'] + row['put_oi'] for row in chain)
+    sim.advance(600)
+    after = sum(row['call_oi'] + row['put_oi'] for row in sim.option_chain('NIFTY'))
+    assert after > before
+
+    # DataFetcher in simulated mode reads every feed from the simulator
+    data = asyncio.run(DataFetcher(None, simulator=sim).fetch_all_data())
+    assert data['spot_price'] == sim.spot('NIFTY')
+    assert set(data['heavyweights']) == set(sim.constituents)
+    assert data['time_to_expiry'] == sim.time_to_expiry()
+
+def test_generated_chains_are_arbitrage_free_and_match_list_layout():
+    import pytest
+
+    arrays = RealisticSimulator.generate_option_chains(24500.0, n_strikes=10001, r=0.0, seed=4, as_arrays=True)
+    strikes = arrays['strikes']
+    assert arrays['call_ltp'].shape == (4, 10001)
+
+    for key in ('call_ltp', 'put_ltp'):
+        slopes = np.diff(arrays[key], axis=1) / np.diff(strikes)
+        # Monotone and convex in strike (no vertical or butterfly arbitrage)
+        assert np.diff(slopes, axis=1).min() > -1e-9
+    assert np.all(np.diff(arrays['call_ltp'], axis=1) <= 1e-9)
+    # Total variance grows with expiry at every strike (no calendar arbitrage, r = 0)
+    total_var = arrays['call_iv'] ** 2 * arrays['time_to_expiry'][:, None]
+    assert np.all(np.diff(total_var, axis=0) >= 0)
+    # Skew: downside IV above upside IV at the same distance
+    assert arrays['put_iv'][0, 0] > arrays['call_iv'][0, -1]
+
+    snapshots = RealisticSimulator.generate_option_chains(24500.0, n_strikes=41, step=50, seed=4)
+    again = RealisticSimulator.generate_option_chains(24500.0, n_strikes=41, step=50, seed=4)
+    assert snapshots == again
+    row = snapshots[0]['option_chain'][20]
+    assert row['strike'] == 24500 and set(row) == {'strike', 'call_ltp', 'put_ltp', 'call_oi', 'put_oi', 'call_iv', 'put_iv'}
+
+    with pytest.raises(ValueError):
+        RealisticSimulator.generate_option_chains(24500.0, eta=2.0, rho=-0.4)
+
+def test_generated_chains_keep_the_callers_expiry_order():
+    days, atm_iv = (28, 7, 56, 14), (0.13, 0.16, 0.12, 0.15)
+    ordered = RealisticSimulator.generate_option_chains(24500.0, n_strikes=41, expiry_days=sorted(days), atm_iv=(0.16, 0.15, 0.13, 0.12),
+                                                        seed=4, as_arrays=True)
+    shuffled = RealisticSimulator.generate_option_chains(24500.0, n_strikes=41, expiry_days=days, atm_iv=atm_iv, seed=4, as_arrays=True)
+
+    back = [sorted(days).index(d) for d in days]
+    assert shuffled['expiries'] == [ordered['expiries'][i] for i in back]
+    for key in ('time_to_expiry', 'call_ltp', 'put_ltp', 'call_iv', 'call_oi', 'put_oi'):
+        assert np.array_equal(shuffled[key], ordered[key][back])
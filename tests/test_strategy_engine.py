@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from core.strategy_engine import StrategyLab
+
+def _loop_payoff(spot_range, legs):
+    total = np.zeros_like(spot_range)
+    for leg in legs:
+        side = 1 if leg['action'] == 'BUY' else -1
+        if leg['type'] == 'CE':
+            payoff = np.maximum(0, spot_range - leg['strike']) - leg['premium']
+        else:
+            payoff = np.maximum(0, leg['strike'] - spot_range) - leg['premium']
+        total += payoff * leg['qty'] * side
+    return total
+
+def test_batch_payoff_matches_leg_loop():
+    rng = np.random.default_rng(0)
+    spot_range = np.linspace(22000, 27000, 400)
+    strategies = [
+        [
+            {'type': str(rng.choice(['CE', 'PE'])), 'action': str(rng.choice(['BUY', 'SELL'])),
+             'strike': float(rng.integers(480, 500) * 50), 'premium': float(rng.uniform(10, 300)),
+             'qty': int(rng.integers(1, 4))}
+            for _ in range(rng.integers(1, 5))
+        ]
+        for _ in range(600)
+    ]
+    payoffs, net = StrategyLab.calculate_payoff_batch(spot_range, StrategyLab.legs_to_matrix(strategies))
+
+    assert payoffs.shape == (600, 400)
+    for i, legs in enumerate(strategies):
+        assert np.allclose(payoffs[i], _loop_payoff(spot_range, legs))
+        assert np.isclose(net[i], sum(l['premium'] * l['qty'] * (1 if l['action'] == 'BUY' else -1) for l in legs))
+
+def _leg(opt_type, action, strike, premium, qty=1):
+    return {'type': opt_type, 'action': action, 'strike': strike, 'premium': premium, 'qty': qty}
+
+def test_exact_metrics_bounded_iron_condor():
+    legs = [_leg('PE', 'BUY', 24000, 20), _leg('PE', 'SELL', 24200, 60),
+            _leg('CE', 'SELL', 24800, 55), _leg('CE', 'BUY', 25000, 18)]
+    metrics = StrategyLab.get_strategy_metrics(None, None, legs=legs)
+
+    # Net credit 77 on 200-wide wings
+    assert metrics['max_profit'] == 77
+    assert metrics['max_loss'] == -123
+    assert metrics['breakevens'] == [24123.0, 24877.0]
+
+    # Grid scan converges to the same answer
+    spot_range = np.linspace(23000, 26000, 3001)
+    payoff, _ = StrategyLab.calculate_payoff(spot_range, legs)
+    grid = StrategyLab.get_strategy_metrics(spot_range, payoff)
+    assert np.allclose(grid['breakevens'], metrics['breakevens'])
+
+def test_exact_metrics_unbounded_risk():
+    short_call = [_leg('CE', 'SELL', 24500, 120)]
+    long_straddle = [_leg('CE', 'BUY', 24500, 120), _leg('PE', 'BUY', 24500, 110)]
+    res = StrategyLab.exact_metrics_batch(StrategyLab.legs_to_matrix([short_call, long_straddle]))
+
+    assert res['max_loss'][0] == -np.inf and res['max_profit'][0] == 120
+    assert res['max_profit'][1] == np.inf and res['max_loss'][1] == -230
+    assert res['breakevens'][0].tolist() == [24620.0]
+    assert res['breakevens'][1].tolist() == [24270.0, 24730.0]
+
+def test_pnl_curves_reprice_legs_and_converge_to_expiry():
+    from core.greeks_engine import GreeksEngine
+    from core.vol_surface import VolatilitySurface
+
+    legs = [_leg('CE', 'BUY', 24500, 150), _leg('PE', 'SELL', 24300, 90, qty=2)]
+    spot_range = np.linspace(23500, 25500, 81)
+    curves, net = StrategyLab.calculate_pnl_curves(spot_range, legs, dte_days=10, horizons=[0, 4, 10], iv=0.16, r=0.065)
+
+    assert curves.shape == (3, 81)
+    # T+4: each leg priced on its own at 6 days left
+    t = 6 / 365
+    expected = (GreeksEngine.compute(True, spot_range, 24500, t, 0.065, 0.16)['price'] - 150
+                - 2 * (GreeksEngine.compute(False, spot_range, 24300, t, 0.065, 0.16)['price'] - 90))
+    assert np.allclose(curves[1], expected)
+    assert np.allclose(curves[2], StrategyLab.calculate_payoff(spot_range, legs)[0])
+
+    # A flat surface gives the same curves as its scalar IV
+    flat = VolatilitySurface(24500, 0.065, ['e'], [10 / 365], [[0, 0, 0.16 ** 2 * 10 / 365]], [-1], [1])
+    from_surface, _ = StrategyLab.calculate_pnl_curves(spot_range, legs, 10, [0, 4, 10], surface=flat, r=0.065)
+    assert np.allclose(from_surface, curves)
+
+    # A missing or zero IV is an error, not a NaN curve
+    with pytest.raises(ValueError):
+        StrategyLab.calculate_pnl_curves(spot_range, legs, 10, [0, 4])
+    with pytest.raises(ValueError):
+        StrategyLab.calculate_pnl_curves(spot_range, [{**legs[0], 'iv': 0.0}, legs[1]], 10, [0, 4], iv=0.16)
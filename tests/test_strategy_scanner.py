@@ -0,0 +1,89 @@
+import numpy as np
+
+from core.greeks_engine import GreeksEngine
+from core.monte_carlo import MonteCarloEngine
+from core.strategy_engine import StrategyLab
+from core.strategy_scanner import StrategyScanner, _score_batch
+
+def _chain(spot=24500.0, t=7 / 365, n=60, step=50):
+    strikes = spot + step * (np.arange(n) - n // 2)
+    iv = 0.14 + 2.0 * np.log(strikes / spot) ** 2
+    call = GreeksEngine.compute(True, spot, strikes, t, 0.065, iv)['price']
+    put = GreeksEngine.compute(False, spot, strikes, t, 0.065, iv)['price']
+    return [
+        {'strike': k, 'call_ltp': c, 'put_ltp': p, 'call_iv': v, 'put_iv': v, 'call_oi': 1000, 'put_oi': 1000}
+        for k, c, p, v in zip(strikes, call, put, iv)
+    ]
+
+def test_exact_scores_match_monte_carlo():
+    strategies = [
+        [{'type': 'PE', 'action': 'BUY', 'strike': 24100, 'premium': 12, 'qty': 1},
+         {'type': 'PE', 'action': 'SELL', 'strike': 24300, 'premium': 35, 'qty': 1},
+         {'type': 'CE', 'action': 'SELL', 'strike': 24700, 'premium': 40, 'qty': 1},
+         {'type': 'CE', 'action': 'BUY', 'strike': 24900, 'premium': 14, 'qty': 1}],
+        [{'type': 'PE', 'action': 'SELL', 'strike': 24200, 'premium': 30, 'qty': 1},
+         {'type': 'CE', 'action': 'SELL', 'strike': 24800, 'premium': 28, 'qty': 2}]
+    ]
+    leg_matrix = StrategyLab.legs_to_matrix(strategies)
+    exact = _score_batch((leg_matrix, 24500.0, 0.15, 7 / 365, 0.065))
+    with MonteCarloEngine(n_paths=400000, seed=11) as engine:
+        mc = engine.simulate_batch(leg_matrix, 24500.0, 0.15, 7, drift=0.065)
+
+    assert np.all(np.abs(exact['pop'] - mc['pop']) < 4 * mc['pop_std_error'] + 1e-4)
+    assert np.all(np.abs(exact['expected_pnl'] - mc['expected_pnl']) < 4 * mc['std_error'])
+    assert exact['max_loss'][1] == -np.inf
+
+def test_scan_prunes_and_ranks():
+    scanner = StrategyScanner(max_width=3)
+    chain = _chain()
+    strikes, call_ltp, put_ltp, _, _ = scanner._chain_arrays(chain)
+    names, leg_matrix = scanner.enumerate_candidates(24500.0, strikes, call_ltp, put_ltp, 0.14, 7 / 365)
+
+    assert {'Bull Call Spread', 'Bear Put Spread', 'Call Butterfly', 'Long Strangle', 'Iron Condor'} <= set(names)
+    # Every defined-risk candidate can both win and lose
+    res = scanner.score(leg_matrix, 24500.0, 0.14, 7 / 365)
+    assert np.all(res['max_profit'] > 0) and np.all(res['max_loss'] < 0)
+
+    table = scanner.scan({'spot_price': 24500.0, 'time_to_expiry': 7 / 365, 'option_chain': chain}, rank_by='pop', top_n=5)
+    assert len(table) == 5
+    pops = [row['pop'] for row in table]
+    assert pops == sorted(pops, reverse=True)
+    assert table[0]['pop'] == round(float(res['pop'].max()), 4)
+
+def test_scan_solves_atm_iv_when_the_chain_has_none(caplog):
+    scanner = StrategyScanner(max_width=3)
+    chain = _chain()
+    market = {'spot_price': 24500.0, 'time_to_expiry': 7 / 365}
+    with_iv = scanner.scan({**market, 'option_chain': chain}, top_n=5)
+
+    # Live chains carry LTPs only; the ATM IV is backed out of them
+    bare = [{k: v for k, v in row.items() if k not in ('call_iv', 'put_iv')} for row in chain]
+    solved = scanner.scan({**market, 'option_chain': bare}, top_n=5)
+    assert [row['legs'] for row in solved] == [row['legs'] for row in with_iv]
+    assert np.allclose([row['pop'] for row in solved], [row['pop'] for row in with_iv], atol=1e-3)
+
+    unpriced = [{**row, 'call_ltp': 0.0, 'put_ltp': 0.0} for row in bare]
+    assert scanner.scan({**market, 'option_chain': unpriced}) == []
+    assert "no usable ATM IV" in caplog.text
+
+def test_dominated_candidates_are_pruned():
+    rng = np.random.default_rng(0)
+    metrics = np.round(rng.normal(size=(3, 2000)), 1)
+    metrics[2, rng.random(2000) < 0.1] = np.nan
+    w = np.where(np.isnan(metrics), -np.inf, metrics)
+    dominated = ((w[:, :, None] >= w[:, None, :]).all(axis=0) & (w[:, :, None] > w[:, None, :]).any(axis=0)).any(axis=0)
+    assert np.array_equal(StrategyScanner.non_dominated(metrics, chunk=128), ~dominated)
+
+    # Most of the best-EV candidates are beaten on all three metrics by some other candidate
+    scanner = StrategyScanner(max_width=3)
+    chain = _chain()
+    strikes, call_ltp, put_ltp, _, _ = scanner._chain_arrays(chain)
+    _, leg_matrix = scanner.enumerate_candidates(24500.0, strikes, call_ltp, put_ltp, 0.14, 7 / 365)
+    res = scanner.score(leg_matrix, 24500.0, 0.14, 7 / 365)
+    alive = StrategyScanner.non_dominated(np.stack([res['expected_pnl'], res['pop'], res['return_on_risk']]))
+    by_ev = np.argsort(-res['expected_pnl'], kind='stable')
+    assert not alive[by_ev[:10]].all()
+
+    table = scanner.scan({'spot_price': 24500.0, 'time_to_expiry': 7 / 365, 'option_chain': chain}, top_n=10)
+    expected = by_ev[alive[by_ev]][:10]
+    assert [row['expected_pnl'] for row in table] == [round(float(v), 2) for v in res['expected_pnl'][expected]]
@@ -0,0 +1,47 @@
+import numpy as np
+
+from core.vol_surface import VolatilitySurface, VolSurfaceCache
+from core.strategy_engine import StrategyLab
+
+SPOT, R = 24500.0, 0.065
+TIMES = np.array([0.02, 0.05, 0.10])
+
+def _smile(strikes, t):
+    # Put-skewed smile quadratic in total variance, so the fit is exact
+    k = np.log(strikes / (SPOT * np.exp(R * t)))
+    return np.sqrt(0.15 ** 2 - 0.05 * k + 0.4 * k ** 2)
+
+def _surface():
+    strikes = np.tile(np.arange(22000, 27050, 50.0), (len(TIMES), 1))
+    iv = _smile(strikes, TIMES[:, None])
+    return VolatilitySurface.fit(strikes, iv, iv, np.ones_like(strikes, dtype=bool), SPOT, TIMES,
+                                 expiries=['W1', 'W2', 'W3'], r=R)
+
+def test_surface_recovers_quoted_smile():
+    surface = _surface()
+    strikes = np.arange(23000, 26000, 37.0)
+    assert np.allclose(surface.iv(strikes, 'W2'), _smile(strikes, 0.05), atol=1e-6)
+
+    # Between expiries the lookup is vectorized over strikes and times together
+    between = surface.iv(strikes, np.full(strikes.shape, 0.035))
+    assert np.all(np.isfinite(between)) and between.shape == strikes.shape
+
+def test_surface_skew_metrics():
+    surface = _surface()
+    front = surface.skew[0]
+    assert abs(front['atm_iv'] - 0.15) < 1e-3
+    assert front['rr25'] < 0 < front['bf25']
+
+def test_surface_cache_and_unquoted_strike_pricing():
+    cache = VolSurfaceCache(ttl=60)
+    builds = []
+    def build():
+        builds.append(1)
+        return _surface()
+
+    surface = cache.get('NIFTY', build)
+    assert cache.get('NIFTY', build) is surface and len(builds) == 1
+
+    premium = StrategyLab.model_premium({'type': 'PE', 'strike': 24375, 'action': 'BUY', 'qty': 1},
+                                        SPOT, 0.05, surface, r=R)
+    assert 0 < premium < 24375